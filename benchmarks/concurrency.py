@@ -0,0 +1,134 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Starts many 'pathmod' processes which modify the same PATH at the same moment,
+using the file backend, and fails if any change is lost.
+
+    python benchmarks/concurrency.py [--writers N] [--rounds N]
+
+Each writer adds, prepends or removes its own entry, so once they have all
+finished, every added entry must be on the PATH exactly once and every removed
+entry must be gone.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Waits until the given start time, so that the writers start together rather than
+# in the order they were spawned.
+ENTRY_POINT = (
+    "import sys, time; start = float(sys.argv.pop(1)); "
+    "time.sleep(max(0, start - time.time())); "
+    "from pathmod import cli; cli()"
+)
+
+# Seconds to allow for every writer to be spawned before they start.
+START_DELAY = 1.0
+
+
+def run_round(n: int, writers: int, cwd: str, env) -> list:
+    """
+    Runs the writers once, returning a description of each change which was lost.
+    """
+    environment = os.path.join(cwd, f"environment-{n}.json")
+    seeded = [f"/seed/{i}" for i in range(writers // 3)]
+    with open(environment, "w", encoding="utf-8") as f:
+        json.dump({"user": {"PATH": ";".join(seeded)}, "system": {"PATH": ""}}, f)
+
+    env = dict(env, PATHMOD_BACKEND=f"file:{environment}")
+    start = time.time() + START_DELAY
+    added = []
+    removed = []
+    processes = []
+
+    for i in range(writers):
+        if i < len(seeded):
+            args, entry = ["remove", seeded[i]], seeded[i]
+            removed.append(entry)
+        else:
+            entry = f"/writer/{n}/{i}"
+            action = "prepend" if i % 2 else "add"
+            args = [action, "--force", "--no-compact", entry]
+            added.append(entry)
+
+        processes.append(
+            subprocess.Popen(
+                [sys.executable, "-c", ENTRY_POINT, str(start)] + args,
+                cwd=cwd,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+        )
+
+    lost = []
+    for process in processes:
+        output = process.communicate()[0].decode(errors="replace")
+        if process.returncode != 0:
+            lost.append(f"writer failed:\n{output}")
+
+    with open(environment, "r", encoding="utf-8") as f:
+        entries = json.load(f)["user"]["PATH"].split(";")
+
+    lost.extend(f"'{e}' was not added" for e in added if entries.count(e) != 1)
+    lost.extend(f"'{e}' was not removed" for e in removed if e in entries)
+    return lost
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--writers", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    failures = []
+
+    with tempfile.TemporaryDirectory() as cwd:
+        env["PATHMOD_HOME"] = cwd
+
+        for n in range(args.rounds):
+            begin = time.perf_counter()
+            lost = run_round(n, args.writers, cwd, env)
+            elapsed = time.perf_counter() - begin - START_DELAY
+
+            print(
+                f"Round {n + 1}: {args.writers} writers finished in "
+                f"{elapsed:.2f} s, {len(lost)} change(s) lost"
+            )
+            failures.extend(lost)
+
+    if failures:
+        print("\nChanges were lost:\n")
+        for f in failures:
+            print(f"\t{f}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
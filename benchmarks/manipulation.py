@@ -0,0 +1,177 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Benchmarks PATH manipulation with synthetic PATHs of 10 to 10,000 entries.
+
+    python benchmarks/manipulation.py [--output FILE] [--baseline FILE] [--threshold X]
+    python benchmarks/manipulation.py --save-baseline
+
+The in-memory backend is used, so this runs on any platform and only pathmod's own
+code is timed. Results are saved as JSON (seconds per call), and compared with the
+stored baseline: the run fails if any benchmark is more than `threshold` times
+slower than its baseline.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ["PATHMOD_BACKEND"] = "memory"
+
+from pathmod import pathutils, show
+from pathmod.backends import set_backend
+from pathmod.backends.memory import MemoryBackend
+
+SIZES = [10, 100, 1000, 10000]
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+
+
+def synthetic_path(size: int) -> str:
+    """
+    Returns a PATH with a realistic mix of entries: unexpanded variables, trailing
+    separators, inconsistent case and an empty entry.
+    """
+    entries = []
+    for i in range(size):
+        kind = i % 5
+        if kind == 0:
+            entries.append(f"%USERPROFILE%\\tools\\tool{i}\\bin")
+        elif kind == 1:
+            entries.append(f"C:\\Program Files\\Vendor {i}\\bin\\")
+        elif kind == 2:
+            entries.append(f"C:\\PROGRAM FILES\\vendor {i}")
+        elif kind == 3:
+            entries.append(f"/opt/tool{i}/bin/")
+        else:
+            entries.append(f"/usr/local/tool{i}")
+    entries.insert(size // 2, "")
+    return ";".join(entries) + ";"
+
+
+def get_benchmarks(size: int):
+    path = synthetic_path(size)
+    middle = path.split(";")[size // 2 + 1]
+    targets = [f"~/scripts/{i}/../bin" for i in range(size)]
+
+    set_backend(MemoryBackend({"user": {"PATH": path}, "system": {"PATH": path}}))
+
+    return {
+        "get_abs_path": lambda: [pathutils.get_abs_path(t) for t in targets],
+        "add_to_path_str": lambda: pathutils.add_to_path_str(path, "/new", False),
+        "add_to_path_str(prepend)": lambda: pathutils.add_to_path_str(
+            path, "/new", True
+        ),
+        "remove_from_path_str": lambda: pathutils.remove_from_path_str(
+            path, middle, system=False
+        ),
+        "get_command(duplicate check)": lambda: pathutils.get_command(
+            "/new", system=False, prepend=False, force=False, remove=False
+        ),
+        "show": lambda: show.show(
+            shadowed=False, details=False, output_format="text", timeout=2.0
+        ),
+    }
+
+
+def run(repeat: int):
+    results = {}
+
+    for size in SIZES:
+        for name, func in get_benchmarks(size).items():
+            with contextlib.redirect_stdout(io.StringIO()):
+                timer = timeit.Timer(func)
+                number, _ = timer.autorange()
+                best = min(timer.repeat(repeat=repeat, number=number)) / number
+
+            key = f"{name}[{size}]"
+            results[key] = best
+            print(f"{key:<44}{best * 1e6:14.1f} us")
+
+    return results
+
+
+def compare(results, baseline, threshold: float):
+    """
+    Returns the benchmarks which are more than `threshold` times slower.
+    """
+    regressions = []
+
+    for key, value in results.items():
+        if key in baseline and value > baseline[key] * threshold:
+            regressions.append((key, baseline[key], value))
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", help="save results to this JSON file")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=2.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="overwrite the baseline"
+    )
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    data = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(data, f, indent=2)
+        print(f"\nSaved baseline to '{args.baseline}'.")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at '{args.baseline}'; skipping comparison.")
+        return
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["results"]
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\nBenchmarks more than {args.threshold}x slower than the baseline:\n")
+        for key, before, after in regressions:
+            print(f"\t{key:<44}{before * 1e6:12.1f} us -> {after * 1e6:12.1f} us")
+        sys.exit(1)
+
+    print(f"\nNo regressions compared to '{args.baseline}'.")
+
+
+if __name__ == "__main__":
+    main()
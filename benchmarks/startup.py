@@ -0,0 +1,179 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Measures the startup time of the commands run from shell profiles, and fails if
+they exceed their budget.
+
+    python benchmarks/startup.py [--runs N] [--wall-budget MS] [--import-budget MS]
+
+Import time is measured with '-X importtime', counting only the modules which are
+not already loaded by a bare interpreter. The wall-clock time includes interpreter
+startup, since that is what users wait for.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMMANDS = [["version"], ["refresh", "-gq"], ["refresh", "-e"]]
+
+# Modules which must not be imported when handling the commands above.
+FORBIDDEN_MODULES = [
+    "click",
+    "subprocess",
+    "traceback",
+    "platform",
+    "pathmod.cli",
+    "pathmod.pathutils",
+]
+
+# The file backend stands in for the registry on other platforms. The registry
+# backend only needs the built-in winreg module, so the file backend's imports
+# (such as json) aren't counted.
+STAND_IN_MODULES = ["pathmod.backends.file"]
+
+ENTRY_POINT = "import sys; from pathmod import cli; cli()"
+
+
+def run(args, cwd, env, importtime=False):
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += args
+
+    start = time.perf_counter()
+    result = subprocess.run(
+        cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    elapsed = time.perf_counter() - start
+
+    if result.returncode != 0:
+        raise RuntimeError(f"{cmd} failed:\n{result.stderr.decode(errors='replace')}")
+    return elapsed, result.stderr.decode(errors="replace")
+
+
+def parse_importtime(stderr, exclude=()):
+    """
+    Returns {module: self time in microseconds}. Modules in `exclude` are skipped,
+    along with everything they import.
+    """
+    modules = {}
+    # Lines are printed after each import completes, so a module's dependencies
+    # appear before it, indented more deeply.
+    lines = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, _, name = line[len("import time:") :].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        lines.append((name.strip(), depth, int(self_us)))
+
+    excluded_depth = None
+    for name, depth, self_us in reversed(lines):
+        if excluded_depth is not None and depth > excluded_depth:
+            continue
+        excluded_depth = depth if name in exclude else None
+        if excluded_depth is None:
+            modules[name] = self_us
+
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--wall-budget", type=float, default=50.0, help="ms")
+    parser.add_argument("--import-budget", type=float, default=10.0, help="ms")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    failures = []
+
+    with tempfile.TemporaryDirectory() as cwd:
+        if sys.platform != "win32":
+            env["PATHMOD_BACKEND"] = f"file:{os.path.join(cwd, 'environment.json')}"
+
+        _, stderr = run(["-c", "pass"], cwd, env, importtime=True)
+        baseline_modules = set(parse_importtime(stderr))
+        baseline_wall = statistics.median(
+            run(["-c", "pass"], cwd, env)[0] for _ in range(args.runs)
+        )
+        print(f"{'python -c pass':<24}{baseline_wall * 1000:8.1f} ms")
+
+        for command in COMMANDS:
+            name = " ".join(command)
+
+            _, stderr = run(["-c", ENTRY_POINT] + command, cwd, env, importtime=True)
+            exclude = STAND_IN_MODULES if sys.platform != "win32" else []
+            modules = {
+                k: v
+                for k, v in parse_importtime(stderr, exclude).items()
+                if k not in baseline_modules
+            }
+            import_ms = sum(modules.values()) / 1000
+
+            wall = []
+            for _ in range(args.runs):
+                wall.append(run(["-c", ENTRY_POINT] + command, cwd, env)[0])
+                for i in os.listdir(cwd):
+                    if i.endswith(".ps1"):
+                        os.remove(os.path.join(cwd, i))
+            wall_ms = statistics.median(wall) * 1000
+
+            print(
+                f"{'pathmod ' + name:<24}{wall_ms:8.1f} ms"
+                f"    imports: {import_ms:.1f} ms ({len(modules)} modules)"
+            )
+
+            forbidden = [
+                m
+                for m in modules
+                if any(m == f or m.startswith(f"{f}.") for f in FORBIDDEN_MODULES)
+            ]
+            if forbidden:
+                failures.append(f"'{name}' imports {', '.join(sorted(forbidden))}")
+            if import_ms > args.import_budget:
+                failures.append(
+                    f"'{name}' import time {import_ms:.1f} ms exceeds "
+                    f"{args.import_budget} ms"
+                )
+            if wall_ms > args.wall_budget:
+                failures.append(
+                    f"'{name}' wall-clock time {wall_ms:.1f} ms exceeds "
+                    f"{args.wall_budget} ms"
+                )
+
+    if failures:
+        print("\nStartup budget exceeded:\n")
+        for f in failures:
+            print(f"\t{f}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,17 +19,10 @@
 #  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
-import platform
-import sys
-
 __version__ = "0.1.0"
 
-if platform.system() != "Windows":
-    print(f"Sorry, we only support Windows at the moment.")
-    sys.exit(1)
-
 
 def cli():
-    from pathmod.cli import root
+    from pathmod.dispatch import main
 
-    root()
+    main()
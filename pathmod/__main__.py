@@ -24,6 +24,6 @@ Allows the program to be executed with "python -m pathmod".
 """
 
 if __name__ == "__main__":
-    from pathmod.cli import root
+    from pathmod.dispatch import main
 
-    root()
+    main()
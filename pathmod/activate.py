@@ -0,0 +1,353 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Adds the locations listed in a '.pathmod' file to the session's PATH while the
+shell is in that directory (or below it), and removes them again when it leaves, so
+that project tools don't need to be added to the persistent PATH. For example:
+
+    # Tools used by this project; relative locations are relative to this file.
+    prepend tools\\bin
+    add %USERPROFILE%\\.cargo\\bin
+
+The nearest '.pathmod' file is found by the shell hook from `get_hook()`, which
+runs on each prompt without starting Python. The locations in each file are resolved
+once and cached as code for the shell, which is used until the file is modified, so
+pathmod is only started when a file is new or has changed.
+
+A '.pathmod' file can put any program first on the PATH, so files are only used
+once they have been allowed with 'pathmod dir allow', and must be allowed again
+after they change.
+"""
+import hashlib
+import os
+import sys
+from typing import List, Optional, Tuple
+
+from pathmod import state
+from pathmod.errors import InvalidLocationError
+from pathmod.pathutils import get_abs_path
+
+FILENAME = ".pathmod"
+ACTIONS = ("add", "prepend")
+
+# The shells which have hooks; cmd has no prompt hook.
+SHELLS = ("powershell", "posix")
+
+CACHE_DIR = "dirs"
+ALLOWED_FILE = "allowed.json"
+
+
+def find_file(directory: str) -> Optional[str]:
+    """
+    Returns the nearest '.pathmod' file in `directory` or its parents.
+    """
+    directory = os.path.abspath(directory)
+
+    while True:
+        filename = os.path.join(directory, FILENAME)
+        if os.path.isfile(filename):
+            return filename
+
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+
+def parse_file(filename: str, content: str) -> List[Tuple[str, str]]:
+    """
+    Returns the (action, location) pairs in a '.pathmod' file, with each location
+    resolved relative to the file. Lines which can't be used are reported and
+    skipped, since this runs from the prompt.
+    """
+    directory = os.path.dirname(filename)
+    entries = []
+
+    for n, line in enumerate(content.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        action, _, location = line.partition(" ")
+        action = action.lower()
+        location = location.strip()
+        if len(location) > 1 and location[0] == location[-1] and location[0] in "\"'":
+            location = location[1:-1]
+
+        if action not in ACTIONS or not location:
+            _warn(f"'{filename}', line {n}: expected '<add|prepend> <location>'")
+            continue
+
+        location = os.path.expandvars(os.path.expanduser(location))
+        try:
+            entries.append((action, get_abs_path(os.path.join(directory, location))))
+        except InvalidLocationError as e:
+            _warn(f"'{filename}', line {n}: {e}")
+
+    return entries
+
+
+def activate(filename: str, shell: str) -> str:
+    """
+    Returns code for `shell` which adds the locations in a '.pathmod' file to the
+    session's PATH, and caches it for the shell hook. If the file isn't allowed,
+    the code adds nothing.
+    """
+    filename = os.path.abspath(filename)
+    entries = []
+
+    try:
+        with open(filename, "rb") as f:
+            content = f.read()
+    except OSError as e:
+        _warn(f"could not read '{filename}': {e}")
+    else:
+        if get_allowed().get(filename) == _hash(content):
+            text = content.decode("utf-8-sig", errors="replace")
+            entries = parse_file(filename, text)
+        else:
+            _warn(
+                f"'{filename}' is not allowed; check it and then run "
+                f"'pathmod dir allow' to use it."
+            )
+
+    # Prepended locations are added in reverse, so that the first comes first.
+    prepended = [i for i in entries if i[0] == "prepend"]
+    entries = prepended[::-1] + [i for i in entries if i[0] == "add"]
+
+    if shell == "powershell":
+        items = ",".join(f"{_quote(a)},{_quote(e)}" for a, e in entries)
+        code = f"Enable-PathmodDirectory -File {_quote(filename)} -Entries @({items})"
+    else:
+        # POSIX PATHs can't contain the separator.
+        args = " ".join(
+            f"{a} {_quote_posix(e)}" for a, e in entries if os.pathsep not in e
+        )
+        code = f"_pathmod_dir_activate {_quote_posix(filename)} {args}".rstrip()
+
+    cache = get_cache_file(filename, shell)
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        with open(cache, "w", encoding="utf-8") as f:
+            f.write(code + "\n")
+    except OSError:
+        # The file is resolved again next time.
+        pass
+
+    return code
+
+
+def get_cache_file(filename: str, shell: str) -> str:
+    """
+    Returns the file which caches the code for a '.pathmod' file. Its location
+    mirrors the '.pathmod' file, so that the shell hooks can find it without
+    starting Python.
+    """
+    relative = filename.replace(":", "").lstrip("\\/")
+    return os.path.join(state.get_state_file(CACHE_DIR), f"{relative}.{shell}")
+
+
+def get_allowed() -> dict:
+    """
+    Returns the hash of each allowed '.pathmod' file, keyed by its absolute path.
+    """
+    return state.load_json(ALLOWED_FILE, {})
+
+
+def allow(filename: str):
+    """
+    Allows a '.pathmod' file with its current contents.
+    """
+    filename = os.path.abspath(filename)
+    with open(filename, "rb") as f:
+        content = f.read()
+
+    allowed = get_allowed()
+    allowed[filename] = _hash(content)
+    state.save_json(ALLOWED_FILE, allowed)
+    _clear_cache(filename)
+
+
+def deny(filename: str) -> bool:
+    """
+    Stops using a '.pathmod' file, returning whether it was allowed.
+    """
+    filename = os.path.abspath(filename)
+    allowed = get_allowed()
+    found = allowed.pop(filename, None) is not None
+
+    state.save_json(ALLOWED_FILE, allowed)
+    _clear_cache(filename)
+    return found
+
+
+def get_hook(shell: str) -> str:
+    """
+    Returns code for a shell's profile which finds the nearest '.pathmod' file on
+    each prompt, and updates the session's PATH when it changes.
+    """
+    cache_dir = state.get_state_file(CACHE_DIR)
+
+    if shell == "powershell":
+        return POWERSHELL_HOOK.replace("{cache}", _quote(cache_dir))
+
+    return POSIX_HOOK.replace("{cache}", _quote_posix(cache_dir))
+
+
+def _clear_cache(filename: str):
+    # Shells which are in the directory notice the change at their next prompt.
+    for shell in SHELLS:
+        try:
+            os.remove(get_cache_file(filename, shell))
+        except OSError:
+            pass
+
+
+def _hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def _warn(message: str):
+    print(f"pathmod: {message}", file=sys.stderr)
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _quote_posix(value: str) -> str:
+    return "'" + value.replace("'", "'\\''") + "'"
+
+
+POWERSHELL_HOOK = r"""$global:PathmodDirCache = {cache}
+function global:Enable-PathmodDirectory([string]$File, [string[]]$Entries) {
+    $added = @()
+    for ($i = 0; $i -lt $Entries.Count; $i += 2) {
+        $action, $entry = $Entries[$i], $Entries[$i + 1]
+        if (($env:Path -split ';') -notcontains $entry) {
+            if ($action -eq 'prepend') { $env:Path = "$entry;$env:Path" }
+            else { $env:Path = $env:Path.TrimEnd(';') + ";$entry" }
+            $added += $entry
+        }
+    }
+    $env:PATHMOD_DIR_FILE = $File
+    $env:PATHMOD_DIR_ADDED = $added -join ';'
+}
+function global:Disable-PathmodDirectory {
+    if ($env:PATHMOD_DIR_ADDED) {
+        $added = $env:PATHMOD_DIR_ADDED -split ';'
+        $env:Path = (($env:Path -split ';') | Where-Object { $_ -and $added -notcontains $_ }) -join ';'
+    }
+    Remove-Item Env:PATHMOD_DIR_FILE, Env:PATHMOD_DIR_ADDED -ErrorAction SilentlyContinue
+}
+if (-not $global:PathmodDirPrompt) {
+    $global:PathmodDirPrompt = $function:prompt
+    function global:prompt {
+        $code = $global:LASTEXITCODE
+        $file = $null
+        $location = Get-Location
+        if ($location.Provider.Name -eq 'FileSystem') {
+            $dir = $location.ProviderPath
+            while ($dir) {
+                $candidate = [System.IO.Path]::Combine($dir, '.pathmod')
+                if ([System.IO.File]::Exists($candidate)) { $file = $candidate; break }
+                $dir = [System.IO.Path]::GetDirectoryName($dir)
+            }
+        }
+        if ($file) {
+            $cache = [System.IO.Path]::Combine($global:PathmodDirCache, ($file -replace ':', '').TrimStart('\', '/')) + '.powershell'
+            if ([System.IO.File]::GetLastWriteTimeUtc($cache) -le [System.IO.File]::GetLastWriteTimeUtc($file)) {
+                Disable-PathmodDirectory
+                Invoke-Expression ((pathmod dir activate --shell powershell $file) -join "`n")
+            } elseif ($file -ne $env:PATHMOD_DIR_FILE) {
+                Disable-PathmodDirectory
+                Invoke-Expression ([System.IO.File]::ReadAllText($cache))
+            }
+        } elseif ($env:PATHMOD_DIR_FILE) {
+            Disable-PathmodDirectory
+        }
+        $global:LASTEXITCODE = $code
+        & $global:PathmodDirPrompt
+    }
+}"""
+
+POSIX_HOOK = r"""_pathmod_dir_cache={cache}
+_pathmod_dir_activate() {
+    PATHMOD_DIR_FILE=$1
+    PATHMOD_DIR_ADDED=
+    shift
+    while [ $# -gt 1 ]; do
+        case ":$PATH:" in
+            *":$2:"*) ;;
+            *)
+                if [ "$1" = prepend ]; then PATH="$2${PATH:+:$PATH}"; else PATH="${PATH:+$PATH:}$2"; fi
+                PATHMOD_DIR_ADDED="$PATHMOD_DIR_ADDED${PATHMOD_DIR_ADDED:+:}$2"
+                ;;
+        esac
+        shift 2
+    done
+    export PATH PATHMOD_DIR_FILE PATHMOD_DIR_ADDED
+}
+_pathmod_dir_deactivate() {
+    _pathmod_path=":$PATH:"
+    _pathmod_rest="${PATHMOD_DIR_ADDED-}:"
+    while [ -n "$_pathmod_rest" ]; do
+        _pathmod_entry=${_pathmod_rest%%:*}
+        _pathmod_rest=${_pathmod_rest#*:}
+        case "$_pathmod_path" in
+            *":$_pathmod_entry:"*)
+                [ -z "$_pathmod_entry" ] ||
+                    _pathmod_path="${_pathmod_path%%":$_pathmod_entry:"*}:${_pathmod_path#*":$_pathmod_entry:"}"
+                ;;
+        esac
+    done
+    _pathmod_path=${_pathmod_path#:}
+    PATH=${_pathmod_path%:}
+    unset PATHMOD_DIR_FILE PATHMOD_DIR_ADDED
+}
+_pathmod_dir() {
+    _pathmod_status=$?
+    _pathmod_file=
+    _pathmod_d=${PWD%/}
+    while :; do
+        if [ -f "$_pathmod_d/.pathmod" ]; then _pathmod_file=$_pathmod_d/.pathmod; break; fi
+        [ -n "$_pathmod_d" ] || break
+        _pathmod_d=${_pathmod_d%/*}
+    done
+    _pathmod_cache=$_pathmod_dir_cache$_pathmod_file.posix
+    if [ -n "$_pathmod_file" ] && ! [ "$_pathmod_cache" -nt "$_pathmod_file" ]; then
+        _pathmod_dir_deactivate
+        eval "$(pathmod dir activate --shell posix "$_pathmod_file")"
+    elif [ "$_pathmod_file" != "${PATHMOD_DIR_FILE-}" ]; then
+        _pathmod_dir_deactivate
+        [ -z "$_pathmod_file" ] || . "$_pathmod_cache"
+    fi
+    return $_pathmod_status
+}
+if [ -n "${ZSH_VERSION-}" ]; then
+    autoload -Uz add-zsh-hook && add-zsh-hook precmd _pathmod_dir
+elif [ -n "${BASH_VERSION-}" ]; then
+    case ";${PROMPT_COMMAND-};" in
+        *";_pathmod_dir;"*) ;;
+        *) PROMPT_COMMAND="_pathmod_dir${PROMPT_COMMAND:+;$PROMPT_COMMAND}" ;;
+    esac
+fi"""
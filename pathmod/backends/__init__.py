@@ -0,0 +1,204 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Backends read and write the persistent values of environment variables.
+
+The backend is chosen with the PATHMOD_BACKEND environment variable, which has the
+form "name" or "name:argument":
+
+    registry          Read and write the registry in-process (the default on Windows).
+    posix[:<files>]   Edit a block in '~/.profile' and '/etc/environment.d' (the default
+                      elsewhere). Other files are given as "<user file>[:<system file>]".
+    powershell        Spawn powershell.exe for every read and write.
+    file:<path>       Store variables in a JSON file; useful for testing on any platform.
+    memory            Store variables in memory only; useful for benchmarks.
+    hive:<path>       Edit an offline registry hive file, such as another user's NTUSER.DAT.
+"""
+import os
+
+from pathmod.errors import PathmodError
+
+BACKEND_ENV_VAR = "PATHMOD_BACKEND"
+
+
+class BackendError(PathmodError):
+    """
+    Raised when a backend fails to read or write a variable.
+    """
+
+
+class Backend:
+    """
+    Base class for backends.
+    """
+
+    name = None
+
+    # Whether reads are slow enough that reading several variables concurrently
+    # is worth the cost of starting threads.
+    concurrent_reads = False
+
+    # Whether other processes see the same variables, so that the snapshot kept by
+    # 'pathmod watch' can stand in for reading them.
+    shared = True
+
+    # Whether changes are recorded in the history, so that they can be undone.
+    history = True
+
+    # Whether a new session searches the user PATH before the system PATH. On
+    # Windows, the system PATH comes first.
+    user_first = False
+
+    # Whether a user variable other than PATH replaces the system variable of the
+    # same name, as on Windows, rather than being combined with it.
+    user_replaces_system = True
+
+    def get(self, var: str, user: bool) -> str:
+        """
+        Returns the persistent value of an environment variable, or an empty string
+        if it is not set.
+        """
+        raise NotImplementedError
+
+    def set(self, var: str, value: str, user: bool) -> None:
+        """
+        Persistently sets the value of an environment variable.
+        """
+        raise NotImplementedError
+
+    def get_many(self, names) -> dict:
+        """
+        Returns the values of several (var, user) pairs, keyed by the same pairs.
+        Backends which can read them together, e.g. with a single query or file
+        read, override this.
+        """
+        return {(var, user): self.get(var, user) for var, user in names}
+
+    def set_many(self, values: dict) -> None:
+        """
+        Sets several variables, keyed by (var, user). Backends which can write them
+        together override this.
+        """
+        for (var, user), value in values.items():
+            self.set(var, value, user)
+
+    def broadcast(self) -> None:
+        """
+        Notifies running programs that the environment has changed.
+        """
+
+    def wait_for_change(self, timeout: float) -> None:
+        """
+        Waits until the variables may have changed, or until the timeout expires.
+        Backends which can't be notified of changes simply wait for the timeout.
+        """
+        import time
+
+        time.sleep(timeout)
+
+    def describe_set(self, var: str, value: str, user: bool) -> str:
+        """
+        Returns a human-readable description of what `set()` would do.
+        """
+        return f"Set the {'user' if user else 'system'} {var} to:\n\n{value}"
+
+    def get_id(self) -> str:
+        """
+        Returns a string which identifies the variables this backend modifies, so
+        that the history only restores changes made through the same backend.
+        """
+        return self.name
+
+    def get_lock_file(self) -> str:
+        """
+        Returns the file which is locked while pathmod modifies the variables.
+        Every process modifying the same variables must use the same file.
+        """
+        from pathmod import state
+
+        return state.get_state_file(f"{self.name}.lock")
+
+
+_backend = None
+
+
+def get_backend() -> Backend:
+    """
+    Returns the backend selected by the environment, creating it on first use.
+    """
+    global _backend
+
+    if _backend is None:
+        _backend = create_backend(os.environ.get(BACKEND_ENV_VAR, ""))
+    return _backend
+
+
+def set_backend(backend: Backend) -> None:
+    """
+    Replaces the backend used by the rest of pathmod.
+    """
+    global _backend
+
+    _backend = backend
+
+
+def create_backend(spec: str) -> Backend:
+    name, _, arg = spec.partition(":")
+    name = name.strip().lower() or ("registry" if os.name == "nt" else "posix")
+
+    if name == "registry":
+        try:
+            from pathmod.backends.registry import RegistryBackend
+        except ImportError as e:
+            raise BackendError(
+                f"The registry backend is only available on Windows; choose another "
+                f"backend with {BACKEND_ENV_VAR}."
+            ) from e
+
+        return RegistryBackend()
+    if name == "posix":
+        from pathmod.backends.posix import PosixBackend
+
+        user_file, _, system_file = arg.partition(":")
+        return PosixBackend(user_file or None, system_file or None)
+    if name == "powershell":
+        from pathmod.backends.powershell import PowershellBackend
+
+        return PowershellBackend()
+    if name == "file":
+        from pathmod.backends.file import FileBackend
+
+        return FileBackend(arg or None)
+    if name == "memory":
+        from pathmod.backends.memory import MemoryBackend
+
+        return MemoryBackend()
+    if name == "hive":
+        from pathmod.backends.hive import HiveBackend
+
+        if not arg:
+            raise BackendError(
+                f"The hive backend needs a file, e.g. 'hive:NTUSER.DAT'."
+            )
+        return HiveBackend(arg)
+
+    raise BackendError(f"Unknown backend '{name}' in {BACKEND_ENV_VAR}.")
@@ -0,0 +1,135 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Stores environment variables in a JSON file instead of the registry. This allows the
+whole of pathmod to be run (and timed) on any platform, e.g. in CI.
+
+The file has the format:
+
+    {"user": {"PATH": "..."}, "system": {"PATH": "..."}}
+"""
+import json
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from pathmod.backends import Backend, BackendError
+
+DEFAULT_FILENAME = "pathmod-environment.json"
+
+# Seconds between checks for changes to the file.
+POLL_INTERVAL = 0.25
+
+
+class FileBackend(Backend):
+    name = "file"
+
+    def __init__(self, filename: Optional[str] = None):
+        self.filename = os.path.abspath(
+            os.path.expanduser(filename or os.path.join("~", DEFAULT_FILENAME))
+        )
+
+    def get(self, var: str, user: bool) -> str:
+        scope = self._load().get(_scope(user), {})
+        return scope.get(_find_key(scope, var), "")
+
+    def set(self, var: str, value: str, user: bool) -> None:
+        data = self._load()
+        scope = data.setdefault(_scope(user), {})
+        scope[_find_key(scope, var)] = value
+        self._save(data)
+
+    def get_many(self, names) -> Dict[Tuple[str, bool], str]:
+        data = self._load()
+        values = {}
+        for var, user in names:
+            scope = data.get(_scope(user), {})
+            values[(var, user)] = scope.get(_find_key(scope, var), "")
+
+        return values
+
+    def set_many(self, values: Dict[Tuple[str, bool], str]) -> None:
+        # The file is only rewritten once.
+        data = self._load()
+        for (var, user), value in values.items():
+            scope = data.setdefault(_scope(user), {})
+            scope[_find_key(scope, var)] = value
+        self._save(data)
+
+    def wait_for_change(self, timeout: float) -> None:
+        deadline = time.perf_counter() + timeout
+        mtime = self._get_mtime()
+
+        while time.perf_counter() < deadline:
+            time.sleep(min(POLL_INTERVAL, max(deadline - time.perf_counter(), 0)))
+            if self._get_mtime() != mtime:
+                return
+
+    def describe_set(self, var: str, value: str, user: bool) -> str:
+        return f"Set '{_scope(user)}.{var}' in '{self.filename}' to:\n\n{value}"
+
+    def get_id(self) -> str:
+        return f"{self.name}:{self.filename}"
+
+    def get_lock_file(self) -> str:
+        # Kept next to the file, since processes using it may have different homes.
+        return f"{self.filename}.lock"
+
+    def _get_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.filename).st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.filename, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            raise BackendError(f"Could not read '{self.filename}': {e}") from e
+
+    def _save(self, data: Dict[str, Dict[str, str]]) -> None:
+        # Write to a temporary file first, so that readers never see a partial file.
+        temp = f"{self.filename}.{os.getpid()}.tmp"
+        try:
+            with open(temp, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=2)
+            os.replace(temp, self.filename)
+        except OSError as e:
+            raise BackendError(f"Could not write '{self.filename}': {e}") from e
+
+
+def _scope(user: bool) -> str:
+    return "user" if user else "system"
+
+
+def _find_key(scope: Dict[str, str], var: str) -> str:
+    """
+    Environment variable names are case-insensitive on Windows, so existing keys are
+    matched regardless of case.
+    """
+    for key in scope:
+        if key.upper() == var.upper():
+            return key
+    return var
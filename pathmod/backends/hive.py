@@ -0,0 +1,153 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Reads and writes environment variables in an offline registry hive file, such as
+another user's NTUSER.DAT or the SYSTEM hive of a mounted image. The user variables
+are read from NTUSER.DAT hives, and the system variables from SYSTEM hives.
+"""
+import hashlib
+import os
+from typing import Optional
+
+from pathmod import regf, state
+from pathmod.backends import Backend, BackendError
+
+USER_KEY = "Environment"
+SYSTEM_KEY = r"Control\Session Manager\Environment"
+
+
+class HiveBackend(Backend):
+    name = "hive"
+    # Offline hives aren't the environment of this machine's sessions, so they
+    # aren't snapshotted and don't tell running sessions to refresh.
+    shared = False
+    # Hives are usually changed in bulk, which would crowd out the history.
+    history = False
+
+    def __init__(self, filename: str):
+        self.filename = os.path.abspath(os.path.expanduser(filename))
+        self._hive: Optional[regf.Hive] = None
+        self._mtime: Optional[int] = None
+
+    def get(self, var: str, user: bool) -> str:
+        hive = self._load()
+
+        try:
+            key_path = self._get_key_path(hive, user)
+            key = hive.find_key(key_path) if key_path else None
+            if key is None:
+                return ""
+
+            return hive.get_string(key, var)[0] or ""
+        except regf.HiveError as e:
+            raise BackendError(str(e)) from e
+
+    def set(self, var: str, value: str, user: bool) -> None:
+        self.set_many({(var, user): value})
+
+    def set_many(self, values) -> None:
+        # The hive is only saved once.
+        hive = self._load()
+
+        try:
+            for (var, user), value in values.items():
+                self._set(hive, var, value, user)
+            hive.save()
+        except regf.HiveError as e:
+            # The copy in memory may be half-modified, so it's read again next time.
+            self._hive = None
+            raise BackendError(str(e)) from e
+        except BackendError:
+            self._hive = None
+            raise
+
+        self._mtime = self._get_mtime()
+
+    def describe_set(self, var: str, value: str, user: bool) -> str:
+        scope = "user" if user else "system"
+        return f"Set the {scope} {var} in '{self.filename}' to:\n\n{value}"
+
+    def get_id(self) -> str:
+        return f"{self.name}:{self.filename}"
+
+    def get_lock_file(self) -> str:
+        # Kept in pathmod's own directory rather than littering users' profiles.
+        digest = hashlib.sha1(os.path.normcase(self.filename).encode()).hexdigest()
+        return state.get_state_file(f"hive-{digest[:16]}.lock")
+
+    def _set(self, hive: regf.Hive, var: str, value: str, user: bool):
+        key_path = self._get_key_path(hive, user)
+        if key_path is None:
+            raise BackendError(
+                f"'{self.filename}' is a SYSTEM hive; use '--system' to modify it."
+                if user
+                else f"'{self.filename}' is not a SYSTEM hive, so it has no "
+                f"system variables."
+            )
+
+        key = hive.find_key(key_path)
+        if key is None:
+            raise BackendError(f"'{self.filename}' has no '{key_path}' key.")
+
+        _, value_type = hive.get_string(key, var)
+        if value_type not in (regf.REG_SZ, regf.REG_EXPAND_SZ):
+            value_type = regf.REG_EXPAND_SZ if var.upper() == "PATH" else regf.REG_SZ
+        if "%" in value:
+            value_type = regf.REG_EXPAND_SZ
+
+        hive.set_string(key, var, value, value_type)
+
+    def _load(self) -> regf.Hive:
+        """
+        Returns the hive, reading it again only if the file has changed.
+        """
+        mtime = self._get_mtime()
+        if self._hive is None or mtime != self._mtime:
+            try:
+                self._hive = regf.Hive(self.filename)
+            except regf.HiveError as e:
+                raise BackendError(str(e)) from e
+            self._mtime = mtime
+
+        return self._hive
+
+    def _get_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.filename).st_mtime_ns
+        except OSError:
+            return None
+
+    def _get_key_path(self, hive: regf.Hive, user: bool) -> Optional[str]:
+        """
+        Returns the path of the Environment key, or None if the hive doesn't have the
+        variables for this scope. SYSTEM hives have several control sets, and
+        'Select\\Current' says which one is used when Windows starts.
+        """
+        select = hive.find_key("Select")
+
+        if user:
+            return USER_KEY if select is None else None
+
+        current = hive.get_string(select, "Current")[0] if select is not None else None
+        if not current:
+            return None
+        return f"ControlSet{int(current):03d}\\{SYSTEM_KEY}"
@@ -0,0 +1,53 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Stores environment variables in memory. Nothing is persisted, so this is only
+useful for testing, benchmarking and dry runs.
+"""
+from typing import Dict, Optional
+
+from pathmod.backends import Backend
+
+
+class MemoryBackend(Backend):
+    name = "memory"
+    shared = False
+    history = False
+
+    def __init__(self, values: Optional[Dict[str, Dict[str, str]]] = None):
+        """
+        `values` has the same format as the file backend:
+        {"user": {"PATH": "..."}, "system": {"PATH": "..."}}
+        """
+        self.values = {"user": {}, "system": {}}
+        for scope, variables in (values or {}).items():
+            self.values[scope] = {k.upper(): v for k, v in variables.items()}
+
+    def get(self, var: str, user: bool) -> str:
+        return self.values[_scope(user)].get(var.upper(), "")
+
+    def set(self, var: str, value: str, user: bool) -> None:
+        self.values[_scope(user)][var.upper()] = value
+
+
+def _scope(user: bool) -> str:
+    return "user" if user else "system"
@@ -0,0 +1,285 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Reads and writes environment variables in a block which pathmod manages inside a
+profile file, for Linux and other POSIX systems. Only the lines between the markers
+are parsed and changed; the rest of the file is copied as it is.
+
+The user variables are kept in '~/.profile', which login shells read:
+
+    # >>> pathmod >>>
+    export PATH="/home/me/bin:/opt/tool/bin${PATH:+:$PATH}"
+    # <<< pathmod <<<
+
+and the system variables in '/etc/environment.d/60-pathmod.conf', which is read for
+each session. Files ending in '.conf' use the same lines without 'export'.
+
+Entries come before the inherited value, so that they take precedence over the
+defaults. As elsewhere in pathmod, values are separated by semicolons; they are
+stored separated by colons.
+
+This module is used when refreshing the session, so it only imports os.
+"""
+import os
+
+from pathmod.backends import Backend, BackendError
+
+USER_FILE = os.path.join("~", ".profile")
+SYSTEM_FILE = "/etc/environment.d/60-pathmod.conf"
+
+BEGIN_MARKER = "# >>> pathmod >>>"
+END_MARKER = "# <<< pathmod <<<"
+NOTICE = "# Managed by pathmod; use 'pathmod add' and 'pathmod remove' to change it."
+
+# Characters which are escaped with a backslash inside double quotes.
+ESCAPED = '\\"$`'
+
+
+class PosixBackend(Backend):
+    name = "posix"
+    # Entries come before the inherited value, so the system entries are kept.
+    user_replaces_system = False
+    # '~/.profile' is read after '/etc/environment.d', so its entries come first.
+    user_first = True
+
+    def __init__(self, user_file=None, system_file=None):
+        self.user_file = _get_abs_path(user_file or USER_FILE)
+        self.system_file = _get_abs_path(system_file or SYSTEM_FILE)
+
+    def get(self, var: str, user: bool) -> str:
+        return self.get_many([(var, user)])[(var, user)]
+
+    def set(self, var: str, value: str, user: bool) -> None:
+        self.set_many({(var, user): value})
+
+    def get_many(self, names) -> dict:
+        # Each file is read once, however many variables it holds.
+        blocks = {}
+        values = {}
+
+        for var, user in names:
+            filename = self._get_file(user)
+            if filename not in blocks:
+                text, start, end = _read(filename)
+                blocks[filename] = _parse_block(text[start:end], filename)
+
+            values[(var, user)] = ";".join(blocks[filename].get(var, []))
+
+        return values
+
+    def set_many(self, values: dict) -> None:
+        changes = {}
+        for (var, user), value in values.items():
+            _check_name(var)
+            entries = [i.strip() for i in value.split(";") if i.strip()]
+            for entry in entries:
+                if ":" in entry or "\n" in entry:
+                    raise BackendError(
+                        f"'{entry}' can't be added to the {var}, since entries are "
+                        f"separated by ':'."
+                    )
+            changes.setdefault(self._get_file(user), {})[var] = entries
+
+        for filename, variables in changes.items():
+            self._write(filename, variables)
+
+    def describe_set(self, var: str, value: str, user: bool) -> str:
+        entries = ":".join(i.strip() for i in value.split(";") if i.strip())
+        scope = "user" if user else "system"
+        return (
+            f"Set the {scope} {var} in the pathmod block of "
+            f"'{self._get_file(user)}' to:\n\n{entries}"
+        )
+
+    def get_id(self) -> str:
+        return f"{self.name}:{self.user_file}:{self.system_file}"
+
+    def get_lock_file(self) -> str:
+        # Kept next to the system file, so that every user who can change it takes
+        # the same lock. Users who can't write there can't change it either, so
+        # their own lock is enough.
+        lock_file = f"{self.system_file}.lock"
+        try:
+            os.makedirs(os.path.dirname(lock_file), exist_ok=True)
+        except OSError:
+            return super().get_lock_file()
+
+        if os.path.exists(lock_file):
+            writable = os.access(lock_file, os.W_OK)
+        else:
+            writable = os.access(os.path.dirname(lock_file), os.W_OK)
+        return lock_file if writable else super().get_lock_file()
+
+    def _get_file(self, user: bool) -> str:
+        return self.user_file if user else self.system_file
+
+    def _write(self, filename: str, variables: dict):
+        """
+        Replaces the block in a file, changing only the given variables. The file is
+        replaced atomically, so that shells never read a partial profile.
+        """
+        text, start, end = _read(filename)
+        block = _parse_block(text[start:end], filename)
+        block.update(variables)
+
+        new_block = _format_block(block, export=not filename.endswith(".conf"))
+        if new_block == text[start:end]:
+            return
+
+        if start == end and new_block:
+            # A new block goes at the end, on its own line.
+            start = end = len(text)
+            if text and not text.endswith("\n"):
+                new_block = "\n" + new_block
+
+        # Symbolic links, e.g. to a profile kept with other dotfiles, are kept.
+        target = os.path.realpath(filename)
+        temp = f"{target}.{os.getpid()}.tmp"
+
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(temp, "w", encoding="utf-8", newline="") as f:
+                f.write(text[:start] + new_block + text[end:])
+            try:
+                os.chmod(temp, os.stat(target).st_mode & 0o7777)
+            except FileNotFoundError:
+                pass
+            os.replace(temp, target)
+        except OSError as e:
+            try:
+                os.remove(temp)
+            except OSError:
+                pass
+            raise BackendError(f"Could not write '{filename}': {e}") from e
+
+
+def _read(filename: str):
+    """
+    Returns (text, start, end), where text[start:end] is the block, including its
+    markers. If there is no block, start and end are both 0.
+    """
+    try:
+        with open(filename, "r", encoding="utf-8", newline="") as f:
+            text = f.read()
+    except FileNotFoundError:
+        return "", 0, 0
+    except (OSError, ValueError) as e:
+        raise BackendError(f"Could not read '{filename}': {e}") from e
+
+    start = _find_line(text, BEGIN_MARKER, 0)
+    if start < 0:
+        return text, 0, 0
+
+    end = _find_line(text, END_MARKER, start)
+    if end < 0:
+        raise BackendError(f"'{filename}' has '{BEGIN_MARKER}' but no '{END_MARKER}'.")
+
+    newline = text.find("\n", end)
+    return text, start, len(text) if newline < 0 else newline + 1
+
+
+def _find_line(text: str, line: str, start: int) -> int:
+    """
+    Returns the index of the first line which is exactly `line`, or -1.
+    """
+    while True:
+        index = text.find(line, start)
+        if index < 0:
+            return -1
+
+        after = index + len(line)
+        line_start = index == 0 or text[index - 1] == "\n"
+        if line_start and text[after : after + 1] in ("", "\n", "\r"):
+            return index
+        start = after
+
+
+def _parse_block(block: str, filename: str) -> dict:
+    """
+    Returns the entries of each variable in a block, in order.
+    """
+    variables = {}
+
+    for line in block.splitlines()[1:-1]:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        if line.startswith("export "):
+            line = line[len("export ") :].lstrip()
+        var, _, value = line.partition("=")
+        suffix = f'${{{var}:+:${var}}}"'
+
+        if not (value.startswith('"') and value.endswith(suffix)):
+            raise BackendError(
+                f"Couldn't parse the line '{line}' in the pathmod block of "
+                f"'{filename}'; fix or remove it."
+            )
+
+        value = _unescape(value[1 : -len(suffix)])
+        variables[var] = [i for i in value.split(":") if i]
+
+    return variables
+
+
+def _format_block(variables: dict, export: bool) -> str:
+    lines = [
+        f"{'export ' if export else ''}{var}=\"{_escape(':'.join(entries))}"
+        f'${{{var}:+:${var}}}"'
+        for var, entries in variables.items()
+        if entries
+    ]
+    if not lines:
+        return ""
+
+    return "\n".join([BEGIN_MARKER, NOTICE] + lines + [END_MARKER]) + "\n"
+
+
+def _escape(value: str) -> str:
+    return "".join(f"\\{c}" if c in ESCAPED else c for c in value)
+
+
+def _unescape(value: str) -> str:
+    chars = []
+    escaped = False
+
+    for c in value:
+        if escaped:
+            if c not in ESCAPED:
+                chars.append("\\")
+            chars.append(c)
+            escaped = False
+        elif c == "\\":
+            escaped = True
+        else:
+            chars.append(c)
+
+    return "".join(chars)
+
+
+def _check_name(var: str):
+    if not var or var[0].isdigit() or not var.replace("_", "").isalnum():
+        raise BackendError(f"'{var}' isn't a valid name for an environment variable.")
+
+
+def _get_abs_path(filename: str) -> str:
+    return os.path.abspath(os.path.expanduser(filename))
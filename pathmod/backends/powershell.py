@@ -0,0 +1,128 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Reads and writes environment variables by spawning powershell.exe. This is slow, but
+is kept as a fallback for environments where the registry cannot be accessed directly.
+"""
+import subprocess
+
+from pathmod import timings
+from pathmod.backends import Backend, BackendError
+
+
+# Separates the values printed by `powershell_command_get_many()`.
+RECORD_SEPARATOR = "\x1e"
+
+
+def run_command(command: str):
+    timings.count("subprocess spawns")
+    with timings.phase("run Powershell"):
+        output = subprocess.check_output(command)
+
+    return output.decode("utf-8").replace("\r", "").rstrip()
+
+
+def _get_environment_var_target(user: bool) -> str:
+    return f"[System.EnvironmentVariableTarget]::{'User' if user else 'Machine'}"
+
+
+def powershell_command_get_path(user: bool, var: str = "PATH") -> str:
+    env_var_target = _get_environment_var_target(user)
+    return f'powershell.exe /c "[System.Environment]::GetEnvironmentVariable("""{var}""", {env_var_target})"'
+
+
+def powershell_command_set_path(value: str, user: bool, var: str = "PATH") -> str:
+    return f'powershell.exe /c "{_set_statement(var, value, user)}"'
+
+
+def powershell_command_get_many(names) -> str:
+    """
+    Returns a command which prints the values of several variables, separated by
+    RECORD_SEPARATOR.
+    """
+    values = ", ".join(
+        f"[System.Environment]::GetEnvironmentVariable('{var}', "
+        f"{_get_environment_var_target(user)})"
+        for var, user in names
+    )
+    return f'powershell.exe /c "@({values}) -join [char]{ord(RECORD_SEPARATOR)}"'
+
+
+def powershell_command_set_many(values) -> str:
+    statements = "; ".join(
+        _set_statement(var, value, user) for (var, user), value in values.items()
+    )
+    return f'powershell.exe /c "{statements}"'
+
+
+def _set_statement(var: str, value: str, user: bool) -> str:
+    env_var_target = _get_environment_var_target(user)
+
+    # A trailing backslash would escape the closing quotation marks.
+    if value.endswith("\\"):
+        value = value[:-1]
+
+    return (
+        f"[System.Environment]::"
+        f'SetEnvironmentVariable("""{var}""", """{value}""", {env_var_target})'
+    )
+
+
+class PowershellBackend(Backend):
+    name = "powershell"
+    concurrent_reads = True
+
+    def get(self, var: str, user: bool) -> str:
+        try:
+            return run_command(powershell_command_get_path(user, var)).strip()
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise BackendError(f"Could not read '{var}' using Powershell: {e}") from e
+
+    def set(self, var: str, value: str, user: bool) -> None:
+        try:
+            run_command(powershell_command_set_path(value, user, var))
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise BackendError(f"Could not write '{var}' using Powershell: {e}") from e
+
+    def get_many(self, names):
+        # Powershell is only started once.
+        names = list(names)
+        try:
+            output = run_command(powershell_command_get_many(names))
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise BackendError(f"Could not read variables using Powershell: {e}") from e
+
+        values = output.split(RECORD_SEPARATOR)
+        if len(values) != len(names):
+            raise BackendError(f"Unexpected output from Powershell: '{output}'")
+        return {name: value.strip() for name, value in zip(names, values)}
+
+    def set_many(self, values) -> None:
+        try:
+            run_command(powershell_command_set_many(values))
+        except (OSError, subprocess.CalledProcessError) as e:
+            raise BackendError(
+                f"Could not write variables using Powershell: {e}"
+            ) from e
+
+    def describe_set(self, var: str, value: str, user: bool) -> str:
+        return powershell_command_set_path(value, user, var)
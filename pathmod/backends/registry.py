@@ -0,0 +1,219 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Reads and writes environment variables directly in the registry, avoiding the cost of
+spawning Powershell.
+"""
+import winreg
+
+from pathmod.backends import Backend, BackendError
+
+USER_KEY = (winreg.HKEY_CURRENT_USER, "Environment")
+SYSTEM_KEY = (
+    winreg.HKEY_LOCAL_MACHINE,
+    r"SYSTEM\CurrentControlSet\Control\Session Manager\Environment",
+)
+
+HWND_BROADCAST = 0xFFFF
+WM_SETTINGCHANGE = 0x001A
+SMTO_ABORTIFHUNG = 0x0002
+REG_NOTIFY_CHANGE_LAST_SET = 0x00000004
+
+# Maximum time to wait for each top-level window to process the broadcast.
+BROADCAST_TIMEOUT_MS = 2000
+
+
+class RegistryBackend(Backend):
+    name = "registry"
+
+    def get(self, var: str, user: bool) -> str:
+        return self.get_with_type(var, user)[0]
+
+    def get_with_type(self, var: str, user: bool):
+        """
+        Returns the raw (unexpanded) value of a variable along with its registry type.
+        """
+        root, subkey = USER_KEY if user else SYSTEM_KEY
+
+        try:
+            with winreg.OpenKey(root, subkey, 0, winreg.KEY_QUERY_VALUE) as key:
+                value, value_type = winreg.QueryValueEx(key, var)
+        except FileNotFoundError:
+            return "", None
+        except OSError as e:
+            raise BackendError(f"Could not read '{var}' from the registry: {e}") from e
+
+        return str(value), value_type
+
+    def set(self, var: str, value: str, user: bool) -> None:
+        root, subkey = USER_KEY if user else SYSTEM_KEY
+        value_type = self._value_type(var, value, user)
+
+        try:
+            with winreg.OpenKey(root, subkey, 0, winreg.KEY_SET_VALUE) as key:
+                winreg.SetValueEx(key, var, 0, value_type, value)
+        except OSError as e:
+            raise BackendError(f"Could not write '{var}' to the registry: {e}") from e
+
+    def get_many(self, names):
+        # Each key is only opened once.
+        values = {}
+        for user in (True, False):
+            scope_names = [var for var, u in names if u == user]
+            if not scope_names:
+                continue
+
+            root, subkey = USER_KEY if user else SYSTEM_KEY
+            try:
+                with winreg.OpenKey(root, subkey, 0, winreg.KEY_QUERY_VALUE) as key:
+                    for var in scope_names:
+                        try:
+                            values[(var, user)] = str(winreg.QueryValueEx(key, var)[0])
+                        except FileNotFoundError:
+                            values[(var, user)] = ""
+            except FileNotFoundError:
+                values.update(((var, user), "") for var in scope_names)
+            except OSError as e:
+                raise BackendError(
+                    f"Could not read {', '.join(scope_names)} from the registry: {e}"
+                ) from e
+
+        return values
+
+    def set_many(self, values) -> None:
+        for user in (True, False):
+            scope_values = {var: v for (var, u), v in values.items() if u == user}
+            if not scope_values:
+                continue
+
+            root, subkey = USER_KEY if user else SYSTEM_KEY
+            access = winreg.KEY_QUERY_VALUE | winreg.KEY_SET_VALUE
+            try:
+                with winreg.OpenKey(root, subkey, 0, access) as key:
+                    for var, value in scope_values.items():
+                        try:
+                            existing = winreg.QueryValueEx(key, var)[1]
+                        except FileNotFoundError:
+                            existing = None
+                        value_type = _choose_type(var, value, existing)
+                        winreg.SetValueEx(key, var, 0, value_type, value)
+            except OSError as e:
+                raise BackendError(
+                    f"Could not write {', '.join(scope_values)} to the registry: {e}"
+                ) from e
+
+    def broadcast(self) -> None:
+        # Imported here since ctypes is slow to import, and reads don't need it.
+        import ctypes
+
+        user32 = ctypes.windll.user32
+        user32.SendMessageTimeoutW.argtypes = [
+            ctypes.c_void_p,
+            ctypes.c_uint,
+            ctypes.c_size_t,
+            ctypes.c_wchar_p,
+            ctypes.c_uint,
+            ctypes.c_uint,
+            ctypes.POINTER(ctypes.c_size_t),
+        ]
+
+        result = ctypes.c_size_t()
+        user32.SendMessageTimeoutW(
+            HWND_BROADCAST,
+            WM_SETTINGCHANGE,
+            0,
+            "Environment",
+            SMTO_ABORTIFHUNG,
+            BROADCAST_TIMEOUT_MS,
+            ctypes.byref(result),
+        )
+
+    def wait_for_change(self, timeout: float) -> None:
+        import ctypes
+
+        advapi32 = ctypes.windll.advapi32
+        kernel32 = ctypes.windll.kernel32
+        kernel32.CreateEventW.restype = ctypes.c_void_p
+        kernel32.WaitForMultipleObjects.argtypes = [
+            ctypes.c_uint,
+            ctypes.POINTER(ctypes.c_void_p),
+            ctypes.c_int,
+            ctypes.c_uint,
+        ]
+        advapi32.RegNotifyChangeKeyValue.argtypes = [
+            ctypes.c_void_p,
+            ctypes.c_int,
+            ctypes.c_uint,
+            ctypes.c_void_p,
+            ctypes.c_int,
+        ]
+
+        keys = []
+        events = []
+        try:
+            for root, subkey in (USER_KEY, SYSTEM_KEY):
+                key = winreg.OpenKey(root, subkey, 0, winreg.KEY_NOTIFY)
+                keys.append(key)
+
+                event = kernel32.CreateEventW(None, True, False, None)
+                events.append(event)
+                advapi32.RegNotifyChangeKeyValue(
+                    key.handle, False, REG_NOTIFY_CHANGE_LAST_SET, event, True
+                )
+
+            handles = (ctypes.c_void_p * len(events))(*events)
+            kernel32.WaitForMultipleObjects(
+                len(events), handles, False, int(timeout * 1000)
+            )
+        except OSError as e:
+            raise BackendError(f"Could not watch the registry: {e}") from e
+        finally:
+            for key in keys:
+                key.Close()
+            for event in events:
+                kernel32.CloseHandle(ctypes.c_void_p(event))
+
+    def describe_set(self, var: str, value: str, user: bool) -> str:
+        root = "HKEY_CURRENT_USER" if user else "HKEY_LOCAL_MACHINE"
+        subkey = (USER_KEY if user else SYSTEM_KEY)[1]
+        value_type = (
+            "REG_EXPAND_SZ"
+            if self._value_type(var, value, user) == winreg.REG_EXPAND_SZ
+            else "REG_SZ"
+        )
+        return f"Set '{root}\\{subkey}\\{var}' ({value_type}) to:\n\n{value}"
+
+    def _value_type(self, var: str, value: str, user: bool) -> int:
+        """
+        Keeps the existing type of the value, so that entries like '%USERPROFILE%\\bin'
+        continue to be expanded.
+        """
+        return _choose_type(var, value, self.get_with_type(var, user)[1])
+
+
+def _choose_type(var: str, value: str, value_type) -> int:
+    if value_type not in (winreg.REG_SZ, winreg.REG_EXPAND_SZ):
+        value_type = winreg.REG_EXPAND_SZ if var.upper() == "PATH" else winreg.REG_SZ
+    if "%" in value:
+        value_type = winreg.REG_EXPAND_SZ
+
+    return value_type
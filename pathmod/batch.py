@@ -0,0 +1,225 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Applies many add/prepend/remove operations as a single transaction: each PATH is read
+once, every operation is applied in memory, and each changed PATH is written once.
+Operations on other list variables, such as PSModulePath, are read and written in the
+same batch.
+"""
+import sys
+from collections import OrderedDict, namedtuple
+from typing import Iterable, List
+
+from pathmod import pathutils, timings
+from pathmod.backends import get_backend
+from pathmod.compact import compact_entry
+from pathmod.pathkey import normalize
+
+ACTIONS = ("add", "prepend", "remove")
+
+Operation = namedtuple("Operation", ["action", "location", "system", "var", "source"])
+
+
+def parse_operations(lines: Iterable[str]) -> List[Operation]:
+    """
+    Parses operations with the format
+    "<action> [-s|--system] [--var <name>] <location>", e.g.
+
+        add ~/scripts
+        prepend -s "C:\\Program Files\\my program"
+        add --var PSModulePath ~/modules
+        remove .
+
+    Blank lines and lines starting with '#' are ignored.
+    """
+    operations = []
+    errors = []
+
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        action, _, rest = line.partition(" ")
+        action = action.lower()
+        rest = rest.strip()
+
+        system = False
+        var = "PATH"
+        while True:
+            flag, _, value = rest.partition(" ")
+            if flag in ("-s", "--system"):
+                system = True
+                rest = value.strip()
+            elif flag == "--var" and value.strip():
+                var, _, rest = value.strip().partition(" ")
+                rest = rest.strip()
+            else:
+                break
+
+        location = rest
+        if len(location) > 1 and location[0] == location[-1] and location[0] in "\"'":
+            location = location[1:-1]
+
+        if action not in ACTIONS:
+            errors.append(f"'{line}': unknown action '{action}'")
+        elif not location:
+            errors.append(f"'{line}': no location given")
+        else:
+            operations.append(Operation(action, location, system, var, line))
+
+    if errors:
+        print("Error: could not parse operations:\n")
+        for e in errors:
+            print(f"\t{e}")
+        sys.exit(1)
+
+    return operations
+
+
+def apply_operations(
+    operations: List[Operation], dry_run: bool, force: bool, compact: bool = True
+):
+    if not operations:
+        print("Error: no operations to apply.")
+        sys.exit(1)
+
+    names = {}
+    resolved = [
+        op._replace(
+            # Variable names are case-insensitive, so each is spelled one way.
+            var=names.setdefault(op.var.upper(), op.var),
+            location=pathutils.resolve_entry(
+                op.location, op.var, remove=op.action == "remove", force=force
+            ),
+        )
+        for op in operations
+    ]
+    check_conflicts(resolved)
+
+    # Every variable is read in one batch, PATH first.
+    keys = sorted({(op.var, op.system) for op in resolved}, key=_sort_key)
+    before, after = _plan(resolved, keys, force=force, compact=compact)
+
+    print()
+    for var, system in after:
+        print_diff(before[(var, system)], after[(var, system)], system=system, var=var)
+
+    if not after:
+        print("No changes to make.")
+        return
+
+    def replan():
+        before, after = _plan(resolved, keys, force=force, compact=compact)
+        return after, before
+
+    pathutils.commit_variables(
+        after, dry_run=dry_run, force=force, expected=before, replan=replan
+    )
+
+
+def check_conflicts(operations: List[Operation]):
+    """
+    Exits if the same location is both added to and removed from a PATH, since the
+    result would depend on the order of the operations.
+    """
+    seen = {}
+    conflicts = []
+
+    for op in operations:
+        # Compared like PATH entries, so 'C:\Tools' and 'c:\tools\' are the same.
+        key = (op.var.upper(), op.system, normalize(op.location))
+        adding = op.action != "remove"
+
+        if key in seen and (seen[key].action != "remove") != adding:
+            conflicts.append((seen[key], op))
+        seen.setdefault(key, op)
+
+    if conflicts:
+        print("Error: conflicting operations:\n")
+        for first, second in conflicts:
+            print(f"\t'{first.source}' conflicts with '{second.source}'")
+        sys.exit(1)
+
+
+def print_diff(before: str, after: str, system: bool, var: str = "PATH"):
+    scope = "[system]" if system else "[user]  "
+    if var != "PATH":
+        scope = f"{scope} {var}"
+    old = [i for i in before.split(";") if i]
+    new = [i for i in after.split(";") if i]
+
+    old_set = set(old)
+    new_set = set(new)
+
+    for item in old:
+        if item not in new_set:
+            print(f"- {scope}\t'{item}'")
+    for item in new:
+        if item not in old_set:
+            print(f"+ {scope}\t'{item}'")
+
+
+def _sort_key(key):
+    var, system = key
+    return var.upper() != "PATH", var.upper(), system
+
+
+def _plan(operations: List[Operation], keys, force: bool, compact: bool):
+    """
+    Reads the variables and applies the operations to them, returning the values
+    which were read and the new values of those which changed.
+    """
+    backend = get_backend()
+    # The system variables are read too, in case a user variable needs a copy.
+    seeded = {
+        var for var, system in keys if pathutils.replaces_system(var, system, backend)
+    }
+    reads = list(keys) + [(var, True) for var in seeded if (var, True) not in keys]
+
+    with timings.phase("read PATH"):
+        values = backend.get_many((var, not system) for var, system in reads)
+
+    before = OrderedDict((key, values[(key[0], not key[1])]) for key in keys)
+    after = OrderedDict(before)
+
+    for op in operations:
+        key = (op.var, op.system)
+        if op.var in seeded and not op.system and op.action != "remove":
+            # See `replaces_system()`.
+            after[key] = after[key] or values[(op.var, False)]
+
+        location = op.location
+        if compact and op.action != "remove" and pathutils.is_location_variable(op.var):
+            location = compact_entry(location, system=op.system)
+
+        after[key] = pathutils.edit_path_str(
+            after[key],
+            location,
+            system=op.system,
+            prepend=op.action == "prepend",
+            force=force,
+            remove=op.action == "remove",
+            var=op.var,
+        )
+
+    return before, OrderedDict((k, v) for k, v in after.items() if v != before[k])
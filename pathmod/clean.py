@@ -0,0 +1,145 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Removes duplicate and dead entries from the user and system PATH.
+"""
+import os
+import stat
+from typing import List, Tuple
+
+from pathmod import pathutils, probe
+from pathmod.pathlist import PathList, normalize
+
+
+def clean(system: bool, dry_run: bool, keep_missing: bool, timeout: float):
+    """
+    Removes duplicates within and between the user and system PATH, and locations
+    which no longer exist. The user PATH is always cleaned; the system PATH is only
+    cleaned if `system` is set, but its entries are still used to find duplicates.
+    """
+    # Locations are probed once, even if the PATH is read again after a conflict.
+    results = {}
+    before, after, removals, warnings = _plan(system, keep_missing, timeout, results)
+
+    print()
+    for is_system, entry, reason in removals:
+        print(f"{_scope(is_system)}\t'{entry}'\t{reason}")
+    for is_system, entry, reason in warnings:
+        print(f"{_scope(is_system)}\t'{entry}'\tkept: {reason}")
+
+    if not after:
+        print("The PATH is already clean.")
+        return
+
+    def replan():
+        before, after, _, _ = _plan(system, keep_missing, timeout, results)
+        return after, before
+
+    pathutils.commit_paths(after, dry_run=dry_run, expected=before, replan=replan)
+
+
+def _plan(system: bool, keep_missing: bool, timeout: float, results: dict):
+    """
+    Reads both PATHs and finds the entries to remove, returning (before, after,
+    removals, warnings), where `after` has only the PATHs which change. Locations
+    are only probed if they aren't already in `results`.
+    """
+    # An entry is only redundant if it appears earlier in the order a new session
+    # searches the PATHs.
+    order = pathutils.get_search_order()
+    before = {
+        is_system: pathutils.read_persisted_path(user=not is_system, use_snapshot=False)
+        for is_system in order
+    }
+    current = [(is_system, PathList.parse(before[is_system])) for is_system in order]
+
+    expanded = {
+        entry: os.path.expandvars(entry.strip('"'))
+        for _, paths in current
+        for entry in paths
+    }
+    new = [i for i in expanded.values() if i not in results]
+    if new:
+        results.update(probe.probe(new, os.stat, timeout=timeout))
+
+    cleaned = {True: PathList(), False: PathList()}
+    seen_keys = {}
+    seen_identities = {}
+    removals: List[Tuple[bool, str, str]] = []
+    warnings: List[Tuple[bool, str, str]] = []
+
+    for is_system, paths in current:
+        can_remove = system or not is_system
+
+        for entry in paths:
+            key = normalize(entry)
+            result = results[expanded[entry]]
+            reason = None
+            identity = None
+
+            if key in seen_keys:
+                reason = f"duplicate of {_describe(*seen_keys[key])}"
+            elif result.timed_out:
+                warnings.append((is_system, entry, f"timed out after {timeout}s"))
+            elif isinstance(result.error, (FileNotFoundError, NotADirectoryError)):
+                if "%" in expanded[entry] or "$" in expanded[entry]:
+                    warnings.append((is_system, entry, "contains unknown variables"))
+                elif not keep_missing:
+                    reason = "does not exist"
+            elif result.error is not None:
+                warnings.append(
+                    (is_system, entry, f"could not be read: {result.error}")
+                )
+            elif not stat.S_ISDIR(result.value.st_mode):
+                reason = "not a directory"
+            elif result.value.st_ino:
+                identity = (result.value.st_dev, result.value.st_ino)
+                if identity in seen_identities:
+                    reason = f"same location as {_describe(*seen_identities[identity])}"
+
+            if reason and can_remove:
+                removals.append((is_system, entry, reason))
+                continue
+            if reason:
+                warnings.append(
+                    (is_system, entry, f"{reason} (use '--system' to remove)")
+                )
+
+            cleaned[is_system].append(entry)
+            seen_keys.setdefault(key, (is_system, entry))
+            if identity is not None:
+                seen_identities.setdefault(identity, (is_system, entry))
+
+    after = {
+        is_system: str(cleaned[is_system])
+        for is_system, paths in current
+        if cleaned[is_system].entries != paths.entries
+    }
+    return before, after, removals, warnings
+
+
+def _scope(is_system: bool) -> str:
+    return "[system]" if is_system else "[user]  "
+
+
+def _describe(is_system: bool, entry: str) -> str:
+    return f"{_scope(is_system).strip()} '{entry}'"
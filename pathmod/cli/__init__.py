@@ -19,14 +19,39 @@
 #  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
+import sys
+
 import click
 
 from pathmod import __version__
+from pathmod.errors import PathmodError, format_error
 
 
 @click.group()
-def root():
-    pass
+@click.option(
+    "--timings",
+    "show_timings",
+    is_flag=True,
+    help="Print how long each phase of the command took",
+)
+@click.pass_context
+def root(ctx, show_timings: bool):
+    if show_timings:
+        from pathmod import timings
+
+        timings.enable()
+        ctx.call_on_close(timings.print_summary)
+
+
+def run():
+    """
+    Runs the command line, printing pathmod's errors rather than a traceback.
+    """
+    try:
+        root()
+    except PathmodError as e:
+        print(format_error(e))
+        sys.exit(1)
 
 
 @root.command("version", help="Show pathmod version")
@@ -19,12 +19,14 @@
 #  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
+import sys
 import time
 
 import click
 
 from pathmod import pathutils
 from pathmod.cli import root
+from pathmod.refresh import SHELLS
 
 
 def add_options(options):
@@ -57,46 +59,174 @@ force = click.option(
     help="Proceed even if the location does not exist or is already on the PATH",
 )
 
+compact = click.option(
+    "--compact/--no-compact",
+    default=True,
+    show_default=True,
+    help="Store the location using variables such as %USERPROFILE% when that is shorter",
+)
+
+hive = click.option(
+    "--hive",
+    "hives",
+    multiple=True,
+    metavar="PATTERN",
+    help="Modify the PATH in offline registry hives (e.g. 'C:\\Users\\*\\NTUSER.DAT') "
+    "instead; may be a glob and may be repeated",
+)
+
+variables = click.option(
+    "--var",
+    "variables",
+    multiple=True,
+    default=["PATH"],
+    metavar="NAME",
+    help="The variable to modify, e.g. PSModulePath; may be repeated to modify "
+    "several variables at once  [default: PATH]",
+)
+
+jobs = click.option(
+    "-j",
+    "--jobs",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Number of hives to modify in parallel when using '--hive' [default: one per CPU]",
+)
+
+
+def modify(hives, jobs: int, **kwargs):
+    """
+    Modifies the PATH, or the PATH in each offline hive if any are given.
+    """
+    # Variable names are case-insensitive, so e.g. PSModulePath is changed once.
+    kwargs["variables"] = pathutils.get_unique_names(kwargs["variables"])
+
+    if hives:
+        from pathmod import offline
+
+        offline.modify_hives(hives, jobs=jobs, **kwargs)
+    else:
+        modify_path(**kwargs)
+
+
+def modify_path(
+    target: str,
+    prepend: bool,
+    remove: bool,
+    dry_run: bool,
+    system: bool,
+    force: bool,
+    compact: bool = True,
+    variables=("PATH",),
+):
+    from pathmod.editor import PathEditor
+
+    # Entries of variables such as PATHEXT are used exactly as given.
+    if all(pathutils.is_location_variable(var) for var in variables):
+        target, file = pathutils.find_location(target, remove=remove, force=force)
+        if file:
+            print(f"'{file}' is a file; using its parent folder instead.")
+
+    editor = PathEditor(compact=compact)
+    # The system variables are read too, in case a user variable needs a copy.
+    seeded = [
+        var
+        for var in variables
+        if not remove and pathutils.replaces_system(var, system, editor.backend)
+    ]
+    editor.load([(var, system) for var in variables] + [(var, True) for var in seeded])
+    scope = "system" if system else "user"
+
+    for var in variables:
+        seed = editor.get_paths(True, var) if var in seeded else None
+        if seed and not editor.get_paths(system, var):
+            print(
+                f"The user {var} is empty and would replace the system {var}, so it "
+                f"will start as a copy of it."
+            )
+
+        if remove:
+            for entry in editor.remove(target, system=system, var=var):
+                print(f"Removing '{entry}' from the {scope} {var}")
+        else:
+            entry = editor.add(
+                target, system=system, prepend=prepend, force=force, var=var
+            )
+            print(f"Adding '{entry}' to the {scope} {var}...")
+
+    pathutils.commit_variables(
+        editor.get_changes(), dry_run=dry_run, force=force, editor=editor
+    )
+
 
 @root.command("add", help="Add (append) a location to the PATH")
 @click.argument("location")
-@add_options([dry_run, system, force])
-def append(location: str, dry_run: bool, system: bool, force: bool):
-    pathutils.modify_path(
-        location,
+@add_options([dry_run, system, force, compact, variables, hive, jobs])
+def append(
+    location: str,
+    dry_run: bool,
+    system: bool,
+    force: bool,
+    compact: bool,
+    variables,
+    hives,
+    jobs: int,
+):
+    modify(
+        hives,
+        jobs,
+        target=location,
         prepend=False,
         remove=False,
         dry_run=dry_run,
         system=system,
         force=force,
+        compact=compact,
+        variables=variables,
     )
 
 
 @root.command("prepend", help="Prepend a location to the PATH")
 @click.argument("location")
-@add_options([dry_run, system, force])
-def prepend(location: str, dry_run: bool, system: bool, force: bool):
-    pathutils.modify_path(
-        location,
+@add_options([dry_run, system, force, compact, variables, hive, jobs])
+def prepend(
+    location: str,
+    dry_run: bool,
+    system: bool,
+    force: bool,
+    compact: bool,
+    variables,
+    hives,
+    jobs: int,
+):
+    modify(
+        hives,
+        jobs,
+        target=location,
         prepend=True,
         remove=False,
         dry_run=dry_run,
         system=system,
         force=force,
+        compact=compact,
+        variables=variables,
     )
 
 
 @root.command("remove", help="Remove a location from the PATH")
 @click.argument("location")
-@add_options([dry_run, system])
-def remove(location: str, dry_run: bool, system: bool):
-    pathutils.modify_path(
-        location,
+@add_options([dry_run, system, variables, hive, jobs])
+def remove(location: str, dry_run: bool, system: bool, variables, hives, jobs: int):
+    modify(
+        hives,
+        jobs,
+        target=location,
         remove=True,
         system=system,
         prepend=False,
         force=False,
         dry_run=dry_run,
+        variables=variables,
     )
 
 
@@ -113,31 +243,446 @@ def remove(location: str, dry_run: bool, system: bool):
     is_flag=True,
     help="Only print the command needed to execute the Powershell script",
 )
-def refresh(generate: bool, quiet: bool):
+@click.option(
+    "-e",
+    "--expression",
+    is_flag=True,
+    help="Print a Powershell expression which updates the current session in-place, "
+    "keeping entries which were only added to the session",
+)
+@click.option(
+    "--shell",
+    type=click.Choice(SHELLS),
+    default="powershell",
+    show_default=True,
+    help="The shell to print the expression for",
+)
+@click.option(
+    "--hook",
+    type=click.Choice(SHELLS),
+    help="Print code for the shell's profile which refreshes the session "
+    "automatically, only starting pathmod when the PATH has changed",
+)
+def refresh(generate: bool, quiet: bool, expression: bool, shell: str, hook: str):
     from pathmod import refresh
 
-    if generate:
+    if hook:
+        print(refresh.hook(hook))
+    elif expression:
+        print(refresh.expression(shell))
+    elif generate:
         refresh.generate(quiet=quiet)
     else:
         refresh.print_command()
 
 
+@root.command(
+    "exec",
+    help="Run a command with a modified PATH, without changing the persistent PATH",
+    context_settings={"ignore_unknown_options": True, "allow_interspersed_args": False},
+)
+@click.option(
+    "-p",
+    "--prepend",
+    multiple=True,
+    metavar="LOCATION",
+    help="Add a location to the start of the PATH; may be repeated",
+)
+@click.option(
+    "-a",
+    "--add",
+    multiple=True,
+    metavar="LOCATION",
+    help="Add a location to the end of the PATH; may be repeated",
+)
+@click.option(
+    "-r",
+    "--remove",
+    multiple=True,
+    metavar="LOCATION",
+    help="Remove a location from the PATH; may be repeated",
+)
+@add_options([dry_run])
+@click.argument("command", nargs=-1, required=True, type=click.UNPROCESSED)
+def exec_command(prepend, add, remove, dry_run: bool, command):
+    import os
+
+    from pathmod import execute
+
+    path = execute.build_path(
+        os.environ.get("PATH", ""), prepend=prepend, add=add, remove=remove
+    )
+    sys.exit(execute.run(list(command), path, dry_run=dry_run))
+
+
 @root.command("show", help="Show the current PATH")
-def show():
-    user = pathutils.get_current_path(user=True)
-    system = pathutils.get_current_path(user=False)
+@click.option(
+    "-S",
+    "--shadowed",
+    is_flag=True,
+    help="Also list commands which are hidden by a location earlier on the PATH",
+)
+@click.option(
+    "-l",
+    "--details",
+    is_flag=True,
+    help="Check each location, showing whether it exists and how many executables it has",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["text", "json", "csv"]),
+    default="text",
+    show_default=True,
+    help="Output format; 'json' prints one object per line",
+)
+@click.option(
+    "-t",
+    "--timeout",
+    type=float,
+    default=2.0,
+    show_default=True,
+    help="Seconds to wait for each location when using '--details'",
+)
+def show(shadowed: bool, details: bool, output_format: str, timeout: float):
+    from pathmod import show
+
+    show.show(
+        shadowed=shadowed,
+        details=details,
+        output_format=output_format,
+        timeout=timeout,
+    )
+
+
+@root.command(
+    "doctor",
+    help="Measure how much each location on the PATH slows down looking up commands",
+)
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+    help="Output format; 'json' prints one object per line",
+)
+@click.option(
+    "-t",
+    "--timeout",
+    type=float,
+    default=2.0,
+    show_default=True,
+    help="Seconds to wait for each location",
+)
+@click.option(
+    "--threshold",
+    type=float,
+    default=50.0,
+    show_default=True,
+    help="Flag locations which add at least this many milliseconds to each lookup",
+)
+def doctor(output_format: str, timeout: float, threshold: float):
+    from pathmod import doctor
+
+    if doctor.doctor(output_format=output_format, timeout=timeout, threshold=threshold):
+        sys.exit(1)
+
+
+@root.command("which", help="Show every executable which a command could run")
+@click.argument("command")
+@click.option("-r", "--rebuild", is_flag=True, help="Rebuild the index of executables")
+def which(command: str, rebuild: bool):
+    from pathmod import index, show
+
+    matches = index.find(index.load_index(rebuild=rebuild), command)
+    if not matches:
+        print(f"Error: '{command}' not found on the PATH.")
+        sys.exit(1)
+
+    for n, match in enumerate(matches):
+        print(f"{show.format_match(match)}{'' if n == 0 else '  (shadowed)'}")
+
+
+@root.command(
+    "apply",
+    help="Apply many operations, reading and writing each PATH only once. "
+    "Each operation has the format '<add|prepend|remove> [-s] [--var NAME] "
+    "<location>'",
+)
+@click.argument("operations", nargs=-1)
+@click.option(
+    "-i",
+    "--input",
+    "input_file",
+    type=click.File("r"),
+    help="Read operations from a file, one per line ('-' for stdin)",
+)
+@add_options([dry_run, force, compact])
+def apply(operations, input_file, dry_run: bool, force: bool, compact: bool):
+    from pathmod import batch
+
+    lines = list(operations)
+    if input_file:
+        lines.extend(input_file.read().splitlines())
+
+    batch.apply_operations(
+        batch.parse_operations(lines), dry_run=dry_run, force=force, compact=compact
+    )
+
+
+@root.command(
+    "sync",
+    help="Make the PATH match a manifest, which lists the entries each PATH should "
+    "contain, making as few changes as possible",
+)
+@click.argument("manifest", type=click.File("r"))
+@add_options([dry_run, force])
+def sync(manifest, dry_run: bool, force: bool):
+    from pathmod import sync
+
+    sync.sync(
+        sync.parse_manifest(manifest.read().splitlines()), dry_run=dry_run, force=force
+    )
+
+
+@root.command("history", help="Show the changes pathmod has made, newest first")
+@click.option(
+    "-n",
+    "--limit",
+    type=click.IntRange(min=0),
+    default=20,
+    show_default=True,
+    help="The number of changes to show (0 for all)",
+)
+def show_history(limit: int):
+    from pathmod import history
 
-    print()
-    h = "-" * 70
-    print(h)
-    print(f"Path\t\tLocation")
-    print(h, end="\n\n")
+    history.print_history(limit)
 
-    for i in user:
-        print(f"[user]   \t'{i}'")
 
-    print()
-    for i in system:
-        print(f"[system]\t'{i}'")
+restore_force = click.option(
+    "-f",
+    "--force",
+    is_flag=True,
+    help="Proceed even if the variables have since been changed by other programs",
+)
+
+
+@root.command(
+    "undo",
+    help="Undo the last change (or the last COUNT changes) with a single write",
+)
+@click.argument("count", type=click.IntRange(min=1), default=1)
+@add_options([dry_run, restore_force])
+def undo(count: int, dry_run: bool, force: bool):
+    from pathmod import history
+
+    history.undo(count, dry_run=dry_run, force=force)
+
+
+@root.command(
+    "rollback",
+    help="Restore the variables as they were just after the change with the given "
+    "ID (see 'pathmod history'), with a single write",
+)
+@click.argument("entry_id", metavar="ID", type=int)
+@add_options([dry_run, restore_force])
+def rollback(entry_id: int, dry_run: bool, force: bool):
+    from pathmod import history
+
+    history.rollback(entry_id, dry_run=dry_run, force=force)
+
+
+@root.command(
+    "clean", help="Remove duplicate and non-existent locations from the user PATH"
+)
+@click.option(
+    "-s",
+    "--system",
+    is_flag=True,
+    help="[Requires elevated shell] Also clean the system PATH",
+)
+@click.option(
+    "-k",
+    "--keep-missing",
+    is_flag=True,
+    help="Only remove duplicates, keeping locations which do not exist",
+)
+@click.option(
+    "-t",
+    "--timeout",
+    type=float,
+    default=2.0,
+    show_default=True,
+    help="Seconds to wait for each location before keeping it as-is",
+)
+@add_options([dry_run])
+def clean(system: bool, keep_missing: bool, timeout: float, dry_run: bool):
+    from pathmod import clean
+
+    clean.clean(
+        system=system, dry_run=dry_run, keep_missing=keep_missing, timeout=timeout
+    )
+
+
+@root.command(
+    "compact",
+    help="Shorten the PATH by using variables such as %USERPROFILE% and %ProgramFiles%",
+)
+@add_options([dry_run, system])
+def compact_path(dry_run: bool, system: bool):
+    from pathmod import compact
+
+    compact.compact_persisted_path(system=system, dry_run=dry_run)
+
+
+@root.group("usage", help="Record which locations on the PATH are used (opt-in)")
+def usage():
+    pass
+
+
+@usage.command("hook", help="Show the Powershell code which records usage")
+def usage_hook():
+    from pathmod import usage
+
+    print(
+        f"To record the executables you run, add this to your Powershell profile "
+        f"(see $PROFILE):\n"
+    )
+    print(usage.get_hook(), end="\n\n")
+
+
+@usage.command("show", help="Show how often each location has been used")
+def usage_show():
+    from pathmod import usage
+
+    counts = usage.get_usage()
+    if not counts:
+        print("No usage has been recorded.")
+        return
+
+    for location, count in sorted(counts.items(), key=lambda i: -i[1]):
+        print(f"{count:>8}\t'{location}'")
+
+
+@usage.command("clear", help="Delete the recorded usage")
+def usage_clear():
+    from pathmod import usage
+
+    usage.clear()
+    print("Recorded usage deleted.")
+
+
+@root.group(
+    "dir",
+    help="Add the locations in '.pathmod' files to the session's PATH while in "
+    "their directory",
+)
+def directory():
+    pass
+
+
+@directory.command("hook", help="Show the code for your shell's profile")
+@click.argument("shell", type=click.Choice(["powershell", "posix"]))
+def directory_hook(shell: str):
+    from pathmod import activate
+
+    print(activate.get_hook(shell))
+
+
+@directory.command(
+    "allow", help="Allow a '.pathmod' file (by default, the nearest) to be used"
+)
+@click.argument("filename", required=False)
+def directory_allow(filename: str):
+    import os
+
+    from pathmod import activate
+
+    filename = filename or activate.find_file(os.getcwd())
+    if not filename or not os.path.isfile(filename):
+        print(f"Error: no '{activate.FILENAME}' file found.")
+        sys.exit(1)
+
+    activate.allow(filename)
+    print(f"Allowed '{os.path.abspath(filename)}'.")
+
+
+@directory.command(
+    "deny", help="Stop using a '.pathmod' file (by default, the nearest)"
+)
+@click.argument("filename", required=False)
+def directory_deny(filename: str):
+    import os
+
+    from pathmod import activate
+
+    filename = filename or activate.find_file(os.getcwd())
+    if not filename or not activate.deny(filename):
+        print(f"Error: '{filename or activate.FILENAME}' is not allowed.")
+        sys.exit(1)
+
+    print(f"'{os.path.abspath(filename)}' will no longer be used.")
+
+
+@directory.command(
+    "activate", help="Print code which adds the locations in a '.pathmod' file"
+)
+@click.argument("filename")
+@click.option(
+    "--shell",
+    type=click.Choice(["powershell", "posix"]),
+    default="powershell",
+    show_default=True,
+)
+def directory_activate(filename: str, shell: str):
+    from pathmod import activate
+
+    print(activate.activate(filename, shell))
+
+
+@root.command(
+    "reorder",
+    help="Move frequently used locations earlier on the PATH, "
+    "without changing which executable any command runs",
+)
+@add_options([dry_run, system])
+@click.option(
+    "-t",
+    "--timeout",
+    type=float,
+    default=2.0,
+    show_default=True,
+    help="Seconds to wait for each location; slow locations are not moved",
+)
+def reorder(dry_run: bool, system: bool, timeout: float):
+    from pathmod import reorder
+
+    reorder.reorder(system=system, dry_run=dry_run, timeout=timeout)
+
+
+@root.command(
+    "watch",
+    help="Keep a snapshot of the persistent PATH up to date, "
+    "so that other pathmod commands can read it quickly",
+)
+def watch():
+    import signal
+
+    from pathmod import snapshot
+
+    print(
+        f"Watching for changes to the PATH. The snapshot is stored in "
+        f"'{snapshot.get_snapshot_file()}'. Press Ctrl+C to stop.\n"
+    )
+
+    # Stop cleanly (removing the snapshot) when asked to terminate, e.g. by a service manager.
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
 
-    print()
+    try:
+        snapshot.watch(
+            on_change=lambda v: print(f"PATH changed (version {v}).", flush=True)
+        )
+    except KeyboardInterrupt:
+        print("Stopped watching.")
@@ -0,0 +1,176 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Shortens PATH entries by replacing well-known locations with environment variables,
+e.g. 'C:\\Users\\username\\AppData\\Local\\bin' becomes '%LOCALAPPDATA%\\bin'.
+"""
+import os
+from typing import List, Tuple
+
+from pathmod.pathlist import PathList
+
+# Variables which are defined for every user. Only these are used on the system
+# PATH, since it is also used by services running as other accounts.
+SYSTEM_VARIABLES = [
+    "SystemRoot",
+    "ProgramFiles",
+    "ProgramFiles(x86)",
+    "CommonProgramFiles",
+    "CommonProgramFiles(x86)",
+    "ProgramData",
+]
+
+USER_VARIABLES = SYSTEM_VARIABLES + ["USERPROFILE", "LOCALAPPDATA", "APPDATA"]
+
+# Beyond this length, a variable can't be read by programs at all.
+MAX_LENGTH = 32767
+
+# Beyond this length, some older programs (e.g. the Environment Variables dialog
+# before Windows 10) truncate the value.
+LEGACY_MAX_LENGTH = 2047
+
+
+def compact_entry(entry: str, system: bool) -> str:
+    """
+    Returns the shortest form of an entry using environment variables, or the entry
+    itself if it can't be shortened. Entries which already refer to a variable are
+    left as they are, since expanding one could replace it with a different one.
+    """
+    if has_reference(entry):
+        return entry
+
+    expanded = os.path.expandvars(entry)
+    folded = os.path.normcase(expanded)
+    best = entry
+
+    for var in SYSTEM_VARIABLES if system else USER_VARIABLES:
+        value = os.environ.get(var, "").rstrip("\\/")
+        if not value:
+            continue
+
+        prefix = os.path.normcase(value)
+        if folded == prefix or (
+            folded.startswith(prefix) and folded[len(prefix)] in "\\/"
+        ):
+            candidate = f"%{var}%{expanded[len(value):]}"
+            if len(candidate) < len(best):
+                best = candidate
+
+    return best
+
+
+def has_reference(entry: str) -> bool:
+    """
+    Returns whether an entry refers to an environment variable, like '%APPDATA%'.
+    """
+    return any(entry.split("%")[1:-1])
+
+
+def compact_path(path: str, system: bool) -> Tuple[str, List[Tuple[str, str]]]:
+    """
+    Returns the compacted PATH, along with the (old, new) entries which changed.
+    """
+    paths = PathList.parse(path)
+    result = PathList()
+    changes = []
+
+    for entry in paths:
+        compacted = compact_entry(entry, system)
+        result.append(compacted)
+        if compacted != entry:
+            changes.append((entry, compacted))
+
+    return str(result), changes
+
+
+def check_length(path: str, system: bool, var: str = "PATH") -> List[str]:
+    """
+    Returns warnings if the PATH (or another variable) would be too long, either as
+    stored or once its variables are expanded.
+    """
+    warnings = []
+    scope = f"{'system' if system else 'user'} {var}"
+
+    for description, value in (
+        ("stored", path),
+        ("expanded", os.path.expandvars(path)),
+    ):
+        if len(value) > MAX_LENGTH:
+            warnings.append(
+                f"The {description} {scope} would be {len(value)} characters long, "
+                f"which is more than the maximum of {MAX_LENGTH}."
+            )
+        elif len(value) > LEGACY_MAX_LENGTH:
+            warnings.append(
+                f"The {description} {scope} would be {len(value)} characters long; "
+                f"some older programs truncate values longer than {LEGACY_MAX_LENGTH}."
+            )
+
+    return warnings
+
+
+def is_too_long(path: str) -> bool:
+    return max(len(path), len(os.path.expandvars(path))) > MAX_LENGTH
+
+
+def get_savings(before: str, after: str) -> Tuple[int, int]:
+    """
+    Returns the (characters, bytes) saved. The registry stores values as UTF-16.
+    """
+    chars = len(before) - len(after)
+    return chars, chars * 2
+
+
+def compact_persisted_path(system: bool, dry_run: bool):
+    """
+    Rewrites the persistent PATH in its compact form, reporting the space saved.
+    """
+    # Imported here since pathutils uses this module.
+    from pathmod import pathutils
+    from pathmod.backends import get_backend
+
+    before = get_backend().get("PATH", user=not system)
+    after, changes = compact_path(before, system=system)
+
+    scope = "system" if system else "user"
+    if not changes:
+        print(f"The {scope} PATH can't be made any shorter.")
+        return
+
+    print()
+    for old, new in changes:
+        print(f"'{old}'\n  -> '{new}'")
+
+    chars, size = get_savings(before, after)
+    print(
+        f"\nThe {scope} PATH will be {chars} characters ({size} bytes) shorter: "
+        f"{len(before)} -> {len(after)} characters."
+    )
+
+    def replan():
+        before = get_backend().get("PATH", user=not system)
+        after, changes = compact_path(before, system=system)
+        return {system: after} if changes else {}, {system: before}
+
+    pathutils.commit_paths(
+        {system: after}, dry_run=dry_run, expected={system: before}, replan=replan
+    )
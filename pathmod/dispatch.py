@@ -0,0 +1,177 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Handles the commands which are run from shell profiles, such as 'refresh', without
+importing click or building the command group. Anything not recognised here is
+handled by the full CLI.
+
+This module must stay cheap to import: only import from the standard library
+modules which are already loaded at interpreter startup, and import anything else
+inside the functions which need it.
+"""
+import os
+import sys
+
+REFRESH_FLAGS = {
+    "-g": "generate",
+    "--generate": "generate",
+    "-q": "quiet",
+    "--quiet": "quiet",
+    "-e": "expression",
+    "--expression": "expression",
+}
+
+
+# Options which take a value, and the values they accept. The shell hooks run
+# 'refresh -e --shell <shell>', so these must not fall back to the full CLI.
+REFRESH_VALUES = {
+    "--shell": ("powershell", "cmd", "posix"),
+    "--hook": ("powershell", "cmd", "posix"),
+}
+
+# The directory hooks run 'dir activate' whenever a '.pathmod' file changes.
+ACTIVATE_VALUES = {"--shell": ("powershell", "posix")}
+
+
+def dispatch(args) -> bool:
+    """
+    Runs the command if it can be handled without the full CLI, returning
+    whether it was handled. Like the full CLI, pathmod's errors are printed rather
+    than raised.
+    """
+    try:
+        return _dispatch(args)
+    except Exception as e:
+        # Imported only when needed, to keep startup fast.
+        from pathmod.errors import PathmodError, format_error
+
+        if not isinstance(e, PathmodError):
+            raise
+        print(format_error(e))
+        sys.exit(1)
+
+
+def _dispatch(args) -> bool:
+    if not args:
+        return False
+
+    command, options = args[0], args[1:]
+
+    if command == "version" and not options:
+        from pathmod import __version__
+
+        print(f"v{__version__}")
+        return True
+
+    if command == "refresh":
+        values = _pop_values(options, REFRESH_VALUES)
+        flags = _parse_flags(options, REFRESH_FLAGS)
+        if values is None or flags is None:
+            return False
+
+        from pathmod import refresh
+
+        if "hook" in values:
+            print(refresh.hook(values["hook"]))
+        elif "expression" in flags:
+            print(refresh.expression(values.get("shell", "powershell")))
+        elif "generate" in flags:
+            refresh.generate(quiet="quiet" in flags)
+        else:
+            refresh.print_command()
+        return True
+
+    if command == "dir" and options[:1] == ["activate"]:
+        options = options[1:]
+        values = _pop_values(options, ACTIVATE_VALUES)
+        if values is None or len(options) != 1 or options[0].startswith("-"):
+            return False
+
+        from pathmod import activate
+
+        print(activate.activate(options[0], values.get("shell", "powershell")))
+        return True
+
+    return False
+
+
+def _parse_flags(options, known):
+    """
+    Returns the set of flags given, or None if there is an option which isn't a
+    known flag. Combined short flags such as '-gq' are supported.
+    """
+    flags = set()
+
+    for option in options:
+        if option in known:
+            flags.add(known[option])
+        elif option.startswith("-") and not option.startswith("--") and len(option) > 2:
+            for char in option[1:]:
+                if f"-{char}" not in known:
+                    return None
+                flags.add(known[f"-{char}"])
+        else:
+            return None
+
+    return flags
+
+
+def _pop_values(options, known):
+    """
+    Removes the options which take a value from `options`, returning their values,
+    or None if a value is missing or not accepted. Both '--shell posix' and
+    '--shell=posix' are supported.
+    """
+    values = {}
+    remaining = []
+    options_iter = iter(options)
+
+    for option in options_iter:
+        name, equals, value = option.partition("=")
+        if name not in known:
+            remaining.append(option)
+            continue
+
+        if not equals:
+            value = next(options_iter, None)
+        if value not in known[name]:
+            return None
+        values[name.lstrip("-")] = value
+
+    options[:] = remaining
+    return values
+
+
+def main():
+    # Checked here, rather than importing timings, to keep startup fast.
+    if os.environ.get("PATHMOD_PROFILE"):
+        import atexit
+
+        from pathmod import timings
+
+        timings.enable()
+        atexit.register(timings.write_record)
+
+    if not dispatch(sys.argv[1:]):
+        from pathmod.cli import run
+
+        run()
@@ -0,0 +1,191 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Measures how much each entry on the persistent PATH slows down looking up a command.
+Every command which isn't found (and every command found late on the PATH) is
+looked for in each location in turn, so a single stale mapped drive or slow network
+share delays all of them.
+"""
+import json
+import os
+import stat
+import sys
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List
+
+from pathmod import index, pathutils, probe
+from pathmod.errors import InvalidLocationError
+
+FIELDS = [
+    "scope",
+    "position",
+    "entry",
+    "expanded",
+    "exists",
+    "is_dir",
+    "access_ms",
+    "miss_ms",
+    "cost_ms",
+    "timed_out",
+    "slow",
+    "error",
+]
+
+
+def doctor(output_format: str, timeout: float, threshold: float) -> bool:
+    """
+    Checks every entry, printing them with the slowest first. Returns whether any
+    entry is slow.
+    """
+    rows = check_entries(*pathutils.get_current_paths(), timeout=timeout)
+    for row in rows:
+        row["slow"] = row["timed_out"] or row["cost_ms"] >= threshold
+
+    rows.sort(key=lambda row: -row["cost_ms"])
+
+    if output_format == "json":
+        for row in rows:
+            print(json.dumps(row))
+    else:
+        print_text(rows, threshold=threshold)
+
+    return any(row["slow"] for row in rows)
+
+
+def check_entries(user: List[str], system: List[str], timeout: float) -> List[Dict]:
+    """
+    Times accessing each location, and looking up a command which doesn't exist in
+    it, concurrently. A location which times out is counted as costing `timeout`,
+    although it may cost much more.
+    """
+    # A new session's PATH is the system PATH followed by the user PATH.
+    entries = [("system", i, entry) for i, entry in enumerate(system) if entry]
+    entries += [("user", i, entry) for i, entry in enumerate(user) if entry]
+
+    expanded = []
+    for _, _, entry in entries:
+        try:
+            expanded.append(pathutils.get_abs_path(entry.strip('"')))
+        except InvalidLocationError:
+            expanded.append(None)
+
+    names = get_miss_names()
+    results = probe.probe(
+        [i for i in expanded if i is not None],
+        lambda path: check_location(path, names),
+        timeout=timeout,
+    )
+
+    rows = []
+    for (scope, position, entry), path in zip(entries, expanded):
+        row = OrderedDict((field, None) for field in FIELDS)
+        row.update(scope=scope, position=position, entry=entry, expanded=path)
+        row.update(timed_out=False, cost_ms=0.0)
+
+        result = results.get(path)
+        if path is None:
+            row["error"] = "could not parse the location"
+        elif result.timed_out:
+            row.update(timed_out=True, cost_ms=round(timeout * 1000, 3))
+        elif result.error is not None:
+            row["error"] = str(result.error)
+        else:
+            row.update(result.value)
+
+        rows.append(row)
+
+    return rows
+
+
+def get_miss_names() -> List[str]:
+    """
+    Returns the filenames which are looked for when running a command which doesn't
+    exist: on Windows, the name with each extension in PATHEXT.
+    """
+    name = f"pathmod-doctor-{uuid.uuid4().hex[:12]}"
+    if sys.platform != "win32":
+        return [name]
+
+    return [name] + [name + ext for ext in index.get_pathext()]
+
+
+def check_location(path: str, names: List[str]) -> Dict:
+    start = time.perf_counter()
+    try:
+        st = os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        st = None
+    access_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    for name in names:
+        try:
+            os.stat(os.path.join(path, name))
+        except OSError:
+            pass
+    miss_ms = (time.perf_counter() - start) * 1000
+
+    return {
+        "exists": st is not None,
+        "is_dir": st is not None and stat.S_ISDIR(st.st_mode),
+        "access_ms": round(access_ms, 3),
+        "miss_ms": round(miss_ms, 3),
+        "cost_ms": round(access_ms + miss_ms, 3),
+    }
+
+
+def print_text(rows: List[Dict], threshold: float):
+    print()
+    h = "-" * 70
+    print(h)
+    print(f"Cost\t\tPath\t\tLocation")
+    print(h, end="\n\n")
+
+    for row in rows:
+        label = "[user]  " if row["scope"] == "user" else "[system]"
+        flag = "  <-- slow" if row["slow"] else ""
+        print(f"{_describe(row):>12}\t{label}\t'{row['entry']}'{flag}")
+
+    total = sum(row["cost_ms"] for row in rows)
+    slow = [row for row in rows if row["slow"]]
+
+    estimate = "at least" if any(row["timed_out"] for row in rows) else "about"
+    print(
+        f"\nLooking up a command which isn't on the PATH takes {estimate} "
+        f"{total:.1f} ms."
+    )
+    if slow:
+        print(
+            f"{len(slow)} location(s) add more than {threshold:g} ms each; consider "
+            f"removing them, or moving them to the end of the PATH."
+        )
+
+
+def _describe(row: Dict) -> str:
+    if row["timed_out"]:
+        return f">{row['cost_ms']:.0f} ms"
+    if row["error"]:
+        return "error"
+
+    return f"{row['cost_ms']:.1f} ms"
@@ -0,0 +1,289 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+The Python API for modifying the PATH. Nothing here prints or exits; errors are
+raised as the exceptions in `pathmod.errors`.
+
+    from pathmod.editor import PathEditor
+
+    editor = PathEditor()
+    editor.add(r"C:\\tools\\bin")
+    editor.remove(r"C:\\old", system=True)
+    editor.commit()
+
+Each PATH is read once, when it is first needed, and any number of changes are
+then made in memory. `commit()` writes only the PATHs which changed, and notifies
+running programs once.
+
+If another program changes the PATH between it being read and `commit()`, the
+changes are made again to the new PATH rather than overwriting it.
+
+Other variables which hold lists of entries separated by semicolons, such as
+PSModulePath, PYTHONPATH or PATHEXT, are modified in the same way by passing
+`var`; changes to several variables are read and written together:
+
+    editor.load([("PATH", False), ("PSModulePath", False)])
+    editor.add(r"C:\\tools\\bin")
+    editor.add(r"C:\\tools\\modules", var="PSModulePath")
+    editor.commit()
+"""
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from pathmod import lock, timings
+from pathmod.backends import Backend, get_backend
+from pathmod.compact import check_length, compact_entry
+from pathmod.errors import AlreadyOnPathError
+from pathmod.pathlist import PathList
+from pathmod.pathutils import (
+    Variable,
+    is_location_variable,
+    remove_from_path_list,
+    replaces_system,
+    resolve_entry,
+    write_with_retries,
+)
+
+
+class PathEditor:
+    """
+    Holds the user and system PATH while they are being modified. Other variables
+    which hold lists, such as PSModulePath or PYTHONPATH, can be modified too by
+    passing `var`; variables are keyed by (name, whether it is the system
+    variable), and PATHs by whether they are the system PATH, as elsewhere in
+    pathmod.
+    """
+
+    def __init__(self, backend: Optional[Backend] = None, compact: bool = True):
+        """
+        Uses the backend selected by the environment unless one is given. If
+        `compact` is set, added locations are stored using variables such as
+        %USERPROFILE% when that is shorter.
+        """
+        self.backend = backend or get_backend()
+        self.compact = compact
+        self._original: Dict[Variable, str] = {}
+        self._paths: Dict[Variable, PathList] = {}
+        # The changes made so far, so that they can be made again after a conflict.
+        self._operations: List[Tuple[Callable, tuple]] = []
+
+    def load(self, variables: Iterable[Variable]):
+        """
+        Reads several variables, keyed by (name, is_system), at once, rather than
+        each being read when it is first needed.
+        """
+        self._read([key for key in variables if key not in self._paths])
+
+    def get_paths(self, system: bool = False, var: str = "PATH") -> PathList:
+        """
+        Returns a copy of the entries of a PATH, including any changes which haven't
+        been committed.
+        """
+        return self._get(system, var).copy()
+
+    def show(self) -> Tuple[List[str], List[str]]:
+        """
+        Returns the entries of the (user, system) PATH.
+        """
+        self.load([("PATH", False), ("PATH", True)])
+        return self._get(system=False).entries, self._get(system=True).entries
+
+    def add(
+        self,
+        location: str,
+        system: bool = False,
+        prepend: bool = False,
+        force: bool = False,
+        var: str = "PATH",
+    ) -> str:
+        """
+        Adds a location to the end (or start) of a PATH, returning the entry which
+        was added. Unless forced, the location must exist and must not already be
+        on the PATH.
+        """
+        target = resolve_entry(location, var, remove=False, force=force)
+        if self.compact and is_location_variable(var):
+            target = compact_entry(target, system=system)
+
+        return self.insert(target, system=system, prepend=prepend, force=force, var=var)
+
+    def prepend(
+        self,
+        location: str,
+        system: bool = False,
+        force: bool = False,
+        var: str = "PATH",
+    ) -> str:
+        """
+        Adds a location to the start of a PATH, returning the entry which was added.
+        """
+        return self.add(location, system=system, prepend=True, force=force, var=var)
+
+    def insert(
+        self,
+        entry: str,
+        system: bool = False,
+        prepend: bool = False,
+        force: bool = False,
+        var: str = "PATH",
+    ) -> str:
+        """
+        Adds an entry exactly as given, without resolving or compacting it. Unless
+        forced, the entry must not already be on the PATH.
+
+        If the user variable is empty and would replace the system variable (see
+        `replaces_system()`), the entry is added to a copy of the system value.
+        """
+        paths = self._get(system, var)
+        if not paths and replaces_system(var, system, self.backend):
+            paths = self._get(True, var).copy()
+
+        if not force and entry in paths:
+            raise AlreadyOnPathError(entry, system, var=var)
+
+        paths.insert(entry, prepend=prepend)
+        self._paths[(var, system)] = paths
+        self._operations.append((self.insert, (entry, system, prepend, force, var)))
+        return entry
+
+    def remove(
+        self, location: str, system: bool = False, var: str = "PATH"
+    ) -> List[str]:
+        """
+        Removes every entry which refers to the same location, returning the
+        removed entries.
+        """
+        target = resolve_entry(location, var, remove=True, force=False)
+        return self.remove_entry(target, system=system, var=var)
+
+    def remove_entry(
+        self, entry: str, system: bool = False, var: str = "PATH"
+    ) -> List[str]:
+        """
+        Removes every entry which refers to the same location as `entry`, without
+        resolving it first.
+        """
+        paths = self._get(system, var)
+        removed = remove_from_path_list(paths, entry, system=system, var=var)
+        self._operations.append((self.remove_entry, (entry, system, var)))
+        return removed
+
+    def get_changes(self) -> Dict[Variable, str]:
+        """
+        Returns the new value of each variable which has changed, keyed by
+        (name, is_system).
+        """
+        return {
+            key: str(paths)
+            for key, paths in self._paths.items()
+            if str(paths) != self._original[key]
+        }
+
+    def get_warnings(self) -> List[str]:
+        """
+        Returns warnings about variables which would be long enough to cause
+        problems.
+        """
+        return [
+            warning
+            for (var, system), value in self.get_changes().items()
+            for warning in check_length(value, system=system, var=var)
+        ]
+
+    def describe(self) -> List[str]:
+        """
+        Returns a description of each change which `commit()` would make.
+        """
+        return [
+            self.backend.describe_set(var, value, user=not system)
+            for (var, system), value in self.get_changes().items()
+        ]
+
+    def commit(
+        self, force: bool = False, timeout: float = lock.LOCK_TIMEOUT
+    ) -> Dict[Variable, str]:
+        """
+        Writes each variable which has changed in one batch, returning the new
+        values. Unless forced, nothing is written if any would be too long to be
+        read.
+
+        Other pathmod processes are kept waiting (for up to `timeout` seconds) while
+        the variables are written. If any was changed since it was read, the
+        changes are made again to the new values; this can raise the same errors as
+        making them did, e.g. if another program added the same location.
+        """
+        changes = self.get_changes()
+        written = write_with_retries(
+            changes,
+            {key: self._original[key] for key in changes},
+            self._replan,
+            force=force,
+            backend=self.backend,
+            timeout=timeout,
+        )
+
+        self._original.update(written)
+        self._operations.clear()
+        return written
+
+    def discard(self):
+        """
+        Forgets any uncommitted changes; each variable is read again when next
+        needed.
+        """
+        self._original.clear()
+        self._paths.clear()
+        self._operations.clear()
+
+    def _get(self, system: bool, var: str = "PATH") -> PathList:
+        key = (var, system)
+        if key not in self._paths:
+            self._read([key])
+
+        return self._paths[key]
+
+    def _read(self, keys: List[Variable]):
+        if not keys:
+            return
+
+        with timings.phase("read PATH"):
+            values = self.backend.get_many((var, not system) for var, system in keys)
+
+        for var, system in keys:
+            value = values[(var, not system)]
+            self._original[(var, system)] = value
+            self._paths[(var, system)] = PathList.parse(value)
+
+    def _replan(self):
+        """
+        Reads each variable again (in one batch) and makes the same changes to it,
+        returning the new (changes, expected) for `write_with_retries()`.
+        """
+        operations = list(self._operations)
+        keys = list(self._paths)
+        self.discard()
+        self._read(keys)
+
+        for operation, args in operations:
+            operation(*args)
+
+        changes = self.get_changes()
+        return changes, {key: self._original[key] for key in changes}
@@ -0,0 +1,140 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Exceptions raised by pathmod. The command line prints these as "Error: <message>";
+code using pathmod as a library can catch them by type.
+"""
+
+
+class PathmodError(Exception):
+    """
+    Base class for all errors raised by pathmod.
+    """
+
+
+class InvalidLocationError(PathmodError):
+    """
+    Raised when a location can't be parsed.
+    """
+
+    def __init__(self, location: str, reason: str):
+        super().__init__(f"Couldn't parse the location '{location}': {reason}")
+        self.location = location
+
+
+class LocationNotFoundError(PathmodError):
+    """
+    Raised when adding a location which does not exist, unless forced.
+    """
+
+    def __init__(self, location: str):
+        super().__init__(f"location '{location}' does not exist.")
+        self.location = location
+
+
+class AlreadyOnPathError(PathmodError):
+    """
+    Raised when adding a location which is already on the PATH, unless forced.
+    """
+
+    def __init__(self, location: str, system: bool, var: str = "PATH"):
+        super().__init__(f"'{location}' is already on the {var}.")
+        self.location = location
+        self.system = system
+        self.var = var
+
+
+class NotOnPathError(PathmodError):
+    """
+    Raised when removing a location which is not on the PATH.
+    """
+
+    def __init__(self, location: str, system: bool, var: str = "PATH"):
+        super().__init__(
+            f"'{location}' not found on the {'system' if system else 'user'} {var}."
+        )
+        self.location = location
+        self.system = system
+        self.var = var
+
+
+class PathTooLongError(PathmodError):
+    """
+    Raised when writing a variable which is too long to be read, unless forced.
+    """
+
+    def __init__(self, system: bool, length: int, var: str = "PATH"):
+        super().__init__(
+            f"the {'system' if system else 'user'} {var} would be too long "
+            f"({length} characters)."
+        )
+        self.system = system
+        self.length = length
+        self.var = var
+
+
+class ConflictError(PathmodError):
+    """
+    Raised when a variable was changed by another program between being read and
+    being written.
+    """
+
+    def __init__(self, system: bool, var: str = "PATH"):
+        super().__init__(
+            f"the {'system' if system else 'user'} {var} was changed by another "
+            f"program while it was being modified."
+        )
+        self.system = system
+        self.var = var
+
+
+class LockTimeoutError(PathmodError):
+    """
+    Raised when another pathmod process holds the lock for too long.
+    """
+
+    def __init__(self, filename: str, timeout: float):
+        super().__init__(
+            f"timed out after {timeout:g} seconds waiting for another pathmod "
+            f"process to finish (lock file: '{filename}')."
+        )
+        self.filename = filename
+        self.timeout = timeout
+
+
+# Extra advice printed after errors which can be overridden on the command line.
+HINTS = {
+    LocationNotFoundError: "Re-run with the '--force' parameter if you still wish "
+    "to add to the PATH.",
+    PathTooLongError: "Re-run with the '--force' parameter if you still wish to "
+    "modify the PATH.",
+    ConflictError: "Nothing was changed; run the command again to apply it to the "
+    "new PATH.",
+}
+
+
+def format_error(error: PathmodError) -> str:
+    """
+    Returns the message which the command line prints for an error.
+    """
+    hint = HINTS.get(type(error))
+    return f"Error: {error}{' ' + hint if hint else ''}"
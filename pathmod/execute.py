@@ -0,0 +1,92 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Runs a command with a PATH which only exists for that command, e.g. for one step of
+a CI job. Nothing is written to the persistent PATH, so nothing needs to be undone
+afterwards, even if the command crashes.
+"""
+import os
+import shutil
+import subprocess
+from typing import Iterable, List
+
+from pathmod.pathlist import PathList
+from pathmod.pathutils import get_abs_path
+
+
+def build_path(
+    path: str,
+    prepend: Iterable[str] = (),
+    add: Iterable[str] = (),
+    remove: Iterable[str] = (),
+) -> str:
+    """
+    Returns a copy of a PATH (separated by os.pathsep) with locations removed, then
+    added to the end, then prepended, so that the first location in `prepend` comes
+    first. Locations are matched in the same way as by 'pathmod remove'.
+
+    Removing a location which isn't on the PATH does nothing. A location which is
+    already on the PATH isn't added again, but is moved to the start if prepended.
+    """
+    paths = PathList.parse(path, separator=os.pathsep)
+
+    for location in remove:
+        paths.remove(get_abs_path(location))
+
+    for location in add:
+        target = get_abs_path(location)
+        if target not in paths:
+            paths.append(target)
+
+    for location in reversed(list(prepend)):
+        target = get_abs_path(location)
+        paths.remove(target, use_identity=False)
+        paths.prepend(target)
+
+    return str(paths)
+
+
+def run(command: List[str], path: str, dry_run: bool = False) -> int:
+    """
+    Runs a command with the given PATH, returning its exit code.
+    """
+    # The executable is found here, since on Windows the child's PATH isn't used
+    # to find it.
+    executable = shutil.which(command[0], path=path)
+    if executable is None:
+        print(f"Error: '{command[0]}' not found on the PATH.")
+        return 1
+
+    if dry_run:
+        print(f"PATH={path}\n")
+        print(subprocess.list2cmdline([executable] + command[1:]))
+        return 0
+
+    env = dict(os.environ, PATH=path)
+    process = subprocess.Popen([executable] + command[1:], env=env)
+
+    while True:
+        try:
+            return process.wait()
+        except KeyboardInterrupt:
+            # The child receives Ctrl+C too, and decides whether to stop.
+            pass
@@ -0,0 +1,383 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+A journal of every change pathmod writes, so that an earlier state of the variables
+can be restored with a single write, e.g. after an installer has wrecked the PATH.
+
+Values are stored once each, in a file named by the hash of the value under
+'history/values'. Each change is a line of 'history/journal.jsonl' which refers to
+the values before and after it, so a PATH which changes by one entry at a time
+costs one copy of each version rather than two. Only the last MAX_ENTRIES changes
+are kept; values which they no longer refer to are deleted.
+
+Undoing changes is itself a change, which records the ids of the changes it
+undoes. Those are skipped by later undos, so that each undo goes further back
+rather than undoing the one before it.
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from pathmod import lock, state
+
+HISTORY_DIR = "history"
+JOURNAL_FILE = "journal.jsonl"
+VALUES_DIR = "values"
+
+# The number of changes which are kept, across every backend.
+MAX_ENTRIES = 200
+
+# `backend` is the id of the backend which made the change, `changes` has a Change
+# for each variable which changed, and `undoes` has the ids of the entries which
+# an undo or rollback reversed.
+Entry = namedtuple("Entry", ["id", "time", "backend", "command", "changes", "undoes"])
+
+# `before` and `after` are the hashes of the values.
+Change = namedtuple("Change", ["var", "system", "before", "after"])
+
+# The ids of the entries being undone by the changes written now; see `undoing()`.
+_undoing: List[int] = []
+
+
+def get_history_dir() -> str:
+    directory = state.get_state_file(HISTORY_DIR)
+    os.makedirs(os.path.join(directory, VALUES_DIR), exist_ok=True)
+    return directory
+
+
+def record(backend, before: Dict, after: Dict, command: Optional[str] = None):
+    """
+    Adds a change to the journal. `before` and `after` have the values of each
+    variable, keyed by (name, is_system); variables which didn't change are
+    skipped. The command line is recorded unless `command` is given.
+    """
+    changed = [key for key, value in after.items() if before[key] != value]
+    if not changed:
+        return
+
+    directory = get_history_dir()
+
+    # Values are stored under the lock, so that pruning can't delete them before
+    # the entry which refers to them is written.
+    with lock.hold(os.path.join(directory, "history.lock")):
+        changes = [
+            Change(*key, _store(directory, before[key]), _store(directory, after[key]))
+            for key in changed
+        ]
+        entries = _load(directory)
+        entry = Entry(
+            id=entries[-1].id + 1 if entries else 1,
+            time=time.time(),
+            backend=backend.get_id(),
+            command=command if command is not None else _get_command(),
+            changes=changes,
+            undoes=list(_undoing),
+        )
+
+        with open(os.path.join(directory, JOURNAL_FILE), "a", encoding="utf-8") as f:
+            f.write(_format_entry(entry) + "\n")
+
+        if len(entries) + 1 > MAX_ENTRIES:
+            prune(directory, entries + [entry])
+
+
+def prune(directory: str, entries: List[Entry]):
+    """
+    Keeps the last MAX_ENTRIES entries, and deletes the values which are no longer
+    referred to.
+    """
+    entries = entries[-MAX_ENTRIES:]
+    filename = os.path.join(directory, JOURNAL_FILE)
+    temp = f"{filename}.{os.getpid()}.tmp"
+
+    with open(temp, "w", encoding="utf-8") as f:
+        f.writelines(_format_entry(entry) + "\n" for entry in entries)
+    os.replace(temp, filename)
+
+    used = {
+        digest
+        for entry in entries
+        for change in entry.changes
+        for digest in (change.before, change.after)
+    }
+    values = os.path.join(directory, VALUES_DIR)
+    for name in os.listdir(values):
+        if name not in used:
+            try:
+                os.remove(os.path.join(values, name))
+            except OSError:
+                pass
+
+
+@contextmanager
+def undoing(ids: Iterable[int]):
+    """
+    Records the changes written inside the block as undoing the given entries.
+    """
+    _undoing[:] = ids
+    try:
+        yield
+    finally:
+        _undoing.clear()
+
+
+def get_entries(backend) -> List[Entry]:
+    """
+    Returns the changes made through the same backend, oldest first.
+    """
+    backend_id = backend.get_id()
+    return [i for i in _load(get_history_dir()) if i.backend == backend_id]
+
+
+def get_undone(entries: List[Entry]) -> set:
+    """
+    Returns the ids of the entries which have been undone. Undoing an undo, e.g. by
+    rolling back to before it, makes the changes it undid count again.
+    """
+    by_id = {i.id: i for i in entries}
+    undone = set()
+
+    for entry in entries:
+        for entry_id in entry.undoes:
+            if entry_id in by_id:
+                undone.difference_update(by_id[entry_id].undoes)
+        undone.update(entry.undoes)
+
+    return undone
+
+
+def get_active(entries: List[Entry]) -> List[Entry]:
+    """
+    Returns the changes which are still in effect: neither undos nor undone.
+    """
+    undone = get_undone(entries)
+    return [i for i in entries if not i.undoes and i.id not in undone]
+
+
+def get_value(digest: str) -> str:
+    filename = os.path.join(get_history_dir(), VALUES_DIR, digest)
+    with open(filename, "r", encoding="utf-8", newline="") as f:
+        return f.read()
+
+
+def get_restored_values(entries: List[Entry]) -> "OrderedDict":
+    """
+    Returns the values which undo `entries`: each variable they changed, keyed by
+    (name, is_system), as it was before the first of them.
+    """
+    restored = OrderedDict()
+    for entry in reversed(entries):
+        for change in entry.changes:
+            restored[(change.var, change.system)] = change.before
+
+    return OrderedDict((key, get_value(digest)) for key, digest in restored.items())
+
+
+def print_history(limit: int):
+    from pathmod.backends import get_backend
+
+    entries = get_entries(get_backend())
+    if not entries:
+        print("No changes have been recorded.")
+        return
+
+    undone = get_undone(entries)
+    for entry in reversed(entries[-limit:] if limit else entries):
+        when = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(entry.time))
+        notes = ""
+        if entry.undoes:
+            notes += f"  (undoes {', '.join(str(i) for i in entry.undoes)})"
+        if entry.id in undone:
+            notes += "  (undone)"
+        print(f"{entry.id:>6}  {when}  {entry.command}{notes}")
+
+        for change in entry.changes:
+            before = _split(get_value(change.before))
+            after = _split(get_value(change.after))
+            scope = "[system]" if change.system else "[user]  "
+            added = len([i for i in after if i not in before])
+            removed = len([i for i in before if i not in after])
+            print(f"        {scope} {change.var}: +{added} -{removed}")
+
+
+def undo(count: int, dry_run: bool, force: bool):
+    """
+    Restores the variables as they were before the last `count` changes which are
+    still in effect; earlier undos, and the changes they undid, are skipped.
+    """
+    from pathmod.backends import get_backend
+
+    entries = get_entries(get_backend())
+    if not entries:
+        print("Error: no changes have been recorded.")
+        sys.exit(1)
+
+    active = get_active(entries)
+    if not active:
+        print("Error: every recorded change has already been undone.")
+        sys.exit(1)
+
+    restore(entries, active[-count:], dry_run=dry_run, force=force)
+
+
+def rollback(entry_id: int, dry_run: bool, force: bool):
+    """
+    Restores the variables as they were just after the change with the given id,
+    by undoing every later change.
+    """
+    from pathmod.backends import get_backend
+
+    entries = get_entries(get_backend())
+    ids = [i.id for i in entries]
+    if entry_id not in ids:
+        print(f"Error: there is no change {entry_id} in the history.")
+        sys.exit(1)
+
+    later = entries[ids.index(entry_id) + 1 :]
+    if not later:
+        print(f"Nothing to do; change {entry_id} is the latest.")
+        return
+
+    restore(entries, later, dry_run=dry_run, force=force)
+
+
+def restore(entries: List[Entry], targets: List[Entry], dry_run: bool, force: bool):
+    """
+    Undoes `targets`, which are among the backend's `entries`, by writing the earlier
+    values, once. Unless forced, nothing is written if a variable has been changed
+    since it was last recorded, e.g. by an installer, since that change would be
+    lost.
+    """
+    from pathmod import batch, pathutils
+    from pathmod.backends import get_backend
+
+    backend = get_backend()
+    restored = get_restored_values(targets)
+
+    # The latest recorded value of each variable, which may have been written by
+    # an undo which came after the first of `targets`.
+    recorded = {}
+    for entry in entries:
+        if entry.id >= targets[0].id:
+            for change in entry.changes:
+                recorded[(change.var, change.system)] = change.after
+
+    values, current = _plan(backend, restored, recorded, force)
+    if not values:
+        print("No changes to make.")
+        return
+
+    print()
+    for (var, system), value in values.items():
+        batch.print_diff(current[(var, system)], value, system=system, var=var)
+
+    with undoing(i.id for i in targets):
+        pathutils.commit_variables(
+            values,
+            dry_run=dry_run,
+            force=force,
+            expected=current,
+            replan=lambda: _plan(backend, restored, recorded, force),
+        )
+
+
+def _plan(backend, restored: Dict, recorded: Dict, force: bool):
+    """
+    Reads the variables, returning the restored values which differ from them and
+    the values read. Unless forced, exits if any has been changed since `recorded`.
+    """
+    current = backend.get_many((var, not system) for var, system in restored)
+    current = {(var, system): current[(var, not system)] for var, system in restored}
+
+    changed = [key for key in restored if _hash(current[key]) != recorded[key]]
+    if changed and not force:
+        print("Error: these variables have since been changed by other programs:\n")
+        for var, system in changed:
+            print(f"\t{'system' if system else 'user'} {var}")
+        print("\nRe-run with the '--force' parameter to overwrite those changes.")
+        sys.exit(1)
+
+    values = OrderedDict((k, v) for k, v in restored.items() if v != current[k])
+    return values, current
+
+
+def _store(directory: str, value: str) -> str:
+    """
+    Stores a value unless it is already stored, returning its hash.
+    """
+    digest = _hash(value)
+    filename = os.path.join(directory, VALUES_DIR, digest)
+
+    if not os.path.exists(filename):
+        temp = f"{filename}.{os.getpid()}.tmp"
+        with open(temp, "w", encoding="utf-8", newline="") as f:
+            f.write(value)
+        os.replace(temp, filename)
+
+    return digest
+
+
+def _hash(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+
+
+def _load(directory: str) -> List[Entry]:
+    entries = []
+
+    try:
+        with open(os.path.join(directory, JOURNAL_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                    changes = [Change(*i) for i in data.pop("changes")]
+                    entries.append(Entry(changes=changes, **data))
+                except (ValueError, TypeError, KeyError):
+                    # A line may be cut short if pathmod was stopped while writing.
+                    continue
+    except FileNotFoundError:
+        pass
+
+    return entries
+
+
+def _format_entry(entry: Entry) -> str:
+    data = entry._asdict()
+    data["changes"] = [list(i) for i in entry.changes]
+    return json.dumps(data, separators=(",", ":"))
+
+
+def _get_command() -> str:
+    program = os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else ""
+    # 'python -m pathmod' and the benchmarks' entry points.
+    if program in ("", "-c", "__main__.py"):
+        program = "pathmod"
+
+    return " ".join(f'"{i}"' if " " in i else i for i in [program] + sys.argv[1:])
+
+
+def _split(value: str) -> List[str]:
+    return [i for i in value.split(";") if i]
@@ -0,0 +1,215 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+A persistent index of the executables provided by each location on the PATH.
+
+The index is cached in the state directory. Each location stores the modification
+time of its directory, so only locations which have changed are listed again.
+"""
+import os
+import sys
+from collections import OrderedDict, namedtuple
+from typing import Dict, List, Optional
+
+from pathmod import pathutils, probe, state
+from pathmod.pathlist import normalize
+
+INDEX_FILE = "index.json"
+INDEX_VERSION = 1
+
+DEFAULT_PATHEXT = ".COM;.EXE;.BAT;.CMD;.VBS;.VBE;.JS;.JSE;.WSF;.WSH;.MSC"
+
+# 'indexed' is False if the location's contents are unknown, e.g. if it timed out.
+Location = namedtuple("Location", ["system", "entry", "path", "files", "indexed"])
+Match = namedtuple("Match", ["location", "filename"])
+
+
+def get_pathext() -> List[str]:
+    pathext = os.environ.get("PATHEXT") or DEFAULT_PATHEXT
+    return [i.strip().lower() for i in pathext.split(";") if i.strip()]
+
+
+def command_name(filename: str, pathext: List[str]) -> Optional[str]:
+    """
+    Returns the name used to run an executable, or None if the file can't be run
+    without its extension.
+    """
+    if sys.platform != "win32":
+        return filename
+
+    root, ext = os.path.splitext(filename)
+    return root.lower() if ext.lower() in pathext else None
+
+
+def load_index(
+    rebuild: bool = False, timeout: float = probe.DEFAULT_TIMEOUT
+) -> List[Location]:
+    """
+    Returns the locations on the persistent PATH in the order a new session
+    searches them, along with the executables in each.
+    """
+    cache = {} if rebuild else state.load_json(INDEX_FILE, {})
+    if cache.get("version") != INDEX_VERSION:
+        cache = {"version": INDEX_VERSION, "dirs": {}}
+    cached_dirs = cache["dirs"]
+    pathext = get_pathext()
+
+    entries = [
+        (system, entry)
+        for system in pathutils.get_search_order()
+        for entry in pathutils.get_path_list(user=not system)
+    ]
+
+    # Duplicate locations can't provide anything new, so they're skipped.
+    unique = OrderedDict()
+    for system, entry in entries:
+        unique.setdefault(normalize(entry), (system, entry))
+
+    paths = {
+        key: os.path.abspath(os.path.expandvars(entry.strip('"')))
+        for key, (_, entry) in unique.items()
+    }
+    results = probe.probe(
+        paths.values(),
+        lambda path: scan_location(path, cached_dirs.get(path), pathext),
+        timeout=timeout,
+    )
+
+    dirs = {}
+    locations = []
+    for key, (system, entry) in unique.items():
+        path = paths[key]
+        result = results[path]
+
+        if result.value is not None:
+            dirs[path] = result.value
+        elif result.timed_out and path in cached_dirs:
+            # Fall back to the last known contents of locations which are slow.
+            dirs[path] = cached_dirs[path]
+
+        files = dirs[path]["files"] if path in dirs else []
+        indexed = path in dirs or isinstance(result.error, FileNotFoundError)
+        locations.append(Location(system, entry, path, files, indexed))
+
+    if dirs != cached_dirs:
+        try:
+            state.save_json(INDEX_FILE, {"version": INDEX_VERSION, "dirs": dirs})
+        except OSError:
+            pass
+
+    return locations
+
+
+def scan_location(path: str, cached: Optional[Dict], pathext: List[str]) -> Dict:
+    """
+    Returns the modification time of a location and the executables in it, reusing
+    `cached` if the location hasn't changed.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    if cached and cached.get("mtime") == mtime:
+        return cached
+
+    files = []
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                if not entry.is_file():
+                    continue
+                if sys.platform == "win32":
+                    if os.path.splitext(entry.name)[1].lower() in pathext:
+                        files.append(entry.name)
+                elif os.access(entry.path, os.X_OK):
+                    files.append(entry.name)
+            except OSError:
+                pass
+
+    return {"mtime": mtime, "files": sorted(files)}
+
+
+def find(locations: List[Location], command: str) -> List[Match]:
+    """
+    Returns every executable which `command` could run, in resolution order.
+    """
+    pathext = get_pathext()
+    matches = []
+
+    if sys.platform == "win32" and os.path.splitext(command)[1].lower() in pathext:
+        command = command.lower()
+        for location in locations:
+            matches += [
+                Match(location, f) for f in location.files if f.lower() == command
+            ]
+        return matches
+
+    name = command.lower() if sys.platform == "win32" else command
+    for location in locations:
+        found = [f for f in location.files if command_name(f, pathext) == name]
+        matches += [Match(location, f) for f in _sort_by_pathext(found, pathext)]
+
+    return matches
+
+
+def get_commands(locations: List[Location]) -> Dict[str, List[Match]]:
+    """
+    Returns every command on the PATH, with the executables it could run in
+    resolution order.
+    """
+    pathext = get_pathext()
+    commands = OrderedDict()
+
+    for location in locations:
+        by_name = OrderedDict()
+        for f in location.files:
+            name = command_name(f, pathext)
+            if name is not None:
+                by_name.setdefault(name, []).append(f)
+
+        for name, files in by_name.items():
+            matches = commands.setdefault(name, [])
+            matches += [Match(location, f) for f in _sort_by_pathext(files, pathext)]
+
+    return commands
+
+
+def get_shadowed(locations: List[Location]) -> Dict[str, List[Match]]:
+    """
+    Returns the commands which are provided by more than one executable.
+    """
+    return OrderedDict(
+        (name, matches)
+        for name, matches in get_commands(locations).items()
+        if len(matches) > 1
+    )
+
+
+def _sort_by_pathext(files: List[str], pathext: List[str]) -> List[str]:
+    """
+    Within a location, Windows tries the extensions in the order given by PATHEXT.
+    """
+    if sys.platform != "win32":
+        return files
+
+    def priority(f):
+        ext = os.path.splitext(f)[1].lower()
+        return pathext.index(ext) if ext in pathext else len(pathext)
+
+    return sorted(files, key=priority)
@@ -0,0 +1,119 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+A lock which serializes pathmod processes writing the same variables, so that two
+processes can't both read the PATH, make their own change and then overwrite each
+other's. The lock is an OS lock on a file, so it is released if the process dies.
+
+The lock is re-entrant within a process, so code holding it can call functions
+which take it again.
+"""
+import contextlib
+import os
+import threading
+import time
+from typing import Dict, Tuple
+
+from pathmod import timings
+from pathmod.errors import LockTimeoutError
+
+# Seconds to wait for another process before giving up.
+LOCK_TIMEOUT = 30.0
+
+# Seconds between attempts to take the lock, doubling up to the maximum.
+POLL_INTERVAL = 0.001
+MAX_POLL_INTERVAL = 0.05
+
+# The open lock file and the number of times it has been taken, by filename.
+_held: Dict[str, Tuple[object, int]] = {}
+_held_lock = threading.RLock()
+
+
+@contextlib.contextmanager
+def hold(filename: str, timeout: float = LOCK_TIMEOUT):
+    """
+    Holds the lock on `filename` (which is created if necessary) until the block
+    exits, raising `LockTimeoutError` if it can't be taken within `timeout` seconds.
+    """
+    with _held_lock:
+        if filename in _held:
+            f, depth = _held[filename]
+            _held[filename] = (f, depth + 1)
+        else:
+            with timings.phase("wait for lock"):
+                f = _acquire(filename, timeout)
+            _held[filename] = (f, 1)
+
+        try:
+            yield
+        finally:
+            f, depth = _held[filename]
+            if depth > 1:
+                _held[filename] = (f, depth - 1)
+            else:
+                del _held[filename]
+                _release(f)
+
+
+def _acquire(filename: str, timeout: float):
+    f = open(filename, "a+b")
+    deadline = time.perf_counter() + timeout
+    interval = POLL_INTERVAL
+
+    while True:
+        try:
+            _lock(f)
+            return f
+        except OSError:
+            if time.perf_counter() >= deadline:
+                f.close()
+                raise LockTimeoutError(filename, timeout)
+
+        time.sleep(interval)
+        interval = min(interval * 2, MAX_POLL_INTERVAL)
+
+
+if os.name == "nt":
+    import msvcrt
+
+    def _lock(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+
+    def _release(f):
+        try:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            f.close()
+
+else:
+    import fcntl
+
+    def _lock(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _release(f):
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        finally:
+            f.close()
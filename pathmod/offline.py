@@ -0,0 +1,168 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Applies the same change to the PATH in many offline registry hives, e.g. every
+NTUSER.DAT under C:\\Users, without logging on as each user. Hives are independent
+files, so they are edited in parallel by a pool of processes.
+"""
+import glob
+import os
+import sys
+from collections import namedtuple
+from typing import Iterable, List
+
+from pathmod import timings
+from pathmod.backends.hive import HiveBackend
+from pathmod.compact import compact_entry
+from pathmod.editor import PathEditor
+from pathmod.errors import AlreadyOnPathError, NotOnPathError, PathmodError
+from pathmod.pathutils import find_location, is_location_variable
+
+# The outcome for one hive. `status` is "changed", "unchanged" or "failed", and
+# `messages` has anything which would have been printed for a single PATH.
+HiveResult = namedtuple("HiveResult", ["filename", "status", "messages"])
+
+
+def find_hives(patterns: Iterable[str]) -> List[str]:
+    """
+    Expands glob patterns (including '**') into a sorted list of unique hive files.
+    """
+    files = set()
+    for pattern in patterns:
+        matches = glob.glob(os.path.expanduser(pattern), recursive=True)
+        files.update(os.path.abspath(i) for i in matches if os.path.isfile(i))
+
+    return sorted(files)
+
+
+def modify_hives(
+    patterns: Iterable[str],
+    target: str,
+    prepend: bool,
+    remove: bool,
+    dry_run: bool,
+    system: bool,
+    force: bool,
+    compact: bool = True,
+    jobs: int = 0,
+    variables=("PATH",),
+):
+    """
+    Adds or removes a location in the PATH (or each of `variables`) of every hive
+    matching `patterns`, using up to `jobs` processes (0 for one per CPU).
+    """
+    files = find_hives(patterns)
+    if not files:
+        print(f"Error: no hives match {' or '.join(repr(p) for p in patterns)}.")
+        sys.exit(1)
+
+    # Entries of variables such as PATHEXT are used exactly as given.
+    locations = all(is_location_variable(var) for var in variables)
+    if locations:
+        with timings.phase("resolve location"):
+            target, file = find_location(target, remove=remove, force=force)
+        if file:
+            print(f"'{file}' is a file; using its parent folder instead.")
+
+    if compact and locations and not remove:
+        # Other users have their own %USERPROFILE%, so only variables which are the
+        # same for every user are used.
+        target = compact_entry(target, system=True)
+
+    verb = "Removing" if remove else "Adding"
+    print(
+        f"{verb} '{target}' {'from' if remove else 'to'} the "
+        f"{'system' if system else 'user'} {' and '.join(variables)} in "
+        f"{len(files)} hive(s)...\n"
+    )
+
+    variables = tuple(variables)
+    args = [
+        (f, target, prepend, remove, dry_run, system, force, variables) for f in files
+    ]
+    jobs = min(jobs or os.cpu_count() or 1, len(files))
+
+    with timings.phase("edit hives"):
+        if jobs == 1:
+            results = [modify_hive(*a) for a in args]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(modify_hive, *zip(*args), chunksize=4))
+
+    counts = {"changed": 0, "unchanged": 0, "failed": 0}
+    for result in results:
+        counts[result.status] += 1
+        print(f"[{result.status}] '{result.filename}'")
+        for message in result.messages:
+            print(f"    {message}")
+
+    print(
+        f"\n{'Would change' if dry_run else 'Changed'} {counts['changed']} hive(s); "
+        f"{counts['unchanged']} unchanged, {counts['failed']} failed."
+    )
+    if counts["failed"]:
+        sys.exit(1)
+
+
+def modify_hive(
+    filename: str,
+    target: str,
+    prepend: bool,
+    remove: bool,
+    dry_run: bool,
+    system: bool,
+    force: bool,
+    variables=("PATH",),
+) -> HiveResult:
+    """
+    Adds or removes a location in the PATH (or each of `variables`) of a single
+    hive. This runs in a worker process, so messages are returned rather than
+    printed.
+    """
+    scope = "system" if system else "user"
+    editor = PathEditor(HiveBackend(filename))
+    messages = []
+
+    try:
+        editor.load((var, system) for var in variables)
+        for var in variables:
+            if remove:
+                messages.extend(
+                    f"Removing '{entry}' from the {scope} {var}"
+                    for entry in editor.remove_entry(target, system=system, var=var)
+                )
+            else:
+                editor.insert(
+                    target, system=system, prepend=prepend, force=force, var=var
+                )
+
+        messages.extend(f"Warning: {w}" for w in editor.get_warnings())
+        if not dry_run:
+            editor.commit(force=force)
+    except (AlreadyOnPathError, NotOnPathError) as e:
+        return HiveResult(filename, "unchanged", [str(e)])
+    except PathmodError as e:
+        return HiveResult(filename, "failed", [str(e)])
+
+    return HiveResult(filename, "changed", messages)
@@ -0,0 +1,201 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+An ordered list of PATH entries, indexed by a normalized key so that membership
+checks, insertion and removal don't need to scan or stat every entry.
+"""
+import os
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from pathmod import timings
+from pathmod.pathkey import normalize
+
+# Identity of each expanded path, as (st_dev, st_ino). Shared between instances so
+# that each location is only stat-ed once per process, which matters on slow shares.
+_identity_cache: Dict[str, Optional[Tuple[int, int]]] = {}
+
+
+def identity(entry: str) -> Optional[Tuple[int, int]]:
+    """
+    Returns the (device, inode) pair identifying the location, or None if it
+    cannot be determined.
+    """
+    path = os.path.expandvars(entry.strip().strip('"'))
+
+    if path not in _identity_cache:
+        timings.count("stat")
+        try:
+            st = os.stat(path)
+            _identity_cache[path] = (st.st_dev, st.st_ino) if st.st_ino else None
+        except (OSError, ValueError):
+            _identity_cache[path] = None
+
+    return _identity_cache[path]
+
+
+class PathList:
+    """
+    Keeps the original PATH entries (including unexpanded forms like '%USERPROFILE%\\bin')
+    in order, along with a count of the entries for each normalized key.
+    """
+
+    def __init__(self, entries: Iterable[str] = (), separator: str = ";"):
+        self.separator = separator
+        # Each entry is stored along with its normalized key.
+        self._entries: List[Tuple[str, str]] = []
+        self._keys: Dict[str, int] = {}
+        self._identities: Optional[Dict[Tuple[int, int], int]] = None
+
+        for entry in entries:
+            self.append(entry)
+
+    @classmethod
+    def parse(cls, value: str, separator: str = ";") -> "PathList":
+        """
+        Parses a PATH string, dropping empty entries and surrounding whitespace.
+        """
+        return cls(
+            (i.strip() for i in value.split(separator) if i.strip()),
+            separator=separator,
+        )
+
+    def __str__(self) -> str:
+        return self.separator.join(self.entries)
+
+    def __repr__(self) -> str:
+        return f"PathList({self.entries!r})"
+
+    def __iter__(self) -> Iterator[str]:
+        return (entry for entry, _ in self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, item: str) -> bool:
+        return normalize(item) in self._keys
+
+    @property
+    def entries(self) -> List[str]:
+        return [entry for entry, _ in self._entries]
+
+    def count(self, item: str) -> int:
+        """
+        Returns the number of entries with the same normalized key as `item`.
+        """
+        return self._keys.get(normalize(item), 0)
+
+    def find(self, item: str, use_identity: bool = True) -> List[str]:
+        """
+        Returns the entries which refer to the same location as `item`.
+
+        Entries are matched by their normalized key. If there is no match and
+        `use_identity` is set, entries are matched by (device, inode) instead;
+        this catches e.g. symbolic links, at the cost of a stat for each entry.
+        """
+        key = normalize(item)
+        if key in self._keys:
+            return [entry for entry, k in self._entries if k == key]
+
+        if not use_identity:
+            return []
+
+        target = identity(item)
+        if target is None or target not in self._get_identities():
+            return []
+
+        return [entry for entry, _ in self._entries if identity(entry) == target]
+
+    def append(self, entry: str):
+        key = normalize(entry)
+        self._entries.append((entry, key))
+        self._index(entry, key)
+
+    def prepend(self, entry: str):
+        key = normalize(entry)
+        self._entries.insert(0, (entry, key))
+        self._index(entry, key)
+
+    def insert(self, entry: str, prepend: bool):
+        if prepend:
+            self.prepend(entry)
+        else:
+            self.append(entry)
+
+    def remove(self, item: str, use_identity: bool = True) -> List[str]:
+        """
+        Removes every entry which refers to the same location as `item`, returning
+        the removed entries.
+        """
+        matches = self.find(item, use_identity=use_identity)
+        if matches:
+            removed = set(matches)
+            self._entries = [(e, k) for e, k in self._entries if e not in removed]
+            self._reindex()
+
+        return matches
+
+    def deduplicated(self) -> Tuple["PathList", List[str]]:
+        """
+        Returns a copy without duplicate entries, keeping the first occurrence of
+        each, along with the duplicates which were dropped.
+        """
+        result = PathList(separator=self.separator)
+        duplicates = []
+
+        for entry, key in self._entries:
+            if key in result._keys:
+                duplicates.append(entry)
+            else:
+                result._entries.append((entry, key))
+                result._index(entry, key)
+
+        return result, duplicates
+
+    def copy(self) -> "PathList":
+        result = PathList(separator=self.separator)
+        result._entries = list(self._entries)
+        result._keys = dict(self._keys)
+        return result
+
+    def _index(self, entry: str, key: str):
+        self._keys[key] = self._keys.get(key, 0) + 1
+
+        if self._identities is not None:
+            ident = identity(entry)
+            if ident is not None:
+                self._identities[ident] = self._identities.get(ident, 0) + 1
+
+    def _reindex(self):
+        self._keys = {}
+        self._identities = None
+        for entry, key in self._entries:
+            self._index(entry, key)
+
+    def _get_identities(self) -> Dict[Tuple[int, int], int]:
+        if self._identities is None:
+            self._identities = {}
+            for entry, _ in self._entries:
+                ident = identity(entry)
+                if ident is not None:
+                    self._identities[ident] = self._identities.get(ident, 0) + 1
+
+        return self._identities
@@ -20,56 +20,339 @@
 #  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 #  SOFTWARE.
 import os
+import random
 import re
-import subprocess
-import sys
+import time
 import traceback
+from collections import OrderedDict
 from os.path import abspath, expandvars, expanduser
-from typing import List
-
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from pathmod import history, lock, snapshot, stamp, timings
+from pathmod.backends import Backend, BackendError, get_backend
+from pathmod.compact import check_length, is_too_long
+from pathmod.errors import (
+    AlreadyOnPathError,
+    ConflictError,
+    InvalidLocationError,
+    LocationNotFoundError,
+    NotOnPathError,
+    PathTooLongError,
+)
+from pathmod.pathlist import PathList
 from pathmod.refresh import print_command
 
 
-def modify_path(
-    target: str, prepend: bool, remove: bool, dry_run: bool, system: bool, force: bool
+# Variables are keyed by (name, whether it is the system variable).
+Variable = Tuple[str, bool]
+
+# Returns the (values, expected) to write after a conflict, from the values which
+# are read again; see `write_with_retries()`.
+Replan = Callable[[], Tuple[Dict[Variable, str], Dict[Variable, str]]]
+
+# Times to make the changes again if the PATH keeps being changed by other programs.
+MAX_RETRIES = 5
+
+# Seconds to wait before the first retry (with random jitter), doubling each time.
+# The first conflict is retried immediately, since it is usually caused by another
+# pathmod process which has finished by the time we have the lock.
+RETRY_DELAY = 0.05
+
+# Variables whose entries aren't locations, so they are used exactly as given.
+NON_LOCATION_VARIABLES = {"PATHEXT"}
+
+
+def is_location_variable(var: str) -> bool:
+    return var.upper() not in NON_LOCATION_VARIABLES
+
+
+def get_unique_names(names: Iterable[str]) -> List[str]:
+    """
+    Returns the variable names without duplicates. Like every backend, names are
+    compared case-insensitively; the first spelling of each is kept.
+    """
+    unique = OrderedDict()
+    for name in names:
+        unique.setdefault(name.upper(), name)
+
+    return list(unique.values())
+
+
+def replaces_system(var: str, system: bool, backend: Backend) -> bool:
+    """
+    Returns whether `var` is a user variable which replaces the system variable of
+    the same name. Entries added to it while it is empty are added to a copy of the
+    system value, since otherwise e.g. adding '.PY' to the user PATHEXT would hide
+    '.EXE' and every other system entry.
+    """
+    return not system and not _is_path(var) and backend.user_replaces_system
+
+
+def commit_paths(
+    paths: Dict[bool, str],
+    dry_run: bool,
+    force: bool = False,
+    expected: Optional[Dict[bool, str]] = None,
+    editor=None,
+    replan: Optional[Callable[[], Tuple[Dict[bool, str], Dict[bool, str]]]] = None,
 ):
-    target = get_abs_path(target)
+    """
+    Writes the new value of each PATH, keyed by whether it is the system PATH, and
+    then notifies running programs once. Progress is printed, for use by commands.
 
-    if os.path.isfile(target):
-        print(f"'{target}' is a file; using its parent folder instead.")
-        target = os.path.dirname(target)
+    See `write_paths()` for `expected`. If the PATHs come from a `PathEditor`, it is
+    used to write them, so that its changes are made again after a conflict.
+    Otherwise, `replan` is called after a conflict to make the changes again, as in
+    `write_with_retries()`, returning the new (paths, expected).
+    """
 
-    if not force and not os.path.exists(target) and not remove:
+    def replan_variables():
+        paths, expected = replan()
+        return _as_variables(paths), _as_variables(expected)
+
+    commit_variables(
+        _as_variables(paths),
+        dry_run=dry_run,
+        force=force,
+        expected=_as_variables(expected),
+        editor=editor,
+        replan=replan_variables if replan is not None else None,
+    )
+
+
+def commit_variables(
+    values: Dict[Variable, str],
+    dry_run: bool,
+    force: bool = False,
+    expected: Optional[Dict[Variable, str]] = None,
+    editor=None,
+    replan: Optional[Replan] = None,
+):
+    """
+    Like `commit_paths()`, for any variables, keyed by (name, is_system).
+    """
+    backend = get_backend()
+
+    for (var, system), value in values.items():
+        for warning in check_length(value, system=system, var=var):
+            print(f"Warning: {warning}")
+
+    if dry_run:
+        check_variables(values, force=force)
+        print(f"\nThis is the change we'll make:\n")
+        for (var, system), value in values.items():
+            print(backend.describe_set(var, value, user=not system))
+        return
+
+    try:
+        if editor is not None:
+            values = editor.commit(force=force)
+        elif replan is not None:
+            values = write_with_retries(
+                values, expected, replan, force=force, backend=backend
+            )
+        else:
+            write_variables(values, force=force, backend=backend, expected=expected)
+
+        if not values:
+            print("\nNo changes to make; another program has already made them.")
+            return
+
+        names = list(OrderedDict.fromkeys(var for var, _ in values))
+        if len(names) > 1:
+            names[-2:] = [f"{names[-2]} and {names[-1]}"]
+        print(f"\n{', '.join(names)} updated persistently. ", end="")
+        if any(_is_path(var) for var, _ in values):
+            print_command(newline_before=False)
+        else:
+            print()
+    except BackendError as e:
+        traceback.print_exc()
+
+        hashes = 20 * "#"
         print(
-            f"Error: location '{target}' does not exist. "
-            f"Re-run with the '--force' parameter if you still wish to add to the PATH."
+            f"\n{hashes} ERROR {hashes}\n\n"
+            f"There was an error running the command. ",
+            end="\n",
         )
-        sys.exit(1)
 
-    if not remove:
-        print(f"Adding '{target}' to the {'system' if system else 'user'} PATH...")
 
-    command = get_command(
-        target, system=system, force=force, prepend=prepend, remove=remove
+def check_paths(paths: Dict[bool, str], force: bool = False):
+    """
+    Raises `PathTooLongError` if any PATH is too long to be read, unless forced.
+    """
+    check_variables(_as_variables(paths), force=force)
+
+
+def check_variables(values: Dict[Variable, str], force: bool = False):
+    for (var, system), value in values.items():
+        if is_too_long(value) and not force:
+            raise PathTooLongError(system, len(value), var=var)
+
+
+def write_paths(
+    paths: Dict[bool, str],
+    force: bool = False,
+    backend: Optional[Backend] = None,
+    expected: Optional[Dict[bool, str]] = None,
+):
+    """
+    Writes the new value of each PATH, keyed by whether it is the system PATH, and
+    then notifies running programs once.
+    """
+    write_variables(
+        _as_variables(paths),
+        force=force,
+        backend=backend,
+        expected=_as_variables(expected),
     )
-    if dry_run:
-        print(f"\nThis is the command we'll run:\n")
-        print(command)
-    else:
-        try:
-            run_command(command)
-            print(f"\nPATH updated persistently. ", end="")
-            print_command(newline_before=False)
-        except subprocess.CalledProcessError as e:
-            traceback.print_exc()
-
-            hashes = 20 * "#"
-            print(
-                f"\n{hashes} ERROR {hashes}\n\n"
-                f"There was an error running the command. ",
-                end="\n",
+
+
+def write_variables(
+    values: Dict[Variable, str],
+    force: bool = False,
+    backend: Optional[Backend] = None,
+    expected: Optional[Dict[Variable, str]] = None,
+):
+    """
+    Writes the new value of each variable, keyed by (name, is_system), and then
+    notifies running programs once. The variables are read (if checked, or to
+    record the change in the history) and written in one batch each. Sessions with
+    a refresh hook are told about changes to the PATH by bumping the stamp.
+
+    Writers are serialized by the backend's lock. If `expected` has the values the
+    new values were based on, `ConflictError` is raised (and nothing is written) if
+    any of them has since been changed by another program.
+    """
+    backend = backend or get_backend()
+    check_variables(values, force=force)
+
+    with lock.hold(backend.get_lock_file()):
+        # The values being replaced are also needed for the history.
+        if expected is not None or backend.history:
+            with timings.phase("check PATH"):
+                current = backend.get_many((var, not system) for var, system in values)
+                current = {
+                    (var, system): current[(var, not system)] for var, system in values
+                }
+
+        if expected is not None:
+            for var, system in values:
+                if current[(var, system)] != expected[(var, system)]:
+                    raise ConflictError(system, var=var)
+
+        with timings.phase("write PATH"):
+            backend.set_many(
+                {(var, not system): value for (var, system), value in values.items()}
             )
 
+        if backend.history:
+            with timings.phase("record history"):
+                try:
+                    history.record(backend, current, values)
+                except OSError:
+                    # The change has been made, so it isn't undone for this.
+                    pass
+
+        paths = {system: v for (var, system), v in values.items() if _is_path(var)}
+        if backend.shared and paths:
+            snapshot.update(paths)
+            stamp.bump()
+
+    # Other pathmod processes don't need to wait for running programs to update.
+    with timings.phase("broadcast"):
+        backend.broadcast()
+
+
+def write_with_retries(
+    values: Dict[Variable, str],
+    expected: Dict[Variable, str],
+    replan: Replan,
+    force: bool = False,
+    backend: Optional[Backend] = None,
+    timeout: float = lock.LOCK_TIMEOUT,
+) -> Dict[Variable, str]:
+    """
+    Writes `values` like `write_variables()`, returning the values written. If any
+    variable was changed by another program since `expected` was read, `replan()`
+    reads the variables again and returns the new (values, expected), which are
+    written instead; this is tried up to MAX_RETRIES times, backing off if other
+    programs keep changing them.
+
+    Other pathmod processes are kept waiting (for up to `timeout` seconds) from the
+    first attempt until the last.
+    """
+    backend = backend or get_backend()
+
+    with lock.hold(backend.get_lock_file(), timeout=timeout):
+        for attempt in range(MAX_RETRIES + 1):
+            if not values:
+                return values
+
+            try:
+                write_variables(values, force=force, backend=backend, expected=expected)
+                return values
+            except ConflictError:
+                if attempt == MAX_RETRIES:
+                    raise
+                if attempt:
+                    delay = RETRY_DELAY * 2 ** (attempt - 1)
+                    time.sleep(random.uniform(delay / 2, delay))
+
+            with timings.phase("replay changes"):
+                values, expected = replan()
+
+
+def _as_variables(paths: Optional[Dict[bool, str]]) -> Optional[Dict[Variable, str]]:
+    if paths is None:
+        return None
+    return {("PATH", system): path for system, path in paths.items()}
+
+
+def _is_path(var: str) -> bool:
+    return var.upper() == "PATH"
+
+
+def resolve_entry(entry: str, var: str, remove: bool, force: bool) -> str:
+    """
+    Returns the entry which will be added to or removed from a variable: the
+    resolved location, unless the variable's entries aren't locations.
+    """
+    if is_location_variable(var):
+        return resolve_location(entry, remove=remove, force=force)
+
+    return entry.strip()
+
+
+def resolve_location(location: str, remove: bool, force: bool) -> str:
+    """
+    Returns the absolute path of a location which will be added to or removed from
+    the PATH. Files are replaced by the folder which contains them.
+    """
+    return find_location(location, remove=remove, force=force)[0]
+
+
+def find_location(
+    location: str, remove: bool, force: bool
+) -> Tuple[str, Optional[str]]:
+    """
+    Like `resolve_location()`, but returns (target, file), where `file` is the
+    absolute path of the location if it was a file and so was replaced by its
+    folder, or None.
+    """
+    target = get_abs_path(location)
+    file = None
+
+    timings.count("stat", 2)
+    if os.path.isfile(target):
+        file = target
+        target = os.path.dirname(target)
+
+    if not force and not os.path.exists(target) and not remove:
+        raise LocationNotFoundError(target)
+
+    return target, file
+
 
 def get_abs_path(path: str) -> str:
     """
@@ -94,119 +377,180 @@ def get_abs_path(path: str) -> str:
             fixed = True
             if matches[1] and not matches[0]:
                 matches = (matches[1],)
-    except:
-        print(f"Bad path: '{abs_path}'")
+    except IndexError:
+        raise InvalidLocationError(abs_path, "bad path.")
 
     if (
         not fixed
         and len(matches) > 1
         and (not matches[0] or (matches[0] and matches[1]))
     ):
-        print(
-            f"\nCouldn't parse arguments, probably due to a bug in CMD or Powershell 5. You can fix this by:\n\n"
+        raise InvalidLocationError(
+            abs_path,
+            f"it has a stray quotation mark, probably due to a bug in CMD or "
+            f"Powershell 5. You can fix this by:\n\n"
             f"\t a) Removing the trailing backslash from your path\n"
-            f"\t b) Upgrading to a newer version of Powershell, such as Powershell 7\n"
-        )
-
-        print(
-            f"These are the system arguments that were received before parsing; you can probably see "
-            f"that the path has a strange extra quotation mark:\n\n{['<PATH_TO_EXECUTABLE>'] + sys.argv[1:]}\n"
+            f"\t b) Upgrading to a newer version of Powershell, such as Powershell 7\n",
         )
-        sys.exit(1)
 
     return matches[0]
 
 
-def run_command(command: str):
-    return subprocess.check_output(command).decode("utf-8").replace("\r", "").rstrip()
+def get_command(
+    target: str,
+    system: bool,
+    prepend: bool,
+    force: bool,
+    remove: bool,
+    var: str = "PATH",
+) -> str:
+    """
+    Returns a description of the change which will add the new item to the path;
+    for the Powershell backend, this is the command which will be run.
+    """
+    path = get_new_path(
+        target, system=system, prepend=prepend, force=force, remove=remove, var=var
+    )
+    return get_backend().describe_set(var, path, user=not system)
 
 
-def get_command(
-    target: str, system: bool, prepend: bool, force: bool, remove: bool, process=False
+def get_new_path(
+    target: str,
+    system: bool,
+    prepend: bool,
+    force: bool,
+    remove: bool,
+    var: str = "PATH",
 ) -> str:
     """
-    Returns the Powershell command which will add the new item to the path.
+    Returns the new value of the PATH (or another variable), with the item added or
+    removed.
     """
-    path_cmd = powershell_command_get_path(not system)
-    path_cmd_stdout = run_command(path_cmd)
+    with timings.phase("read PATH"):
+        path = get_backend().get(var, user=not system)
+
+    with timings.phase("edit PATH"):
+        return edit_path_str(
+            path,
+            target,
+            system=system,
+            prepend=prepend,
+            force=force,
+            remove=remove,
+            var=var,
+        )
 
-    path = re.findall(r"^\s*(.*)\s*$", path_cmd_stdout)[0]
 
-    if not (force or remove) and any(item == target for item in path.split(";")):
-        print(f"Error: '{target}' is already on the PATH.")
-        sys.exit(1)
+def edit_path_str(
+    path: str,
+    target: str,
+    system: bool,
+    prepend: bool,
+    force: bool,
+    remove: bool,
+    var: str = "PATH",
+) -> str:
+    """
+    Returns the PATH (or other variable) string with the item added or removed.
+    """
+    paths = PathList.parse(path)
 
-    # Ensure PATH ends with semicolon.
-    if not re.match(r".*;\s*$", path):
-        path = f"{path};"
+    if not (force or remove) and target in paths:
+        raise AlreadyOnPathError(target, system, var=var)
 
     if remove:
-        path = remove_from_path_str(path, target, system=system)
+        remove_from_path_list(paths, target, system=system, var=var)
     else:
-        path = add_to_path_str(path, target, prepend=prepend)
+        paths.insert(target, prepend=prepend)
 
-    # Ensure path does not end in semicolon or backslash.
-    path = re.findall(r"^(.*?)\\?;?\s*$", path)[0]
+    return str(paths)
 
-    set_cmd = (
-        f'powershell.exe /c "[System.Environment]::'
-        f'SetEnvironmentVariable("""PATH""", """{path}""", {_get_environment_var_target(not system, process)})"'
-    )
 
-    return set_cmd
-
-
-def _get_environment_var_target(user: bool, process=False) -> str:
-    return (
-        f"[System.EnvironmentVariableTarget]::"
-        f"{'Process' if process else ('User' if user else 'Machine')}"
-    )
+def read_persisted_path(user: bool, use_snapshot: bool = True) -> str:
+    """
+    Returns the persistent PATH, from the snapshot kept by 'pathmod watch' if it is
+    fresh, or otherwise from the backend. Don't use the snapshot before modifying
+    the PATH, since it may be slightly out of date.
+    """
+    backend = get_backend()
 
+    with timings.phase("read PATH"):
+        path = snapshot.read_path(user) if use_snapshot and backend.shared else None
+        if path is None:
+            path = backend.get("PATH", user=user)
 
-def powershell_command_get_path(user: bool) -> str:
-    env_var_target = _get_environment_var_target(user)
-    return f'powershell.exe /c "[System.Environment]::GetEnvironmentVariable("""PATH""", {env_var_target})"'
+    return path
 
 
 def get_current_path(user: bool) -> List[str]:
-    cmd = powershell_command_get_path(user)
-    path = run_command(cmd)
+    path = read_persisted_path(user=user)
 
     return path.split(";")
 
 
-def add_to_path_str(path: str, target: str, prepend: bool) -> str:
-    if prepend:
-        path = f"{target};{path}"
-    else:
-        path = f"{path}{target}"
-    return path
+def get_current_paths() -> Tuple[List[str], List[str]]:
+    """
+    Reads the user and system PATH, returning (user, system). The two are read
+    concurrently if the backend is slow.
+    """
+    if not get_backend().concurrent_reads:
+        return get_current_path(user=True), get_current_path(user=False)
 
+    import threading
 
-def remove_from_path_str(path: str, to_remove: str, system: bool) -> str:
-    current_items = path.split(";")
-    matches = []
+    system = []
+    errors = []
 
-    for item in current_items:
+    def read_system():
         try:
-            if os.path.samefile(to_remove, item):
-                matches.append(item)
-        except:
-            if os.path.normpath(item) == os.path.normpath(to_remove):
-                matches.append(item)
+            system.extend(get_current_path(user=False))
+        except Exception as e:
+            errors.append(e)
 
-    if not matches:
-        print(
-            f"Error: '{to_remove}' not found on the {'system' if system else 'user'} PATH."
-        )
-        sys.exit(1)
+    thread = threading.Thread(target=read_system, daemon=True)
+    thread.start()
+    user = get_current_path(user=True)
+    thread.join()
+
+    if errors:
+        raise errors[0]
+    return user, system
 
-    new_items = []
-    for item in current_items:
-        if item not in matches:
-            new_items.append(item)
 
-    for i in matches:
-        print(f"Removing '{i}' from the {'system' if system else 'user'} PATH")
+def get_search_order() -> Tuple[bool, bool]:
+    """
+    Returns whether each PATH is the system PATH, in the order a new session
+    searches them.
+    """
+    return (False, True) if get_backend().user_first else (True, False)
+
+
+def get_path_list(user: bool, use_snapshot: bool = True) -> PathList:
+    return PathList.parse(read_persisted_path(user=user, use_snapshot=use_snapshot))
+
+
+def add_to_path_str(path: str, target: str, prepend: bool) -> str:
+    paths = PathList.parse(path)
+    paths.insert(target, prepend=prepend)
+    return str(paths)
+
+
+def remove_from_path_str(path: str, to_remove: str, system: bool) -> str:
+    paths = PathList.parse(path)
+    remove_from_path_list(paths, to_remove, system=system)
+    return str(paths)
+
+
+def remove_from_path_list(
+    paths: PathList, to_remove: str, system: bool, var: str = "PATH"
+) -> List[str]:
+    """
+    Removes every entry which refers to the same location as `to_remove`, returning
+    the removed entries.
+    """
+    matches = paths.remove(to_remove, use_identity=is_location_variable(var))
+
+    if not matches:
+        raise NotOnPathError(to_remove, system, var=var)
 
-    return ";".join(new_items)
+    return matches
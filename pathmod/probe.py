@@ -0,0 +1,121 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Runs filesystem checks on many PATH entries concurrently, with a timeout for each
+entry so that a single hung network share can't block the whole run.
+"""
+import queue
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from typing import Callable, Dict, Iterable, Iterator
+
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_WORKERS = 32
+
+ProbeResult = namedtuple(
+    "ProbeResult", ["item", "value", "error", "elapsed", "timed_out"]
+)
+
+
+def probe(
+    items: Iterable,
+    check: Callable,
+    timeout: float = DEFAULT_TIMEOUT,
+    workers: int = DEFAULT_WORKERS,
+) -> Dict[object, ProbeResult]:
+    """
+    Calls `check(item)` for each unique item concurrently, returning the results in
+    the original order.
+    """
+    items = list(OrderedDict.fromkeys(items))
+    results = {r.item: r for r in iter_probe(items, check, timeout, workers)}
+    return OrderedDict((item, results[item]) for item in items)
+
+
+def iter_ordered(
+    items: Iterable,
+    check: Callable,
+    timeout: float = DEFAULT_TIMEOUT,
+    workers: int = DEFAULT_WORKERS,
+) -> Iterator[ProbeResult]:
+    """
+    Like `probe()`, but yields each result as soon as it and every result before it
+    are available, so that output can be streamed in the original order.
+    """
+    items = list(OrderedDict.fromkeys(items))
+    finished = {}
+    position = 0
+
+    for result in iter_probe(items, check, timeout, workers):
+        finished[result.item] = result
+        while position < len(items) and items[position] in finished:
+            yield finished.pop(items[position])
+            position += 1
+
+
+def iter_probe(
+    items: Iterable,
+    check: Callable,
+    timeout: float = DEFAULT_TIMEOUT,
+    workers: int = DEFAULT_WORKERS,
+) -> Iterator[ProbeResult]:
+    """
+    Calls `check(item)` for each unique item concurrently, yielding the results as
+    they complete.
+
+    Each check runs in a daemon thread rather than in a ThreadPoolExecutor, because
+    the executor joins its threads at exit: a check which hangs forever would then
+    prevent pathmod from exiting. Checks which time out are abandoned, and their
+    slot is given to the next item.
+    """
+    running = {}
+    pending = deque(OrderedDict.fromkeys(items))
+    finished = queue.Queue()
+
+    def run(item, start):
+        try:
+            value, error = check(item), None
+        except Exception as e:
+            value, error = None, e
+        finished.put((item, value, error, time.perf_counter() - start))
+
+    while pending or running:
+        while pending and len(running) < workers:
+            item = pending.popleft()
+            running[item] = time.perf_counter()
+            threading.Thread(
+                target=run, args=(item, running[item]), daemon=True
+            ).start()
+
+        wait = min(running.values()) + timeout - time.perf_counter()
+        try:
+            item, value, error, elapsed = finished.get(timeout=max(wait, 0))
+            # Results from checks which have already timed out are ignored.
+            if running.pop(item, None) is not None:
+                yield ProbeResult(item, value, error, elapsed, False)
+        except queue.Empty:
+            now = time.perf_counter()
+            for item, start in list(running.items()):
+                if now - start >= timeout:
+                    del running[item]
+                    yield ProbeResult(item, None, None, now - start, True)
@@ -30,19 +30,247 @@ def print(*args, quiet=None, **kwargs):
         sys_print(*args, **kwargs)
 
 
+# Stores the persistent PATH as it was when the session was last refreshed, so that
+# entries which have since been removed can be told apart from session-only entries.
+PERSISTED_VAR = "PATHMOD_PERSISTED_PATH"
+
+
 def print_command(newline_before=True):
     if newline_before:
         print()
 
+    if os.name == "nt":
+        shell, command = "Powershell", "Invoke-Expression $(pathmod refresh -e)"
+    else:
+        shell, command = "shell", 'eval "$(pathmod refresh -e --shell posix)"'
+
     print(
-        f"To refresh the PATH in the current Powershell session, "
-        f"run the command:\n\n"
-        f"Invoke-Expression $(pathmod refresh -gq)",
+        f"To refresh the PATH in the current {shell} session, "
+        f"run the command:\n\n{command}",
         end="\n\n",
     )
 
 
+# The shells which `expression()` and `hook()` support. 'posix' covers bash, zsh and
+# other POSIX shells.
+SHELLS = ("powershell", "cmd", "posix")
+
+
+def hook(shell: str) -> str:
+    """
+    Returns code for a shell's profile which refreshes the session whenever the
+    stamp changes. The stamp is compared on each prompt by the shell itself, so
+    pathmod is only started when the persistent PATH has changed.
+
+    cmd has no prompt hook, so its code is meant for the AutoRun setting, and runs
+    when each cmd starts.
+    """
+    from pathmod import stamp
+
+    filename = stamp.get_stamp_file()
+    seen = stamp.SEEN_VAR
+
+    if shell == "powershell":
+        return (
+            f"$global:PathmodStampFile = {_quote(filename)}\n"
+            f"if (-not $env:{seen} -and [System.IO.File]::Exists($global:PathmodStampFile)) {{\n"
+            f"    $env:{seen} = [System.IO.File]::ReadAllText($global:PathmodStampFile).Trim()\n"
+            f"}}\n"
+            f"if (-not $global:PathmodPrompt) {{\n"
+            f"    $global:PathmodPrompt = $function:prompt\n"
+            f"    function global:prompt {{\n"
+            f"        $code = $global:LASTEXITCODE\n"
+            f"        try {{\n"
+            f"            $stamp = [System.IO.File]::ReadAllText($global:PathmodStampFile).Trim()\n"
+            f"            if ($stamp -ne $env:{seen}) {{\n"
+            f"                Invoke-Expression $(pathmod refresh -e)\n"
+            f"                $env:{seen} = $stamp\n"
+            f"            }}\n"
+            f"        }} catch {{}}\n"
+            f"        $global:LASTEXITCODE = $code\n"
+            f"        & $global:PathmodPrompt\n"
+            f"    }}\n"
+            f"}}"
+        )
+
+    if shell == "cmd":
+        filename = filename.replace("%", "%%")
+        # Not 'echo off', which would also hide the prompt.
+        return (
+            f'@if not exist "{filename}" exit /b\n'
+            f"@set PATHMOD_NEW_STAMP=\n"
+            f'@set /p PATHMOD_NEW_STAMP=<"{filename}"\n'
+            f"@if not defined {seen} goto pathmod_seen\n"
+            f'@if "%PATHMOD_NEW_STAMP%"=="%{seen}%" goto pathmod_seen\n'
+            f"@for /f \"delims=\" %%i in ('pathmod refresh -e --shell cmd') do @%%i\n"
+            f":pathmod_seen\n"
+            f'@set "{seen}=%PATHMOD_NEW_STAMP%"\n'
+            f"@set PATHMOD_NEW_STAMP="
+        )
+
+    return (
+        f"_pathmod_stamp_file={_quote_posix(filename)}\n"
+        f"_pathmod_refresh() {{\n"
+        f"    _pathmod_status=$?\n"
+        f'    if read -r _pathmod_stamp 2>/dev/null < "$_pathmod_stamp_file" &&\n'
+        f'        [ "$_pathmod_stamp" != "${{{seen}-}}" ]; then\n'
+        f'        eval "$(pathmod refresh -e --shell posix)"\n'
+        f'        export {seen}="$_pathmod_stamp"\n'
+        f"    fi\n"
+        f"    return $_pathmod_status\n"
+        f"}}\n"
+        f'if [ -z "${{{seen}-}}" ] && read -r {seen} 2>/dev/null < "$_pathmod_stamp_file"; then\n'
+        f"    export {seen}\n"
+        f"fi\n"
+        f'if [ -n "${{ZSH_VERSION-}}" ]; then\n'
+        f"    autoload -Uz add-zsh-hook && add-zsh-hook precmd _pathmod_refresh\n"
+        f'elif [ -n "${{BASH_VERSION-}}" ]; then\n'
+        f'    case ";${{PROMPT_COMMAND-}};" in\n'
+        f'        *";_pathmod_refresh;"*) ;;\n'
+        f'        *) PROMPT_COMMAND="_pathmod_refresh${{PROMPT_COMMAND:+;$PROMPT_COMMAND}}" ;;\n'
+        f"    esac\n"
+        f"fi"
+    )
+
+
+def get_changes(
+    session: str, persisted: str, last_persisted=None, separator: str = ";"
+):
+    """
+    Compares the session's PATH with the persistent PATH (both PATHs, in the order
+    a new session searches them), returning (removed, prepended, appended). The
+    session's PATH is split with `separator`, e.g. ':' for POSIX shells.
+
+    Entries which were on `last_persisted` but are no longer persistent are removed;
+    anything else which is only in the session, such as an activated virtual
+    environment, is kept. If `last_persisted` is unknown, nothing is removed.
+    New persistent entries which come before every entry already in the session are
+    prepended; the rest are appended.
+    """
+    from pathmod.pathkey import normalize
+
+    def split(value, sep=";"):
+        return [i.strip() for i in value.split(sep) if i.strip()]
+
+    session = split(session, separator)
+    persisted = [os.path.expandvars(i) for i in split(persisted)]
+
+    session_keys = {normalize(i) for i in session}
+    persisted_keys = {normalize(i) for i in persisted}
+    last_keys = {normalize(i) for i in split(last_persisted or "")}
+
+    removed = [
+        i
+        for i in session
+        if normalize(i) in last_keys and normalize(i) not in persisted_keys
+    ]
+
+    prepended = []
+    appended = []
+    added = set()
+    prepending = True
+
+    for entry in persisted:
+        key = normalize(entry)
+        if key in session_keys:
+            prepending = False
+        elif key not in added:
+            added.add(key)
+            (prepended if prepending else appended).append(entry)
+
+    return removed, prepended, appended
+
+
+def expression(shell: str = "powershell") -> str:
+    """
+    Returns code for `shell` (one of SHELLS) which applies the changes between the
+    session's PATH and the persistent PATH, without writing a script to disk.
+    """
+    from pathmod import snapshot, timings
+    from pathmod.backends import get_backend
+
+    backend = get_backend()
+    with timings.phase("read PATH"):
+        data = snapshot.load()
+        if data is not None:
+            system, user = data.get("system", ""), data.get("user", "")
+        else:
+            system = backend.get("PATH", user=False)
+            user = backend.get("PATH", user=True)
+
+    order = (user, system) if backend.user_first else (system, user)
+    persisted = ";".join(i for i in order if i)
+    separator = ":" if shell == "posix" else ";"
+    session = os.environ.get("PATH", "")
+
+    with timings.phase("compare PATH"):
+        removed, prepended, appended = get_changes(
+            session, persisted, os.environ.get(PERSISTED_VAR), separator=separator
+        )
+
+    if shell == "powershell":
+        return _powershell_expression(removed, prepended, appended, persisted)
+
+    # Other shells can't easily filter the PATH themselves, so the new value is
+    # worked out here.
+    removed = set(removed)
+    entries = [i for i in session.split(separator) if i.strip() not in removed]
+    value = separator.join(prepended + [i for i in entries if i] + appended)
+    persisted = os.path.expandvars(persisted)
+
+    if shell == "cmd":
+        # One command per line, so that each can be run by 'for /f'.
+        return f'set "PATH={value}"\nset "{PERSISTED_VAR}={persisted}"'
+
+    return (
+        f"export PATH={_quote_posix(value)} "
+        f"{PERSISTED_VAR}={_quote_posix(persisted)}"
+    )
+
+
+def _powershell_expression(removed, prepended, appended, persisted) -> str:
+    statements = []
+    if removed:
+        items = ",".join(_quote(i) for i in removed)
+        statements.append(
+            f"$env:Path = (($env:Path -split ';') | "
+            f"Where-Object {{ $_ -and @({items}) -notcontains $_ }}) -join ';'"
+        )
+    if prepended:
+        statements.append(
+            f"$env:Path = {_quote(';'.join(prepended) + ';')} + $env:Path"
+        )
+    if appended:
+        statements.append(
+            f"$env:Path = $env:Path.TrimEnd(';') + {_quote(';' + ';'.join(appended))}"
+        )
+
+    statements.append(f"$env:{PERSISTED_VAR} = {_quote(os.path.expandvars(persisted))}")
+    return "; ".join(statements)
+
+
+def _quote(value: str) -> str:
+    """
+    Quotes a value as a literal Powershell string.
+    """
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _quote_posix(value: str) -> str:
+    """
+    Quotes a value as a literal POSIX shell string.
+    """
+    return "'" + value.replace("'", "'\\''") + "'"
+
+
 def generate(quiet: bool):
+    from pathmod import timings
+
+    with timings.phase("generate script"):
+        _generate(quiet)
+
+
+def _generate(quiet: bool):
     script_only = quiet
     print(
         f"Creating Powershell script to update the PATH in the current session...",
@@ -0,0 +1,416 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Reads and writes string values in offline registry hive files (e.g. NTUSER.DAT),
+without loading them into the registry. This only supports what pathmod needs:
+finding an existing key, and reading or replacing its string values.
+
+The layout of the format is described in "Windows registry file format
+specification" by Maxim Suhanov. Offsets of cells are relative to the start of the
+first hive bin, which follows the 4096-byte base block.
+"""
+import os
+import struct
+import time
+from typing import List, Optional, Tuple
+
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_DWORD = 4
+
+BASE_BLOCK_SIZE = 4096
+HBIN_HEADER_SIZE = 32
+
+# Data larger than this is split into segments using a "db" record (hive version 1.4+).
+MAX_CELL_DATA = 16344
+
+KEY_COMP_NAME = 0x0020
+VALUE_COMP_NAME = 0x0001
+DATA_INLINE = 0x80000000
+NO_OFFSET = 0xFFFFFFFF
+
+# Seconds between 1601-01-01 (the FILETIME epoch) and 1970-01-01.
+FILETIME_EPOCH_OFFSET = 11644473600
+
+
+class HiveError(Exception):
+    """
+    Raised when a hive file can't be read, or doesn't have the expected layout.
+    """
+
+
+class Hive:
+    """
+    A hive file loaded into memory. Changes are only written by `save()`.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+
+        try:
+            with open(filename, "rb") as f:
+                self.data = bytearray(f.read())
+        except OSError as e:
+            raise HiveError(f"Could not read '{filename}': {e}") from e
+
+        if len(self.data) < BASE_BLOCK_SIZE or self.data[:4] != b"regf":
+            raise HiveError(f"'{filename}' is not a registry hive.")
+
+        primary, secondary = struct.unpack_from("<II", self.data, 4)
+        if primary != secondary:
+            # The latest changes are only in the transaction logs (.LOG1/.LOG2).
+            raise HiveError(
+                f"'{filename}' was not unloaded cleanly. Load and unload it once "
+                f"(e.g. with 'reg load' and 'reg unload') before editing it offline."
+            )
+
+        self.minor_version = struct.unpack_from("<I", self.data, 24)[0]
+        self.root = struct.unpack_from("<I", self.data, 36)[0]
+
+    def find_key(self, path: str) -> Optional[int]:
+        """
+        Returns the offset of the key at `path` (relative to the root key, separated
+        by backslashes), or None if it does not exist. Names are case-insensitive.
+        """
+        key = self.root
+        for name in filter(None, path.split("\\")):
+            key = self._find_subkey(key, name)
+            if key is None:
+                return None
+        return key
+
+    def get_value(self, key: int, name: str) -> Tuple[Optional[bytes], Optional[int]]:
+        """
+        Returns the raw data and type of a value, or (None, None) if it does not exist.
+        """
+        vk = self._find_value(key, name)
+        if vk is None:
+            return None, None
+
+        size, offset, value_type = struct.unpack_from("<III", self.data, vk + 4)
+        return self._read_data(size, offset), value_type
+
+    def get_string(self, key: int, name: str) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Returns a string value and its type, or (None, None) if it does not exist.
+        """
+        data, value_type = self.get_value(key, name)
+        if data is None:
+            return None, None
+
+        if value_type == REG_DWORD and len(data) >= 4:
+            return str(struct.unpack_from("<I", data)[0]), value_type
+        return data.decode("utf-16-le", "replace").split("\0", 1)[0], value_type
+
+    def set_string(self, key: int, name: str, value: str, value_type: int):
+        """
+        Sets a REG_SZ or REG_EXPAND_SZ value, creating it if it does not exist.
+        """
+        data = (value + "\0").encode("utf-16-le")
+        vk = self._find_value(key, name)
+
+        if vk is None:
+            vk = self._add_value(key, name)
+        else:
+            old_size, old_offset = struct.unpack_from("<II", self.data, vk + 4)
+            self._free_data(old_size, old_offset)
+
+        size, offset = self._write_data(data)
+        struct.pack_into("<III", self.data, vk + 4, size, offset, value_type)
+
+        # The key keeps the size of its largest value, which Windows uses as a hint.
+        largest = struct.unpack_from("<I", self.data, self._cell(key) + 64)[0]
+        if len(data) > largest:
+            struct.pack_into("<I", self.data, self._cell(key) + 64, len(data))
+        struct.pack_into("<Q", self.data, self._cell(key) + 4, _filetime())
+
+    def save(self, filename: Optional[str] = None):
+        """
+        Writes the hive, marking it as cleanly unloaded so that any transaction
+        logs are ignored.
+        """
+        filename = filename or self.filename
+
+        sequence = (struct.unpack_from("<I", self.data, 4)[0] + 1) & 0xFFFFFFFF
+        struct.pack_into("<IIQ", self.data, 4, sequence, sequence, _filetime())
+        struct.pack_into("<I", self.data, 508, _checksum(self.data))
+
+        # Write to a temporary file first, so that a failure never leaves a partial hive.
+        temp = f"{filename}.{os.getpid()}.tmp"
+        try:
+            with open(temp, "wb") as f:
+                f.write(self.data)
+            os.replace(temp, filename)
+        except OSError as e:
+            raise HiveError(f"Could not write '{filename}': {e}") from e
+
+    def _cell(self, offset: int) -> int:
+        """
+        Returns the position of a cell's data in the file.
+        """
+        position = BASE_BLOCK_SIZE + offset + 4
+        if offset == NO_OFFSET or position > len(self.data):
+            raise HiveError(f"'{self.filename}' is corrupt (bad cell offset {offset}).")
+        return position
+
+    def _cell_size(self, offset: int) -> int:
+        return abs(struct.unpack_from("<i", self.data, BASE_BLOCK_SIZE + offset)[0])
+
+    def _read_name(self, position: int, length: int, compressed: bool) -> str:
+        raw = bytes(self.data[position : position + length])
+        return raw.decode("latin-1") if compressed else raw.decode("utf-16-le")
+
+    def _find_subkey(self, key: int, name: str) -> Optional[int]:
+        nk = self._cell(key)
+        count, subkeys = struct.unpack_from("<I4xI", self.data, nk + 20)
+        if not count:
+            return None
+
+        for child in self._iter_subkeys(subkeys):
+            child_nk = self._cell(child)
+            flags = struct.unpack_from("<H", self.data, child_nk + 2)[0]
+            length = struct.unpack_from("<H", self.data, child_nk + 72)[0]
+            child_name = self._read_name(
+                child_nk + 76, length, bool(flags & KEY_COMP_NAME)
+            )
+            if child_name.upper() == name.upper():
+                return child
+
+        return None
+
+    def _iter_subkeys(self, offset: int) -> List[int]:
+        position = self._cell(offset)
+        signature = bytes(self.data[position : position + 2])
+        count = struct.unpack_from("<H", self.data, position + 2)[0]
+
+        if signature in (b"lf", b"lh"):
+            # Each element is an offset followed by a hint or hash of the name.
+            return [
+                struct.unpack_from("<I", self.data, position + 4 + 8 * i)[0]
+                for i in range(count)
+            ]
+        if signature == b"li":
+            return list(struct.unpack_from(f"<{count}I", self.data, position + 4))
+        if signature == b"ri":
+            result = []
+            for sublist in struct.unpack_from(f"<{count}I", self.data, position + 4):
+                result.extend(self._iter_subkeys(sublist))
+            return result
+
+        raise HiveError(f"'{self.filename}' has an unknown subkey list type.")
+
+    def _get_value_offsets(self, key: int) -> List[int]:
+        count, values = struct.unpack_from("<II", self.data, self._cell(key) + 36)
+        if not count:
+            return []
+        return list(struct.unpack_from(f"<{count}I", self.data, self._cell(values)))
+
+    def _find_value(self, key: int, name: str) -> Optional[int]:
+        for offset in self._get_value_offsets(key):
+            vk = self._cell(offset)
+            if self.data[vk : vk + 2] != b"vk":
+                raise HiveError(f"'{self.filename}' has a corrupt value list.")
+
+            length = struct.unpack_from("<H", self.data, vk + 2)[0]
+            flags = struct.unpack_from("<H", self.data, vk + 16)[0]
+            value_name = self._read_name(vk + 20, length, bool(flags & VALUE_COMP_NAME))
+            if value_name.upper() == name.upper():
+                return vk
+
+        return None
+
+    def _read_data(self, size: int, offset: int) -> bytes:
+        if size & DATA_INLINE:
+            # Up to 4 bytes are stored in place of the offset.
+            return struct.pack("<I", offset)[: size & ~DATA_INLINE]
+
+        position = self._cell(offset)
+        if self._is_big_data(size, position):
+            count, segments = struct.unpack_from("<HI", self.data, position + 2)
+            data = b"".join(
+                bytes(self.data[self._cell(o) : self._cell(o) + MAX_CELL_DATA])
+                for o in struct.unpack_from(
+                    f"<{count}I", self.data, self._cell(segments)
+                )
+            )
+            return data[:size]
+
+        return bytes(self.data[position : position + size])
+
+    def _is_big_data(self, size: int, position: int) -> bool:
+        return (
+            self.minor_version > 3
+            and size > MAX_CELL_DATA
+            and self.data[position : position + 2] == b"db"
+        )
+
+    def _write_data(self, data: bytes) -> Tuple[int, int]:
+        """
+        Stores value data, returning the (size, offset) fields for its value.
+        """
+        if len(data) <= 4:
+            return len(data) | DATA_INLINE, struct.unpack("<I", data.ljust(4, b"\0"))[0]
+
+        if len(data) <= MAX_CELL_DATA or self.minor_version <= 3:
+            return len(data), self._allocate(data)
+
+        segments = [
+            self._allocate(data[i : i + MAX_CELL_DATA])
+            for i in range(0, len(data), MAX_CELL_DATA)
+        ]
+        segment_list = self._allocate(struct.pack(f"<{len(segments)}I", *segments))
+        db = self._allocate(struct.pack("<2sHI", b"db", len(segments), segment_list))
+        return len(data), db
+
+    def _free_data(self, size: int, offset: int):
+        if size & DATA_INLINE or not size or offset == NO_OFFSET:
+            return
+
+        position = self._cell(offset)
+        if self._is_big_data(size, position):
+            count, segments = struct.unpack_from("<HI", self.data, position + 2)
+            for segment in struct.unpack_from(
+                f"<{count}I", self.data, self._cell(segments)
+            ):
+                self._free(segment)
+            self._free(segments)
+
+        self._free(offset)
+
+    def _add_value(self, key: int, name: str) -> int:
+        """
+        Creates an empty value, returning the position of its "vk" record.
+        """
+        if all(ord(c) < 128 for c in name):
+            encoded, flags = name.encode("ascii"), VALUE_COMP_NAME
+        else:
+            encoded, flags = name.encode("utf-16-le"), 0
+
+        vk = self._allocate(
+            struct.pack(
+                "<2sHIIIHH", b"vk", len(encoded), 0, NO_OFFSET, REG_SZ, flags, 0
+            )
+            + encoded
+        )
+
+        # Value lists can't grow in place, so the list is copied with the new value.
+        nk = self._cell(key)
+        offsets = self._get_value_offsets(key)
+        old_list = struct.unpack_from("<I", self.data, nk + 40)[0]
+        new_list = self._allocate(struct.pack(f"<{len(offsets) + 1}I", *offsets, vk))
+        if offsets:
+            self._free(old_list)
+
+        nk = self._cell(key)
+        struct.pack_into("<II", self.data, nk + 36, len(offsets) + 1, new_list)
+        largest_name = struct.unpack_from("<I", self.data, nk + 60)[0]
+        struct.pack_into("<I", self.data, nk + 60, max(largest_name, len(encoded)))
+
+        return self._cell(vk)
+
+    def _allocate(self, data: bytes) -> int:
+        """
+        Stores `data` in a new cell, returning the cell's offset. Free cells are
+        reused where possible; otherwise a new hive bin is added to the end.
+        """
+        needed = (len(data) + 4 + 7) & ~7
+        offset = self._find_free_cell(needed)
+
+        if offset is None:
+            offset = self._add_hbin(needed)
+
+        size = self._cell_size(offset)
+        if size - needed >= 8:
+            # Split the free cell, leaving the remainder free.
+            struct.pack_into(
+                "<i", self.data, BASE_BLOCK_SIZE + offset + needed, size - needed
+            )
+            size = needed
+
+        position = BASE_BLOCK_SIZE + offset
+        struct.pack_into("<i", self.data, position, -size)
+        self.data[position + 4 : position + size] = data.ljust(size - 4, b"\0")
+        return offset
+
+    def _free(self, offset: int):
+        position = BASE_BLOCK_SIZE + offset
+        size = struct.unpack_from("<i", self.data, position)[0]
+        if size < 0:
+            struct.pack_into("<i", self.data, position, -size)
+
+    def _find_free_cell(self, needed: int) -> Optional[int]:
+        hbins_size = struct.unpack_from("<I", self.data, 40)[0]
+        hbin = 0
+
+        while hbin < hbins_size:
+            position = BASE_BLOCK_SIZE + hbin
+            if self.data[position : position + 4] != b"hbin":
+                raise HiveError(f"'{self.filename}' is corrupt (bad hive bin).")
+
+            hbin_size = struct.unpack_from("<I", self.data, position + 8)[0]
+            offset = hbin + HBIN_HEADER_SIZE
+            while offset < hbin + hbin_size:
+                size = struct.unpack_from("<i", self.data, BASE_BLOCK_SIZE + offset)[0]
+                if size == 0:
+                    raise HiveError(f"'{self.filename}' is corrupt (empty cell).")
+                if size >= needed:
+                    return offset
+                offset += abs(size)
+
+            hbin += hbin_size
+
+        return None
+
+    def _add_hbin(self, needed: int) -> int:
+        """
+        Appends a hive bin with room for a cell of `needed` bytes, returning the
+        offset of its (free) cell.
+        """
+        hbins_size = struct.unpack_from("<I", self.data, 40)[0]
+        hbin_size = (needed + HBIN_HEADER_SIZE + 4095) & ~4095
+
+        # Anything after the hive bins (e.g. padding) is dropped.
+        del self.data[BASE_BLOCK_SIZE + hbins_size :]
+        self.data += struct.pack(
+            "<4sIIQQI", b"hbin", hbins_size, hbin_size, 0, _filetime(), 0
+        )
+        self.data += struct.pack("<i", hbin_size - HBIN_HEADER_SIZE)
+        self.data += bytes(hbin_size - HBIN_HEADER_SIZE - 4)
+
+        struct.pack_into("<I", self.data, 40, hbins_size + hbin_size)
+        return hbins_size + HBIN_HEADER_SIZE
+
+
+def _checksum(data: bytearray) -> int:
+    checksum = 0
+    for dword in struct.unpack_from("<127I", data):
+        checksum ^= dword
+
+    if checksum == 0xFFFFFFFF:
+        return 0xFFFFFFFE
+    if checksum == 0:
+        return 1
+    return checksum
+
+
+def _filetime() -> int:
+    return int((time.time() + FILETIME_EPOCH_OFFSET) * 10_000_000)
@@ -0,0 +1,157 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Moves frequently used locations earlier on the PATH, so that fewer locations are
+searched before finding the commands which are actually used.
+
+Locations are only reordered if it doesn't change which executable any command
+resolves to: if several locations provide the same command, the location which
+currently provides it stays ahead of the others.
+"""
+import heapq
+import sys
+from typing import Dict, List
+
+from pathmod import index, pathutils, usage
+from pathmod.pathlist import PathList, normalize
+
+
+def get_new_order(
+    entries: List[str],
+    locations: List[index.Location],
+    hits: Dict[str, int],
+    system: bool,
+) -> List[str]:
+    """
+    Returns the entries of the user or system PATH with frequently used locations
+    moved earlier, keeping the order of locations which provide the same command.
+
+    Locations whose contents are unknown can't be moved past, since they might
+    provide any command.
+    """
+    known = {normalize(l.entry) for l in locations if l.indexed}
+    position = {}
+    for i, entry in enumerate(entries):
+        position.setdefault(normalize(entry), i)
+
+    # successors[i] holds the entries which must stay after entry i.
+    successors = [[] for _ in entries]
+    predecessors = [0] * len(entries)
+
+    for matches in index.get_commands(locations).values():
+        first = matches[0].location
+        if first.system != system:
+            continue
+
+        i = position.get(normalize(first.entry))
+        for match in matches[1:]:
+            j = position.get(normalize(match.location.entry))
+            if match.location.system == system and None not in (i, j) and i != j:
+                successors[i].append(j)
+                predecessors[j] += 1
+
+    # An entry's priority also includes the entries which must stay after it, so that
+    # it is moved forward to make room for them. Successors always come later.
+    priority = [hits.get(normalize(entry), 0) for entry in entries]
+    for i in reversed(range(len(entries))):
+        for j in successors[i]:
+            priority[i] = max(priority[i], priority[j])
+
+    def key(i):
+        return -priority[i], -hits.get(normalize(entries[i]), 0), i
+
+    result = []
+    segment = []
+
+    def flush():
+        # Within each segment, always take the most used entry which is allowed next.
+        heap = [key(i) for i in segment if not predecessors[i]]
+        heapq.heapify(heap)
+        members = set(segment)
+
+        while heap:
+            i = heapq.heappop(heap)[-1]
+            result.append(entries[i])
+            for j in successors[i]:
+                predecessors[j] -= 1
+                if not predecessors[j] and j in members:
+                    heapq.heappush(heap, key(j))
+
+        segment.clear()
+
+    for i, entry in enumerate(entries):
+        if normalize(entry) in known:
+            segment.append(i)
+        else:
+            flush()
+            result.append(entry)
+    flush()
+
+    return result
+
+
+def reorder(system: bool, dry_run: bool, timeout: float):
+    hits = usage.get_usage()
+    if not hits:
+        print(
+            f"Error: no usage has been recorded. "
+            f"Run 'pathmod usage hook' to see how to start recording."
+        )
+        sys.exit(1)
+
+    before = pathutils.read_persisted_path(user=not system, use_snapshot=False)
+    paths = PathList.parse(before)
+    locations = index.load_index(timeout=timeout)
+    entries = get_new_order(paths.entries, locations, hits, system=system)
+
+    if entries == paths.entries:
+        print("The PATH is already in the best order.")
+        return
+
+    print()
+    old_positions = {}
+    for i, entry in enumerate(paths.entries):
+        old_positions.setdefault(entry, i)
+
+    for i, entry in enumerate(entries):
+        old = old_positions[entry]
+        if old != i:
+            uses = hits.get(normalize(entry), 0)
+            print(f"{old + 1:>4} -> {i + 1:<4}{uses:>8} uses\t'{entry}'")
+
+    new_paths = PathList()
+    for entry in entries:
+        new_paths.append(entry)
+
+    def replan():
+        before = pathutils.read_persisted_path(user=not system, use_snapshot=False)
+        paths = PathList.parse(before)
+        entries = get_new_order(paths.entries, locations, hits, system=system)
+        after = {system: str(PathList(entries))} if entries != paths.entries else {}
+        return after, {system: before}
+
+    pathutils.commit_paths(
+        {system: str(new_paths)},
+        dry_run=dry_run,
+        expected={system: before},
+        replan=replan,
+    )
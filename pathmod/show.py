@@ -0,0 +1,195 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Lists the entries on the persistent user and system PATH, optionally with details
+about each location, as text, JSON Lines or CSV.
+"""
+import csv
+import json
+import os
+import stat
+import sys
+import time
+from collections import OrderedDict
+from typing import Dict, Iterator, List
+
+from pathmod import index, pathutils, probe
+
+FIELDS = ["scope", "position", "entry", "expanded"]
+DETAIL_FIELDS = ["exists", "is_dir", "executables", "stat_ms", "timed_out", "error"]
+
+
+def show(shadowed: bool, details: bool, output_format: str, timeout: float):
+    user, system = pathutils.get_current_paths()
+    rows = iter_rows(user, system, details=details, timeout=timeout)
+
+    if output_format == "json":
+        # One object per line, so that consumers can process entries as they arrive.
+        for row in rows:
+            print(json.dumps(row), flush=True)
+    elif output_format == "csv":
+        writer = csv.DictWriter(
+            sys.stdout,
+            fieldnames=FIELDS + (DETAIL_FIELDS if details else []),
+            lineterminator="\n",
+        )
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            sys.stdout.flush()
+    else:
+        print_text(user, system, rows, details=details, shadowed=shadowed)
+
+
+def iter_rows(
+    user: List[str], system: List[str], details: bool, timeout: float
+) -> Iterator[Dict]:
+    """
+    Yields a row for each entry, in order. If `details` is set, locations are checked
+    concurrently, and each row is yielded as soon as its location has been checked.
+    """
+    # An unset PATH is read as a single empty entry, which isn't a location.
+    entries = [("user", i, entry) for i, entry in enumerate(user) if entry]
+    entries += [("system", i, entry) for i, entry in enumerate(system) if entry]
+    expanded = [os.path.expandvars(entry.strip('"')) for _, _, entry in entries]
+
+    if details:
+        pathext = index.get_pathext()
+        results = probe.iter_ordered(
+            expanded, lambda path: check_location(path, pathext), timeout=timeout
+        )
+    finished = {}
+
+    for (scope, position, entry), path in zip(entries, expanded):
+        row = OrderedDict(
+            [
+                ("scope", scope),
+                ("position", position),
+                ("entry", entry),
+                ("expanded", path),
+            ]
+        )
+
+        if details:
+            while path not in finished:
+                result = next(results)
+                finished[result.item] = result
+            row.update(_get_details(finished[path]))
+
+        yield row
+
+
+def check_location(path: str, pathext: List[str]) -> Dict:
+    start = time.perf_counter()
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return {"exists": False, "is_dir": False, "executables": 0}
+    stat_ms = (time.perf_counter() - start) * 1000
+
+    is_dir = stat.S_ISDIR(st.st_mode)
+    executables = (
+        len(index.scan_location(path, None, pathext)["files"]) if is_dir else 0
+    )
+
+    return {
+        "exists": True,
+        "is_dir": is_dir,
+        "executables": executables,
+        "stat_ms": round(stat_ms, 3),
+    }
+
+
+def _get_details(result: probe.ProbeResult) -> Dict:
+    details = OrderedDict((field, None) for field in DETAIL_FIELDS)
+    details["timed_out"] = result.timed_out
+
+    if result.value is not None:
+        details.update(result.value)
+    elif result.error is not None:
+        details["error"] = str(result.error)
+
+    return details
+
+
+def print_text(
+    user: List[str],
+    system: List[str],
+    rows: Iterator[Dict],
+    details: bool,
+    shadowed: bool,
+):
+    print()
+    h = "-" * 70
+    print(h)
+    print(f"Path\t\tLocation")
+    print(h, end="\n\n")
+
+    if details:
+        scope = "user"
+        for row in rows:
+            if row["scope"] != scope:
+                scope = row["scope"]
+                print()
+
+            label = "[user]   " if scope == "user" else "[system]"
+            print(f"{label}\t'{row['entry']}'\t{_describe(row)}", flush=True)
+    else:
+        for i in user:
+            if i:
+                print(f"[user]   \t'{i}'")
+
+        print()
+        for i in system:
+            if i:
+                print(f"[system]\t'{i}'")
+
+    print()
+
+    if shadowed:
+        print(h)
+        print(f"Command\t\tExecutables (the first is used)")
+        print(h, end="\n\n")
+
+        for name, matches in index.get_shadowed(index.load_index()).items():
+            for n, match in enumerate(matches):
+                label = name if n == 0 else ""
+                print(f"{label:<16}{format_match(match)}")
+        print()
+
+
+def format_match(match: index.Match) -> str:
+    scope = "[system]" if match.location.system else "[user]  "
+    return f"{scope}\t'{os.path.join(match.location.path, match.filename)}'"
+
+
+def _describe(row: Dict) -> str:
+    if row["timed_out"]:
+        return "timed out"
+    if row["error"]:
+        return f"error: {row['error']}"
+    if not row["exists"]:
+        return "does not exist"
+    if not row["is_dir"]:
+        return "not a directory"
+
+    return f"{row['executables']} executables, stat {row['stat_ms']:.1f} ms"
@@ -0,0 +1,172 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+A snapshot of the persistent user and system PATH, kept up to date by
+'pathmod watch', so that reading the PATH doesn't need to query the backend.
+
+The snapshot is only rewritten when the PATH changes, and has a version which is
+incremented each time. While the watcher is running, it touches the file
+periodically; a snapshot which hasn't been touched recently is considered stale,
+and the backend is read directly instead.
+
+The snapshot is read on the startup hot path, so it uses a simple line-based format
+rather than JSON:
+
+    pathmod-snapshot 1
+    version=<n>
+    backend=<PATHMOD_BACKEND>
+    user=<user PATH>
+    system=<system PATH>
+"""
+import os
+import time
+
+SNAPSHOT_FILE = "snapshot.txt"
+HEADER = "pathmod-snapshot 1"
+
+# Seconds between the watcher touching the snapshot.
+HEARTBEAT = 5.0
+
+# Snapshots which haven't been touched for this many seconds are not used.
+STALE_AFTER = 3 * HEARTBEAT
+
+
+def get_snapshot_file() -> str:
+    from pathmod import state
+
+    return state.get_state_file(SNAPSHOT_FILE)
+
+
+def _backend_spec() -> str:
+    return os.environ.get("PATHMOD_BACKEND", "")
+
+
+def load(fresh_only: bool = True):
+    """
+    Returns the contents of the snapshot, or None if there is no usable snapshot.
+    """
+    filename = get_snapshot_file()
+
+    try:
+        if fresh_only and time.time() - os.stat(filename).st_mtime > STALE_AFTER:
+            return None
+        with open(filename, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None
+
+    if not lines or lines[0] != HEADER:
+        return None
+
+    data = dict(line.partition("=")[::2] for line in lines[1:])
+    if data.get("backend") != _backend_spec() or "version" not in data:
+        return None
+
+    return data
+
+
+def read_path(user: bool):
+    """
+    Returns the persistent PATH from the snapshot, or None if it isn't fresh.
+    """
+    data = load()
+    if data is None:
+        return None
+
+    return data.get("user" if user else "system")
+
+
+def save(user: str, system: str, version: int):
+    filename = get_snapshot_file()
+    temp = f"{filename}.{os.getpid()}.tmp"
+
+    with open(temp, "w", encoding="utf-8") as f:
+        f.write(
+            f"{HEADER}\n"
+            f"version={version}\n"
+            f"backend={_backend_spec()}\n"
+            f"user={user}\n"
+            f"system={system}\n"
+        )
+    os.replace(temp, filename)
+
+
+def touch():
+    try:
+        os.utime(get_snapshot_file())
+    except OSError:
+        pass
+
+
+def remove():
+    try:
+        os.remove(get_snapshot_file())
+    except OSError:
+        pass
+
+
+def update(paths):
+    """
+    Updates a fresh snapshot after pathmod writes the PATH, keyed by whether it is
+    the system PATH, so that readers don't see the old value before the watcher
+    notices the change.
+    """
+    data = load()
+    if data is None:
+        return
+
+    user = paths.get(False, data.get("user", ""))
+    system = paths.get(True, data.get("system", ""))
+    try:
+        save(user, system, int(data["version"]) + 1)
+    except (OSError, ValueError):
+        remove()
+
+
+def watch(on_change=None):
+    """
+    Keeps the snapshot up to date until interrupted.
+    """
+    from pathmod import stamp
+    from pathmod.backends import get_backend
+
+    backend = get_backend()
+
+    try:
+        while True:
+            values = (backend.get("PATH", user=True), backend.get("PATH", user=False))
+
+            # The snapshot may also have been updated by pathmod after writing the PATH.
+            data = load(fresh_only=False)
+            if data is None or (data.get("user"), data.get("system")) != values:
+                version = int(data["version"]) + 1 if data else 1
+                save(*values, version=version)
+                # Also tells sessions about changes made by other programs.
+                stamp.bump()
+                if on_change:
+                    on_change(version)
+            else:
+                touch()
+
+            backend.wait_for_change(HEARTBEAT)
+    finally:
+        remove()
@@ -0,0 +1,70 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+A tiny file whose contents change whenever pathmod (or the watcher) sees the
+persistent PATH change. Shell hooks compare it with the value they saw last, so
+that they only start pathmod to refresh the session when it is needed.
+
+The stamp is read by shell code on every prompt, so it is a single line of text.
+"""
+import os
+import time
+
+STAMP_FILE = "stamp.txt"
+
+# The stamp which the session last refreshed for; set by the shell hooks.
+SEEN_VAR = "PATHMOD_STAMP"
+
+
+def get_stamp_file() -> str:
+    from pathmod import state
+
+    return state.get_state_file(STAMP_FILE)
+
+
+def read() -> str:
+    """
+    Returns the current stamp, or an empty string if there isn't one yet.
+    """
+    try:
+        with open(get_stamp_file(), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def bump() -> None:
+    """
+    Replaces the stamp with a new value. A timestamp is used rather than a counter,
+    so that the stamp doesn't need to be read first.
+    """
+    filename = get_stamp_file()
+    temp = f"{filename}.{os.getpid()}.tmp"
+
+    try:
+        with open(temp, "w", encoding="utf-8") as f:
+            # time.time_ns() would need Python 3.7.
+            f.write(f"{int(time.time() * 1e9)}-{os.getpid()}\n")
+        os.replace(temp, filename)
+    except OSError:
+        # Sessions just won't be refreshed automatically; the PATH is still written.
+        pass
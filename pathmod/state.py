@@ -0,0 +1,86 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Locations of the files pathmod keeps between runs, such as caches.
+
+This module is used on the startup hot path, so json is only imported when needed.
+"""
+import os
+
+STATE_DIR_ENV_VAR = "PATHMOD_HOME"
+
+# Directories which are known to exist, so that reading state files doesn't need to
+# check each time.
+_created = set()
+
+
+def get_state_dir() -> str:
+    """
+    Returns the directory used to store pathmod's files, creating it if necessary.
+
+    This is '%LOCALAPPDATA%\\pathmod' on Windows and '~/.local/share/pathmod'
+    elsewhere, unless overridden with the PATHMOD_HOME environment variable.
+    """
+    state_dir = os.environ.get(STATE_DIR_ENV_VAR)
+
+    if not state_dir:
+        if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+            state_dir = os.path.join(os.environ["LOCALAPPDATA"], "pathmod")
+        else:
+            state_dir = os.path.join("~", ".local", "share", "pathmod")
+
+    state_dir = os.path.abspath(os.path.expanduser(state_dir))
+    if state_dir not in _created:
+        os.makedirs(state_dir, exist_ok=True)
+        _created.add(state_dir)
+    return state_dir
+
+
+def get_state_file(name: str) -> str:
+    return os.path.join(get_state_dir(), name)
+
+
+def load_json(name: str, default=None):
+    """
+    Loads a JSON state file, returning `default` if it is missing or unreadable.
+    """
+    import json
+
+    try:
+        with open(get_state_file(name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(name: str, data) -> None:
+    """
+    Atomically replaces a JSON state file.
+    """
+    import json
+
+    filename = get_state_file(name)
+    temp = f"{filename}.{os.getpid()}.tmp"
+
+    with open(temp, "w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+    os.replace(temp, filename)
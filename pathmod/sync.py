@@ -0,0 +1,266 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Converges the PATH to the state described by a manifest, making as few changes as
+possible, and writing nothing at all if it already matches. A manifest lists the
+desired entries of each PATH in order:
+
+    # Entries which must be on the user PATH, in this order.
+    [user]
+    %USERPROFILE%\\bin
+    %LOCALAPPDATA%\\Programs\\Python\\Python311
+
+    # The system PATH must be exactly this.
+    [system exact]
+    %SystemRoot%\\system32
+    %SystemRoot%
+
+In the default "contains" mode, other entries on the PATH are left where they are.
+In "exact" mode, the PATH must have exactly these entries. PATHs without a section
+are not changed. Entries are compared in the same way as elsewhere in pathmod, so
+e.g. a difference in case doesn't cause a write.
+"""
+import sys
+from collections import namedtuple
+from typing import Dict, Iterable, List
+
+from pathmod import pathutils, timings
+from pathmod.pathlist import PathList, normalize
+
+MODES = ("contains", "exact")
+SECTIONS = {"user": False, "system": True}
+
+# The desired entries of one PATH.
+Section = namedtuple("Section", ["mode", "entries"])
+
+
+def parse_manifest(lines: Iterable[str]) -> Dict[bool, Section]:
+    """
+    Parses a manifest, returning its sections keyed by whether they are for the
+    system PATH. Blank lines and lines starting with '#' are ignored.
+    """
+    sections: Dict[bool, Section] = {}
+    errors = []
+    current = None
+
+    for n, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        if line.startswith("[") and line.endswith("]"):
+            name, _, mode = line[1:-1].strip().lower().partition(" ")
+            mode = mode.strip() or "contains"
+            current = None
+
+            if name not in SECTIONS:
+                errors.append(f"line {n}: unknown section '{line}'")
+            elif mode not in MODES:
+                errors.append(f"line {n}: unknown mode '{mode}'")
+            elif SECTIONS[name] in sections:
+                errors.append(f"line {n}: '[{name}]' appears more than once")
+            else:
+                current = SECTIONS[name]
+                sections[current] = Section(mode, [])
+            continue
+
+        if len(line) > 1 and line[0] == line[-1] and line[0] in "\"'":
+            line = line[1:-1]
+
+        if current is None:
+            errors.append(f"line {n}: '{line}' is not in a section")
+        elif normalize(line) in {normalize(i) for i in sections[current].entries}:
+            errors.append(f"line {n}: '{line}' appears more than once")
+        else:
+            sections[current].entries.append(line)
+
+    for system, section in sections.items():
+        if section.mode == "exact" and not section.entries:
+            errors.append(
+                f"'[{_name(system)} exact]' has no entries; "
+                f"this would remove every entry from the PATH"
+            )
+
+    if not sections and not errors:
+        errors.append("no sections found")
+
+    if errors:
+        print("Error: could not parse the manifest:\n")
+        for e in errors:
+            print(f"\t{e}")
+        sys.exit(1)
+
+    return sections
+
+
+def plan(current: PathList, section: Section) -> PathList:
+    """
+    Returns the PATH with the manifest's entries applied.
+
+    In "contains" mode, the longest run of desired entries which are already in the
+    right order is left alone. The other desired entries are moved (or added)
+    directly after the desired entry which precedes them, or before the first
+    entry which stays if they come first. If none are on the PATH yet, they are
+    added to the end.
+    """
+    if section.mode == "exact":
+        return PathList(section.entries)
+
+    desired = [(entry, normalize(entry)) for entry in section.entries]
+    positions = {}
+    for n, entry in enumerate(current):
+        positions.setdefault(normalize(entry), n)
+
+    present = [key for _, key in desired if key in positions]
+    kept = _longest_increasing(present, key=positions.get)
+
+    moved = {key for _, key in desired if key not in kept}
+    result = [(entry, normalize(entry)) for entry in current]
+    result = [item for item in result if item[1] not in moved]
+
+    previous = None
+    for entry, key in desired:
+        if key in moved:
+            if previous is not None:
+                index = next(n for n, i in enumerate(result) if i[1] == previous) + 1
+            elif kept:
+                index = next(n for n, i in enumerate(result) if i[1] in kept)
+            else:
+                index = len(result)
+            result.insert(index, (entry, key))
+        previous = key
+
+    return PathList(entry for entry, _ in result)
+
+
+def _longest_increasing(items: List[str], key) -> set:
+    """
+    Returns the items which make up the longest subsequence with increasing keys.
+    """
+    import bisect
+
+    tails: List[int] = []
+    tail_items: List[int] = []
+    parents: List[int] = []
+
+    for n, item in enumerate(items):
+        value = key(item)
+        i = bisect.bisect_left(tails, value)
+        if i == len(tails):
+            tails.append(value)
+            tail_items.append(n)
+        else:
+            tails[i] = value
+            tail_items[i] = n
+        parents.append(tail_items[i - 1] if i else -1)
+
+    result = set()
+    n = tail_items[-1] if tail_items else -1
+    while n >= 0:
+        result.add(items[n])
+        n = parents[n]
+
+    return result
+
+
+def sync(sections: Dict[bool, Section], dry_run: bool, force: bool):
+    """
+    Makes each PATH in the manifest match it. Nothing is written, and running
+    programs aren't notified, if every PATH already matches.
+    """
+    before, after = _plan_sections(sections, use_snapshot=True)
+
+    for system, paths in after.items():
+        print_changes(PathList.parse(before[system]), paths, system=system)
+
+    if not after:
+        print("The PATH already matches the manifest.")
+        return
+
+    def replan():
+        before, after = _plan_sections(sections, use_snapshot=False)
+        return {system: str(paths) for system, paths in after.items()}, before
+
+    # The PATH may have been read from the watcher's snapshot, so it is checked
+    # again before being written.
+    pathutils.commit_paths(
+        {system: str(paths) for system, paths in after.items()},
+        dry_run=dry_run,
+        force=force,
+        expected=before,
+        replan=replan,
+    )
+
+
+def print_changes(before: PathList, after: PathList, system: bool):
+    scope = "[system]" if system else "[user]  "
+    old = [normalize(i) for i in before]
+    new = [normalize(i) for i in after]
+    old_keys = set(old)
+    new_keys = set(new)
+
+    for entry, key in zip(before, old):
+        if key not in new_keys:
+            print(f"- {scope}\t'{entry}'")
+
+    # An entry has moved if the entries which it follows have changed.
+    common = [k for k in new if k in old_keys]
+    previous = [k for k in old if k in new_keys]
+    moved = set()
+    if common != previous:
+        stays = _longest_increasing(
+            common, key={k: n for n, k in enumerate(previous)}.get
+        )
+        moved = set(common) - stays
+
+    for entry, key in zip(after, new):
+        if key not in old_keys:
+            print(f"+ {scope}\t'{entry}'")
+        elif key in moved:
+            print(f"~ {scope}\t'{entry}' (moved)")
+
+
+def _name(system: bool) -> str:
+    return "system" if system else "user"
+
+
+def _plan_sections(sections: Dict[bool, Section], use_snapshot: bool):
+    """
+    Reads each PATH in the manifest, returning the values read and the new entries
+    of those which don't match it.
+    """
+    before = {
+        system: pathutils.read_persisted_path(
+            user=not system, use_snapshot=use_snapshot
+        )
+        for system in sorted(sections)
+    }
+    after = {}
+
+    with timings.phase("plan changes"):
+        for system, section in sections.items():
+            current = PathList.parse(before[system])
+            result = plan(current, section)
+            if [normalize(i) for i in result] != [normalize(i) for i in current]:
+                after[system] = result
+
+    return before, after
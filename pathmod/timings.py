@@ -0,0 +1,202 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+Lightweight instrumentation of where pathmod spends its time.
+
+Timings are enabled with the '--timings' option, which prints a summary, or by setting
+PATHMOD_PROFILE to the name of a file, which appends a JSON record for each run.
+When disabled, phases and counters cost almost nothing.
+
+This module is imported on the startup hot path, so it must stay cheap to import.
+"""
+import os
+import sys
+import time
+
+PROFILE_ENV_VAR = "PATHMOD_PROFILE"
+
+enabled = False
+
+_start = None
+_phases = {}
+_counters = {}
+
+
+class _Phase:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *args):
+        elapsed = time.perf_counter() - self.start
+        count, total = _phases.get(self.name, (0, 0.0))
+        _phases[self.name] = (count + 1, total + elapsed)
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+
+_no_phase = _NoPhase()
+
+
+def enable():
+    global enabled, _start
+
+    if not enabled:
+        enabled = True
+        _start = time.perf_counter()
+
+
+def phase(name: str):
+    """
+    Returns a context manager which records the time spent in a phase. Nested
+    phases are recorded separately, so the totals can overlap.
+    """
+    return _Phase(name) if enabled else _no_phase
+
+
+def count(name: str, n: int = 1):
+    """
+    Increments a counter, e.g. the number of stat calls.
+    """
+    if enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def get_record() -> dict:
+    """
+    Returns the timings of this run as a dict which can be serialized as JSON.
+    """
+    from pathmod import __version__
+
+    record = {
+        "time": time.time(),
+        "version": __version__,
+        "argv": sys.argv[1:],
+        "backend": os.environ.get("PATHMOD_BACKEND", ""),
+        "startup": _get_startup_time(),
+        "total": time.perf_counter() - _start if _start is not None else None,
+        "phases": {
+            name: {"count": c, "seconds": total}
+            for name, (c, total) in sorted(_phases.items())
+        },
+        "counters": dict(sorted(_counters.items())),
+    }
+    return record
+
+
+def print_summary():
+    record = get_record()
+
+    lines = ["", "Timings:", ""]
+    if record["startup"] is not None:
+        lines.append(
+            f"\t{'interpreter startup':<32}{record['startup'] * 1000:10.1f} ms"
+        )
+    for name, value in record["phases"].items():
+        lines.append(
+            f"\t{name:<32}{value['seconds'] * 1000:10.1f} ms"
+            f"  ({value['count']} call{'s' if value['count'] != 1 else ''})"
+        )
+    if record["total"] is not None:
+        lines.append(
+            f"\t{'total (after startup)':<32}{record['total'] * 1000:10.1f} ms"
+        )
+    for name, value in record["counters"].items():
+        lines.append(f"\t{name:<32}{value:10}")
+
+    print("\n".join(lines), file=sys.stderr)
+
+
+def write_record(filename: str = None):
+    """
+    Appends the timings of this run to the file given by PATHMOD_PROFILE, as one
+    line of JSON.
+    """
+    import json
+
+    filename = filename or os.environ.get(PROFILE_ENV_VAR)
+    if not filename:
+        return
+
+    try:
+        with open(filename, "a", encoding="utf-8") as f:
+            f.write(json.dumps(get_record()) + "\n")
+    except OSError as e:
+        print(f"Could not write timings to '{filename}': {e}", file=sys.stderr)
+
+
+def _get_startup_time():
+    """
+    Returns the time between the process starting and timings being enabled, if
+    the platform allows it to be determined.
+    """
+    if _start is None:
+        return None
+
+    # Time since timings were enabled.
+    since_enabled = time.perf_counter() - _start
+
+    try:
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+
+            creation, exit, kernel, user = (wintypes.FILETIME() for _ in range(4))
+            kernel32 = ctypes.windll.kernel32
+            kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+            if not kernel32.GetProcessTimes(
+                kernel32.GetCurrentProcess(),
+                ctypes.byref(creation),
+                ctypes.byref(exit),
+                ctypes.byref(kernel),
+                ctypes.byref(user),
+            ):
+                return None
+
+            # FILETIME counts 100ns intervals since 1601-01-01.
+            created = (creation.dwHighDateTime << 32 | creation.dwLowDateTime) / 1e7
+            age = time.time() - (created - 11644473600)
+        elif os.path.exists("/proc/self/stat"):
+            # The process start time is given in clock ticks since boot.
+            with open("/proc/self/stat") as f:
+                ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+            with open("/proc/uptime") as f:
+                uptime = float(f.read().split()[0])
+            age = uptime - ticks / os.sysconf("SC_CLK_TCK")
+        else:
+            return None
+    except Exception:
+        return None
+
+    return max(age - since_enabled, 0.0)
@@ -0,0 +1,82 @@
+#  MIT License
+#
+#  Copyright (c) 2021 Sam McCormack
+#
+#  Permission is hereby granted, free of charge, to any person obtaining a copy
+#  of this software and associated documentation files (the "Software"), to deal
+#  in the Software without restriction, including without limitation the rights
+#  to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+#  copies of the Software, and to permit persons to whom the Software is
+#  furnished to do so, subject to the following conditions:
+#
+#  The above copyright notice and this permission notice shall be included in all
+#  copies or substantial portions of the Software.
+#
+#  THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#  IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#  FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#  AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#  LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#  OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#  SOFTWARE.
+"""
+An opt-in log of the executables run from the shell, used to move frequently used
+locations earlier on the PATH.
+
+Nothing is recorded unless the hook from `get_hook()` is added to the Powershell
+profile. The hook appends the full path of each executable run from the prompt to
+the log, without starting Python.
+"""
+import os
+from collections import Counter
+from typing import Dict
+
+from pathmod import state
+from pathmod.pathlist import normalize
+
+USAGE_LOG = "usage.log"
+
+
+def get_log_file() -> str:
+    return state.get_state_file(USAGE_LOG)
+
+
+def get_hook() -> str:
+    """
+    Returns Powershell code which records each executable run from the prompt.
+    """
+    log = get_log_file().replace("'", "''")
+    return (
+        f"$ExecutionContext.InvokeCommand.PostCommandLookupAction = {{\n"
+        f"    param($name, $e)\n"
+        f"    if ($e.CommandOrigin -eq 'Runspace' -and $e.Command.CommandType -eq 'Application') {{\n"
+        f"        Add-Content -LiteralPath '{log}' -Value $e.Command.Source -Encoding UTF8 -ErrorAction SilentlyContinue\n"
+        f"    }}\n"
+        f"}}"
+    )
+
+
+def get_usage() -> Dict[str, int]:
+    """
+    Returns the number of times an executable was run from each location, keyed by
+    the normalized location.
+    """
+    usage = Counter()
+
+    try:
+        with open(get_log_file(), "r", encoding="utf-8-sig", errors="replace") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    usage[normalize(os.path.dirname(line))] += 1
+    except FileNotFoundError:
+        pass
+
+    return usage
+
+
+def clear():
+    try:
+        os.remove(get_log_file())
+    except FileNotFoundError:
+        pass
@@ -42,7 +42,7 @@ setup(
     packages=setuptools.find_packages(),
     python_requires="~=3.6",
     install_requires=requirements,
-    description="CLI tool for easily modifying the PATH (persistently) on Windows.",
+    description="CLI tool for easily modifying the PATH (persistently) on Windows and POSIX systems.",
     long_description=long_description,
     long_description_content_type="text/markdown",
     author="Sam McCormack",
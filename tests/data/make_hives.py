@@ -0,0 +1,176 @@
+"""
+Writes the sample hives used by the tests:
+
+    python tests/data/make_hives.py
+
+ntuser.dat has an 'Environment' key with 'Path' (REG_EXPAND_SZ) and 'TEMP' (REG_SZ)
+values; no-environment.dat has only a root key. Both are version 1.5 hives with a
+single 4096-byte hive bin, and only have the records which pathmod reads: there are
+no security descriptors, so they are not meant to be loaded by Windows.
+"""
+import os
+import struct
+
+BASE_BLOCK_SIZE = 4096
+HBIN_SIZE = 4096
+HBIN_HEADER_SIZE = 32
+NO_OFFSET = 0xFFFFFFFF
+
+KEY_HIVE_ENTRY = 0x0004
+KEY_NO_DELETE = 0x0008
+KEY_COMP_NAME = 0x0020
+VALUE_COMP_NAME = 0x0001
+
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+
+# 2021-01-01 00:00:00 as a FILETIME, so that the files are reproducible.
+TIMESTAMP = 132539328000000000
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+class Builder:
+    """
+    Lays out cells one after another in the first hive bin.
+    """
+
+    def __init__(self):
+        self.cells = bytearray()
+
+    @property
+    def next_offset(self) -> int:
+        return HBIN_HEADER_SIZE + len(self.cells)
+
+    def add(self, data: bytes) -> int:
+        offset = self.next_offset
+        size = (len(data) + 4 + 7) & ~7
+        self.cells += struct.pack("<i", -size) + data.ljust(size - 4, b"\0")
+        return offset
+
+    def add_key(self, name: str, parent: int, flags: int = 0) -> int:
+        # Offsets of subkey and value lists are filled in by `set_key_lists()`.
+        encoded = name.encode("ascii")
+        return self.add(
+            struct.pack(
+                "<2sHQIIIIIIIIIIIIIIIHH",
+                b"nk",
+                flags | KEY_COMP_NAME,
+                TIMESTAMP,
+                0,
+                parent,
+                0,
+                0,
+                NO_OFFSET,
+                NO_OFFSET,
+                0,
+                NO_OFFSET,
+                NO_OFFSET,
+                NO_OFFSET,
+                0,
+                0,
+                0,
+                0,
+                0,
+                len(encoded),
+                0,
+            )
+            + encoded
+        )
+
+    def add_value(self, name: str, value: str, value_type: int) -> int:
+        data = (value + "\0").encode("utf-16-le")
+        data_offset = self.add(data)
+        encoded = name.encode("ascii")
+        return self.add(
+            struct.pack(
+                "<2sHIIIHH",
+                b"vk",
+                len(encoded),
+                len(data),
+                data_offset,
+                value_type,
+                VALUE_COMP_NAME,
+                0,
+            )
+            + encoded
+        )
+
+    def set_key_lists(self, key: int, subkeys=(), values=()):
+        position = key - HBIN_HEADER_SIZE + 4
+        if subkeys:
+            elements = b"".join(
+                struct.pack("<I4s", offset, name[:4].encode("ascii").ljust(4, b"\0"))
+                for offset, name in subkeys
+            )
+            lf = self.add(struct.pack("<2sH", b"lf", len(subkeys)) + elements)
+            struct.pack_into("<I", self.cells, position + 20, len(subkeys))
+            struct.pack_into("<I", self.cells, position + 28, lf)
+            longest = max(len(name) for _, name in subkeys) * 2
+            struct.pack_into("<I", self.cells, position + 52, longest)
+        if values:
+            value_list = self.add(struct.pack(f"<{len(values)}I", *values))
+            struct.pack_into("<II", self.cells, position + 36, len(values), value_list)
+
+    def build(self, root: int) -> bytes:
+        free = HBIN_SIZE - HBIN_HEADER_SIZE - len(self.cells)
+        hbin = (
+            struct.pack("<4sIIQQI", b"hbin", 0, HBIN_SIZE, 0, TIMESTAMP, 0)
+            + self.cells
+            + struct.pack("<i", free)
+            + bytes(free - 4)
+        )
+
+        base = bytearray(BASE_BLOCK_SIZE)
+        struct.pack_into(
+            "<4sIIQIIIIIII",
+            base,
+            0,
+            b"regf",
+            1,
+            1,
+            TIMESTAMP,
+            1,
+            5,
+            0,
+            1,
+            root,
+            HBIN_SIZE,
+            1,
+        )
+        checksum = 0
+        for dword in struct.unpack_from("<127I", base):
+            checksum ^= dword
+        struct.pack_into("<I", base, 508, checksum)
+
+        return bytes(base) + hbin
+
+
+def make_ntuser() -> bytes:
+    builder = Builder()
+    root = builder.add_key("ROOT", NO_OFFSET, KEY_HIVE_ENTRY | KEY_NO_DELETE)
+    environment = builder.add_key("Environment", root)
+    path = builder.add_value("Path", r"%USERPROFILE%\bin;C:\Tools", REG_EXPAND_SZ)
+    temp = builder.add_value("TEMP", r"C:\Temp", REG_SZ)
+    builder.set_key_lists(environment, values=[path, temp])
+    builder.set_key_lists(root, subkeys=[(environment, "Environment")])
+    return builder.build(root)
+
+
+def make_no_environment() -> bytes:
+    builder = Builder()
+    root = builder.add_key("ROOT", NO_OFFSET, KEY_HIVE_ENTRY | KEY_NO_DELETE)
+    return builder.build(root)
+
+
+def main():
+    for name, data in (
+        ("ntuser.dat", make_ntuser()),
+        ("no-environment.dat", make_no_environment()),
+    ):
+        with open(os.path.join(DIRECTORY, name), "wb") as f:
+            f.write(data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+
+from pathmod import activate
+
+
+def test_parse_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("TOOLS", str(tmp_path / "tools"))
+    filename = str(tmp_path / "project" / activate.FILENAME)
+    content = "\n".join(
+        [
+            "# Comment",
+            "",
+            "add bin",
+            "PREPEND '../shared scripts'",
+            "add $TOOLS/bin",
+            f"add {tmp_path / 'abs'}",
+        ]
+    )
+
+    assert activate.parse_file(filename, content) == [
+        ("add", str(tmp_path / "project" / "bin")),
+        ("prepend", str(tmp_path / "shared scripts")),
+        ("add", os.path.join(str(tmp_path / "tools"), "bin")),
+        ("add", str(tmp_path / "abs")),
+    ]
+
+
+def test_parse_file_skips_bad_lines(tmp_path, capsys):
+    filename = str(tmp_path / activate.FILENAME)
+    content = "remove bin\nadd\nadd lib\n"
+
+    assert activate.parse_file(filename, content) == [("add", str(tmp_path / "lib"))]
+
+    err = capsys.readouterr().err
+    assert "line 1: expected '<add|prepend> <location>'" in err
+    assert "line 2:" in err
+    assert "line 3:" not in err
+
+
+def test_find_file(tmp_path):
+    (tmp_path / activate.FILENAME).write_text("add bin\n")
+    nested = tmp_path / "a" / "b"
+    nested.mkdir(parents=True)
+
+    assert activate.find_file(str(nested)) == str(tmp_path / activate.FILENAME)
@@ -0,0 +1,100 @@
+import os
+
+import pytest
+
+from pathmod import backends, batch
+from pathmod.backends.memory import MemoryBackend
+
+
+def parse(*lines):
+    return batch.parse_operations(lines)
+
+
+def test_conflicting_operations(capsys):
+    tools = os.path.join(os.sep, "opt", "tools")
+    with pytest.raises(SystemExit):
+        batch.check_conflicts(parse(f"add {tools}", f"remove {tools}{os.sep}"))
+
+    assert "conflicts with" in capsys.readouterr().out
+
+
+def test_conflicts_ignore_case(monkeypatch, capsys):
+    # As on Windows, where entries are compared case-insensitively.
+    monkeypatch.setattr(os.path, "normcase", str.lower)
+
+    with pytest.raises(SystemExit):
+        batch.check_conflicts(parse("add /Opt/Tools", "remove /opt/tools/"))
+
+    assert "conflicts with" in capsys.readouterr().out
+
+
+def test_no_conflict_across_scopes_or_variables():
+    tools = os.path.join(os.sep, "opt", "tools")
+    batch.check_conflicts(
+        parse(
+            f"add {tools}",
+            f"remove -s {tools}",
+            f"remove --var PSModulePath {tools}",
+            f"add {tools}{os.sep}",
+        )
+    )
+
+
+class RacingBackend(MemoryBackend):
+    """
+    Another program adds an entry to the user PATH just after it is first read.
+    """
+
+    def __init__(self, values, entry):
+        super().__init__(values)
+        self.entry = entry
+        self.reads = 0
+
+    def get_many(self, names):
+        values = super().get_many(names)
+        self.reads += 1
+        if self.reads == 1:
+            self.set("PATH", f"{self.get('PATH', user=True)};{self.entry}", user=True)
+        return values
+
+
+def test_apply_operations_retries_after_conflict(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATHMOD_HOME", str(tmp_path / "home"))
+    old, other, new = (tmp_path / name for name in ("old", "other", "new"))
+    new.mkdir()
+    backend = RacingBackend({"user": {"PATH": str(old)}}, str(other))
+    monkeypatch.setattr(backends, "_backend", backend)
+
+    batch.apply_operations(parse(f"add {new}"), dry_run=False, force=False)
+
+    assert backend.get("PATH", user=True) == f"{old};{other};{new}"
+
+
+def test_empty_user_variable_starts_from_system_value(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATHMOD_HOME", str(tmp_path / "home"))
+    backend = MemoryBackend({"system": {"PATHEXT": ".COM;.EXE"}})
+    monkeypatch.setattr(backends, "_backend", backend)
+
+    batch.apply_operations(
+        parse("add --var PATHEXT .PY", "add --var PATHEXT .JS"),
+        dry_run=False,
+        force=False,
+    )
+
+    assert backend.get("PATHEXT", user=True) == ".COM;.EXE;.PY;.JS"
+
+
+def test_variable_names_are_case_insensitive(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("PATHMOD_HOME", str(tmp_path / "home"))
+    a, b = tmp_path / "a", tmp_path / "b"
+    backend = MemoryBackend()
+    monkeypatch.setattr(backends, "_backend", backend)
+
+    batch.apply_operations(
+        parse(f"add --var PYTHONPATH {a}", f"add --var pythonpath {b}"),
+        dry_run=False,
+        force=True,
+    )
+
+    assert backend.get("PYTHONPATH", user=True) == f"{a};{b}"
+    assert capsys.readouterr().out.count(f"+ [user]   PYTHONPATH\t'{b}'") == 1
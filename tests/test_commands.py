@@ -0,0 +1,53 @@
+from pathmod import backends
+from pathmod.backends.memory import MemoryBackend
+from pathmod.cli import commands
+
+
+def test_duplicate_variables_are_changed_once(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("PATHMOD_HOME", str(tmp_path / "home"))
+    backend = MemoryBackend()
+    monkeypatch.setattr(backends, "_backend", backend)
+    modules = tmp_path / "modules"
+    modules.mkdir()
+
+    commands.modify(
+        hives=(),
+        jobs=0,
+        target=str(modules),
+        prepend=False,
+        remove=False,
+        dry_run=False,
+        system=False,
+        force=False,
+        compact=False,
+        variables=("PSModulePath", "psmodulepath"),
+    )
+
+    assert backend.get("PSModulePath", user=True) == str(modules)
+    assert capsys.readouterr().out.count("Adding") == 1
+
+
+def test_file_is_replaced_by_its_folder(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("PATHMOD_HOME", str(tmp_path / "home"))
+    backend = MemoryBackend()
+    monkeypatch.setattr(backends, "_backend", backend)
+    tool = tmp_path / "tool.exe"
+    tool.write_text("")
+
+    commands.modify(
+        hives=(),
+        jobs=0,
+        target=str(tool),
+        prepend=False,
+        remove=False,
+        dry_run=False,
+        system=False,
+        force=False,
+        compact=False,
+        variables=("PATH",),
+    )
+
+    assert f"'{tool}' is a file; using its parent folder instead." in (
+        capsys.readouterr().out
+    )
+    assert backend.get("PATH", user=True) == str(tmp_path)
@@ -0,0 +1,35 @@
+import os
+
+from pathmod import compact
+
+HOME = os.path.join(os.sep, "home", "user")
+LOCAL = os.path.join(HOME, "local")
+
+
+def test_compact_literal_entry(monkeypatch):
+    monkeypatch.setenv("USERPROFILE", HOME)
+    monkeypatch.setenv("LOCALAPPDATA", LOCAL)
+
+    entry = os.path.join(LOCAL, "bin")
+    assert compact.compact_entry(entry, system=False) == f"%LOCALAPPDATA%{os.sep}bin"
+
+
+def test_entries_with_references_are_kept(monkeypatch):
+    monkeypatch.setenv("USERPROFILE", HOME)
+    monkeypatch.setenv("LOCALAPPDATA", LOCAL)
+    monkeypatch.setenv("TOOLS", os.path.join(LOCAL, "tools"))
+
+    # Expanding these would give a shorter '%LOCALAPPDATA%' form, which would lose
+    # the reference to a variable that may change later.
+    for entry in ("%TOOLS%", f"%USERPROFILE%{os.sep}local{os.sep}bin"):
+        assert compact.compact_entry(entry, system=False) == entry
+
+    path, changes = compact.compact_path(f"%TOOLS%;{os.path.join(LOCAL, 'x')}", False)
+    assert path == f"%TOOLS%;%LOCALAPPDATA%{os.sep}x"
+    assert changes == [(os.path.join(LOCAL, "x"), f"%LOCALAPPDATA%{os.sep}x")]
+
+
+def test_has_reference():
+    assert compact.has_reference("%APPDATA%\\bin")
+    assert not compact.has_reference("C:\\100%\\bin")
+    assert not compact.has_reference("C:\\a%%b")
@@ -0,0 +1,16 @@
+import pytest
+
+from pathmod import dispatch, refresh
+from pathmod.backends import BackendError
+
+
+def test_errors_are_printed(monkeypatch, capsys):
+    def expression(shell):
+        raise BackendError("could not read the PATH.")
+
+    monkeypatch.setattr(refresh, "expression", expression)
+
+    with pytest.raises(SystemExit) as e:
+        dispatch.dispatch(["refresh", "-e"])
+    assert e.value.code == 1
+    assert capsys.readouterr().out == "Error: could not read the PATH.\n"
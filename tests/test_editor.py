@@ -0,0 +1,56 @@
+import pytest
+
+from pathmod.backends.memory import MemoryBackend
+from pathmod.backends.posix import PosixBackend
+from pathmod.editor import PathEditor
+from pathmod.errors import AlreadyOnPathError
+
+SYSTEM_PATHEXT = ".COM;.EXE;.BAT"
+
+
+def test_empty_user_variable_starts_from_system_value(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATHMOD_HOME", str(tmp_path))
+    backend = MemoryBackend({"system": {"PATHEXT": SYSTEM_PATHEXT}})
+    editor = PathEditor(backend)
+    editor.insert(".PY", var="PATHEXT")
+    editor.commit()
+
+    assert backend.get("PATHEXT", user=True) == ".COM;.EXE;.BAT;.PY"
+    assert backend.get("PATHEXT", user=False) == SYSTEM_PATHEXT
+
+
+def test_system_entries_count_as_already_added(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATHMOD_HOME", str(tmp_path))
+    backend = MemoryBackend({"system": {"PATHEXT": SYSTEM_PATHEXT}})
+    editor = PathEditor(backend)
+
+    with pytest.raises(AlreadyOnPathError):
+        editor.insert(".EXE", var="PATHEXT")
+    assert editor.get_changes() == {}
+
+
+def test_user_path_is_not_seeded(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATHMOD_HOME", str(tmp_path))
+    backend = MemoryBackend({"system": {"PATH": r"C:\Windows", "PATHEXT": ".EXE"}})
+    editor = PathEditor(backend)
+    editor.insert(r"C:\Tools")
+    editor.insert(".PY", var="PATHEXT", system=True)
+
+    assert editor.get_changes() == {
+        ("PATH", False): r"C:\Tools",
+        ("PATHEXT", True): ".EXE;.PY",
+    }
+
+
+def test_posix_variables_are_not_seeded(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATHMOD_HOME", str(tmp_path))
+    system_file = tmp_path / "60-pathmod.conf"
+    system_file.write_text(
+        '# >>> pathmod >>>\nPYTHONPATH="/opt/lib${PYTHONPATH:+:$PYTHONPATH}"\n'
+        "# <<< pathmod <<<\n"
+    )
+    backend = PosixBackend(str(tmp_path / ".profile"), str(system_file))
+    editor = PathEditor(backend)
+    editor.insert("/home/me/lib", var="PYTHONPATH")
+
+    assert editor.get_changes() == {("PYTHONPATH", False): "/home/me/lib"}
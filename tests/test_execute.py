@@ -0,0 +1,62 @@
+import os
+import sys
+
+from pathmod import execute
+
+
+def join(*entries):
+    return os.pathsep.join(str(i) for i in entries)
+
+
+def test_build_path_unchanged(tmp_path):
+    path = join(tmp_path / "a", tmp_path / "b")
+
+    assert execute.build_path(path) == path
+
+
+def test_build_path_order(tmp_path):
+    a, b, c, d, e = (tmp_path / i for i in "abcde")
+    path = join(a, b, c)
+
+    result = execute.build_path(path, prepend=[d, e], add=[tmp_path / "f"], remove=[b])
+
+    assert result == join(d, e, a, c, tmp_path / "f")
+
+
+def test_locations_are_matched_by_normalized_key(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+    path = join(f"{a}{os.sep}", b)
+
+    assert execute.build_path(path, add=[a]) == path
+    assert execute.build_path(path, remove=[a]) == join(b)
+
+
+def test_prepending_moves_an_existing_location(tmp_path):
+    a, b = tmp_path / "a", tmp_path / "b"
+
+    assert execute.build_path(join(a, b), prepend=[b]) == join(b, a)
+
+
+def test_removing_a_missing_location_does_nothing(tmp_path):
+    path = join(tmp_path / "a")
+
+    assert execute.build_path(path, remove=[tmp_path / "missing"]) == path
+
+
+def test_relative_locations_are_made_absolute(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    assert execute.build_path("", add=["bin"]) == str(tmp_path / "bin")
+
+
+def test_run_with_path():
+    path = join(os.path.dirname(sys.executable))
+    code = "import os, sys; sys.exit(os.environ['PATH'] == sys.argv[1] and 3)"
+    name = os.path.basename(sys.executable)
+
+    assert execute.run([name, "-c", code, path], path) == 3
+
+
+def test_run_missing_command(tmp_path, capsys):
+    assert execute.run(["no-such-command"], str(tmp_path)) == 1
+    assert "not found on the PATH" in capsys.readouterr().out
@@ -0,0 +1,66 @@
+import pytest
+
+from pathmod import backends, history
+from pathmod.backends.file import FileBackend
+from pathmod.editor import PathEditor
+
+
+@pytest.fixture
+def backend(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATHMOD_HOME", str(tmp_path / "home"))
+    backend = FileBackend(str(tmp_path / "environment.json"))
+    backend.set("PATH", "/d1", user=True)
+    monkeypatch.setattr(backends, "_backend", backend)
+    return backend
+
+
+def add(backend, *entries):
+    for entry in entries:
+        editor = PathEditor(backend, compact=False)
+        editor.insert(entry)
+        editor.commit()
+
+
+def get_path(backend):
+    return backend.get("PATH", user=True)
+
+
+def test_two_undos_in_a_row(backend):
+    add(backend, "/d2", "/d3")
+
+    history.undo(1, dry_run=False, force=False)
+    assert get_path(backend) == "/d1;/d2"
+
+    # The second undo goes further back, rather than undoing the first.
+    history.undo(1, dry_run=False, force=False)
+    assert get_path(backend) == "/d1"
+
+    entries = history.get_entries(backend)
+    assert [i.undoes for i in entries] == [[], [], [2], [1]]
+    assert history.get_active(entries) == []
+
+
+def test_undo_several_after_an_undo(backend):
+    add(backend, "/d2", "/d3", "/d4")
+
+    history.undo(1, dry_run=False, force=False)
+    history.undo(2, dry_run=False, force=False)
+    assert get_path(backend) == "/d1"
+
+    with pytest.raises(SystemExit):
+        history.undo(1, dry_run=False, force=False)
+
+
+def test_rollback_past_an_undo(backend):
+    add(backend, "/d2", "/d3")
+    history.undo(1, dry_run=False, force=False)
+
+    # Rolling back to the change which was undone redoes it.
+    history.rollback(2, dry_run=False, force=False)
+    assert get_path(backend) == "/d1;/d2;/d3"
+    assert [i.id for i in history.get_active(history.get_entries(backend))] == [1, 2]
+
+    history.rollback(1, dry_run=False, force=False)
+    assert get_path(backend) == "/d1;/d2"
+    history.undo(1, dry_run=False, force=False)
+    assert get_path(backend) == "/d1"
@@ -0,0 +1,81 @@
+import os
+
+from pathmod.pathlist import PathList, normalize
+
+
+def test_parse_keeps_original_entries():
+    paths = PathList.parse(" /opt/a ;;/opt/b/; ")
+
+    assert paths.entries == ["/opt/a", "/opt/b/"]
+    assert str(paths) == "/opt/a;/opt/b/"
+
+
+def test_normalize(monkeypatch):
+    monkeypatch.setenv("TOOLS", "/opt/tools")
+
+    assert normalize("/opt//a/./b/") == normalize("/opt/a/b")
+    assert normalize('"/opt/a"') == normalize("/opt/a")
+    assert normalize("$TOOLS/bin") == normalize("/opt/tools/bin")
+    assert normalize("  ") == ""
+
+
+def test_normalize_ignores_case_where_the_platform_does(monkeypatch):
+    monkeypatch.setattr(os.path, "normcase", str.lower)
+
+    assert normalize("/Opt/Tools") == normalize("/opt/tools/")
+
+
+def test_find_by_normalized_key():
+    paths = PathList.parse("/opt/a;/opt/b;/opt/a/")
+
+    assert "/opt//a" in paths
+    assert paths.count("/opt/a") == 2
+    assert paths.find("/opt/a/", use_identity=False) == ["/opt/a", "/opt/a/"]
+    assert paths.find("/opt/c", use_identity=False) == []
+
+
+def test_find_by_identity(tmp_path):
+    target = tmp_path / "target"
+    target.mkdir()
+    link = tmp_path / "link"
+    link.symlink_to(target)
+    paths = PathList([str(target)])
+
+    assert paths.find(str(link), use_identity=False) == []
+    assert paths.find(str(link)) == [str(target)]
+
+
+def test_remove_every_matching_entry():
+    paths = PathList.parse("/opt/a;/opt/b;/opt/a/")
+
+    assert paths.remove("/opt/a", use_identity=False) == ["/opt/a", "/opt/a/"]
+    assert paths.entries == ["/opt/b"]
+    assert "/opt/a" not in paths
+    assert paths.remove("/opt/a", use_identity=False) == []
+
+
+def test_insert():
+    paths = PathList.parse("/opt/b")
+    paths.insert("/opt/a", prepend=True)
+    paths.insert("/opt/c", prepend=False)
+
+    assert paths.entries == ["/opt/a", "/opt/b", "/opt/c"]
+    assert "/opt/c/" in paths
+
+
+def test_deduplicated_keeps_first_occurrence():
+    paths = PathList.parse("/opt/a;/opt/b;/opt/a/;/opt//b")
+    result, duplicates = paths.deduplicated()
+
+    assert result.entries == ["/opt/a", "/opt/b"]
+    assert duplicates == ["/opt/a/", "/opt//b"]
+    assert paths.entries == ["/opt/a", "/opt/b", "/opt/a/", "/opt//b"]
+
+
+def test_copy_is_independent():
+    paths = PathList.parse("/opt/a")
+    copy = paths.copy()
+    copy.append("/opt/b")
+
+    assert paths.entries == ["/opt/a"]
+    assert "/opt/b" not in paths
@@ -0,0 +1,149 @@
+import os
+
+import pytest
+
+from pathmod.backends import BackendError, posix
+from pathmod.backends.posix import PosixBackend
+
+PROFILE = """\
+# ~/.profile
+umask 022
+
+# >>> pathmod >>>
+# Managed by pathmod; use 'pathmod add' and 'pathmod remove' to change it.
+export PATH="/home/me/bin:/opt/tool bin${PATH:+:$PATH}"
+# <<< pathmod <<<
+
+alias ll='ls -l'
+"""
+
+
+@pytest.fixture
+def backend(tmp_path):
+    return PosixBackend(
+        str(tmp_path / ".profile"), str(tmp_path / "environment.d" / "60-pathmod.conf")
+    )
+
+
+def test_parse_block(tmp_path):
+    filename = tmp_path / ".profile"
+    filename.write_text(PROFILE)
+    text, start, end = posix._read(str(filename))
+
+    assert text[start:end].startswith(posix.BEGIN_MARKER)
+    assert text[end:] == "\nalias ll='ls -l'\n"
+    assert posix._parse_block(text[start:end], str(filename)) == {
+        "PATH": ["/home/me/bin", "/opt/tool bin"]
+    }
+
+
+def test_parse_block_rejects_edited_lines():
+    block = f'{posix.BEGIN_MARKER}\nexport PATH="/a"\n{posix.END_MARKER}\n'
+
+    with pytest.raises(BackendError, match="Couldn't parse the line"):
+        posix._parse_block(block, ".profile")
+
+
+def test_missing_end_marker(tmp_path):
+    filename = tmp_path / ".profile"
+    filename.write_text(f"{posix.BEGIN_MARKER}\nexport PATH=...\n")
+
+    with pytest.raises(BackendError, match="no '# <<< pathmod <<<'"):
+        posix._read(str(filename))
+
+
+def test_write_round_trip(backend):
+    with open(backend.user_file, "w") as f:
+        f.write(PROFILE)
+
+    backend.set("PATH", "/opt/new;/home/me/bin", user=True)
+    backend.set("PYTHONPATH", '/home/me/lib "$1"', user=True)
+
+    assert backend.get("PATH", user=True) == "/opt/new;/home/me/bin"
+    assert backend.get("PYTHONPATH", user=True) == '/home/me/lib "$1"'
+    with open(backend.user_file) as f:
+        text = f.read()
+    # The rest of the file is kept as it was.
+    assert text.startswith("# ~/.profile\numask 022\n\n# >>> pathmod >>>\n")
+    assert text.endswith("# <<< pathmod <<<\n\nalias ll='ls -l'\n")
+    assert (
+        'export PYTHONPATH="/home/me/lib \\"\\$1\\"${PYTHONPATH:+:$PYTHONPATH}"' in text
+    )
+
+
+def test_removing_every_entry_removes_the_block(backend):
+    with open(backend.user_file, "w") as f:
+        f.write(PROFILE)
+
+    backend.set("PATH", "", user=True)
+
+    with open(backend.user_file) as f:
+        assert f.read() == "# ~/.profile\numask 022\n\n\nalias ll='ls -l'\n"
+
+
+def test_new_block_is_appended(backend):
+    with open(backend.user_file, "w") as f:
+        f.write("umask 022")
+
+    backend.set("PATH", "/a", user=True)
+
+    with open(backend.user_file) as f:
+        lines = f.read().splitlines()
+    assert lines[:2] == ["umask 022", posix.BEGIN_MARKER]
+    assert lines[-2:] == ['export PATH="/a${PATH:+:$PATH}"', posix.END_MARKER]
+
+
+def test_system_file_has_no_export(backend):
+    backend.set("PATH", "/opt/bin", user=False)
+
+    with open(backend.system_file) as f:
+        assert 'PATH="/opt/bin${PATH:+:$PATH}"\n' in f.read().splitlines(True)
+    assert backend.get("PATH", user=False) == "/opt/bin"
+    assert backend.get("PATH", user=True) == ""
+
+
+def test_symbolic_links_are_kept(backend, tmp_path):
+    target = tmp_path / "dotfiles" / "profile"
+    target.parent.mkdir()
+    target.write_text("umask 022\n")
+    os.symlink(target, backend.user_file)
+
+    backend.set("PATH", "/a", user=True)
+
+    assert os.path.islink(backend.user_file)
+    assert backend.get("PATH", user=True) == "/a"
+
+
+def test_entries_with_colons_are_rejected(backend):
+    with pytest.raises(BackendError, match="separated by ':'"):
+        backend.set("PATH", "/a:/b", user=True)
+    assert not os.path.exists(backend.user_file)
+
+
+def test_lock_file_is_next_to_the_system_file(backend):
+    assert backend.get_lock_file() == backend.system_file + ".lock"
+
+
+def test_lock_file_falls_back_to_the_state_folder(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATHMOD_HOME", str(tmp_path / "home"))
+    (tmp_path / "etc").write_text("")
+    backend = PosixBackend(
+        str(tmp_path / ".profile"), str(tmp_path / "etc" / "60-pathmod.conf")
+    )
+
+    lock_file = backend.get_lock_file()
+    assert os.path.dirname(lock_file) == str(tmp_path / "home")
+
+
+def test_user_entries_come_first_after_a_refresh(backend, tmp_path, monkeypatch):
+    from pathmod import backends, refresh
+
+    monkeypatch.setattr(backends, "_backend", backend)
+    monkeypatch.setenv("PATHMOD_HOME", str(tmp_path / "home"))
+    monkeypatch.setenv("PATH", "/usr/bin")
+    monkeypatch.delenv(refresh.PERSISTED_VAR, raising=False)
+    backend.set_many({("PATH", True): "/home/me/bin", ("PATH", False): "/opt/bin"})
+
+    assert refresh.expression("posix").startswith(
+        "export PATH='/home/me/bin:/opt/bin:/usr/bin' "
+    )
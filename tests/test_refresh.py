@@ -0,0 +1,46 @@
+from pathmod import refresh
+
+
+def test_no_changes():
+    assert refresh.get_changes("/a;/b", "/a;/b", "/a;/b") == ([], [], [])
+
+
+def test_session_only_entries_are_kept():
+    # '/venv/bin' was never persistent, e.g. an activated virtual environment.
+    removed, prepended, appended = refresh.get_changes(
+        "/venv/bin;/a;/b", "/a;/b", "/a;/b"
+    )
+
+    assert (removed, prepended, appended) == ([], [], [])
+
+
+def test_persisted_removals_are_applied():
+    removed, prepended, appended = refresh.get_changes(
+        "/venv/bin;/a;/b;/c", "/a;/c", "/a;/b;/c"
+    )
+
+    assert removed == ["/b"]
+    assert (prepended, appended) == ([], [])
+
+
+def test_nothing_is_removed_without_the_last_persisted_path():
+    assert refresh.get_changes("/a;/b", "/a", None) == ([], [], [])
+
+
+def test_persisted_additions_are_applied():
+    removed, prepended, appended = refresh.get_changes(
+        "/venv/bin;/a;/b", "/first;/a;/b;/last", "/a;/b"
+    )
+
+    assert removed == []
+    assert prepended == ["/first"]
+    assert appended == ["/last"]
+
+
+def test_entries_are_compared_by_normalized_key(monkeypatch):
+    monkeypatch.setenv("TOOLS", "/opt/tools")
+    removed, prepended, appended = refresh.get_changes(
+        "/opt/tools/bin/;/a", "$TOOLS/bin;/a", "/a"
+    )
+
+    assert (removed, prepended, appended) == ([], [], [])
@@ -0,0 +1,135 @@
+import shutil
+import struct
+from pathlib import Path
+
+import pytest
+
+from pathmod import regf, stamp
+from pathmod.backends import BackendError
+from pathmod.backends.hive import HiveBackend
+from pathmod.editor import PathEditor
+
+DATA = Path(__file__).parent / "data"
+
+
+@pytest.fixture
+def hive_file(tmp_path):
+    filename = tmp_path / "NTUSER.DAT"
+    shutil.copy(DATA / "ntuser.dat", filename)
+    return str(filename)
+
+
+def reload(filename):
+    hive = regf.Hive(filename)
+    return hive, hive.find_key("Environment")
+
+
+def test_get_string(hive_file):
+    hive, key = reload(hive_file)
+
+    assert hive.get_string(key, "PATH") == (r"%USERPROFILE%\bin;C:\Tools", 2)
+    assert hive.get_string(key, "TEMP") == (r"C:\Temp", regf.REG_SZ)
+    assert hive.get_string(key, "Missing") == (None, None)
+
+
+def test_set_string_round_trip(hive_file):
+    hive, key = reload(hive_file)
+    hive.set_string(key, "Path", r"C:\A", regf.REG_SZ)
+    hive.set_string(key, "PSModulePath", r"C:\Modules", regf.REG_EXPAND_SZ)
+    hive.save()
+
+    hive, key = reload(hive_file)
+    assert hive.get_string(key, "Path") == (r"C:\A", regf.REG_SZ)
+    assert hive.get_string(key, "PSModulePath") == (r"C:\Modules", 2)
+    assert hive.get_string(key, "TEMP") == (r"C:\Temp", regf.REG_SZ)
+
+
+def test_grow_value_past_its_cell(hive_file):
+    # Too long for the free space in the only hive bin, so a bin is added.
+    value = ";".join(rf"C:\Tools\{i:04}" for i in range(300))
+    hive, key = reload(hive_file)
+    hive.set_string(key, "Path", value, regf.REG_EXPAND_SZ)
+    hive.save()
+
+    hive, key = reload(hive_file)
+    assert hive.get_string(key, "Path") == (value, regf.REG_EXPAND_SZ)
+    assert hive.get_string(key, "TEMP") == (r"C:\Temp", regf.REG_SZ)
+    assert struct.unpack_from("<I", hive.data, 40)[0] > 4096
+
+    # The old cell is freed, and reused for a short value.
+    size = len(hive.data)
+    hive.set_string(key, "Path", r"C:\B", regf.REG_EXPAND_SZ)
+    hive.save()
+    hive, key = reload(hive_file)
+    assert hive.get_string(key, "Path")[0] == r"C:\B"
+    assert len(hive.data) == size
+
+
+def test_big_data_value(hive_file):
+    value = "x" * (regf.MAX_CELL_DATA + 1000)
+    hive, key = reload(hive_file)
+    hive.set_string(key, "Path", value, regf.REG_EXPAND_SZ)
+    hive.save()
+
+    hive, key = reload(hive_file)
+    vk = hive._find_value(key, "Path")
+    size, offset = struct.unpack_from("<II", hive.data, vk + 4)
+    cell = hive._cell(offset)
+    assert hive.data[cell : cell + 2] == b"db"
+    assert hive.get_string(key, "Path")[0] == value
+
+    # Replacing a big value frees its segments.
+    hive.set_string(key, "Path", r"C:\Short", regf.REG_EXPAND_SZ)
+    hive.save()
+    hive, key = reload(hive_file)
+    assert hive.get_string(key, "Path")[0] == r"C:\Short"
+
+
+def test_save_updates_sequence_and_checksum(hive_file):
+    hive, key = reload(hive_file)
+    hive.set_string(key, "TEMP", r"D:\Temp", regf.REG_SZ)
+    hive.save()
+
+    with open(hive_file, "rb") as f:
+        data = bytearray(f.read())
+    primary, secondary = struct.unpack_from("<II", data, 4)
+    assert primary == secondary == 2
+    assert struct.unpack_from("<I", data, 508)[0] == regf._checksum(data)
+
+
+def test_rejects_unclean_hive(hive_file):
+    with open(hive_file, "r+b") as f:
+        f.seek(8)
+        f.write(struct.pack("<I", 5))
+
+    with pytest.raises(regf.HiveError, match="not unloaded cleanly"):
+        regf.Hive(hive_file)
+
+
+def test_rejects_other_files(tmp_path):
+    filename = tmp_path / "not-a-hive"
+    filename.write_bytes(b"\0" * 8192)
+
+    with pytest.raises(regf.HiveError, match="not a registry hive"):
+        regf.Hive(str(filename))
+
+
+def test_missing_environment_key(tmp_path):
+    filename = tmp_path / "NTUSER.DAT"
+    shutil.copy(DATA / "no-environment.dat", filename)
+    backend = HiveBackend(str(filename))
+
+    assert backend.get("PATH", user=True) == ""
+    with pytest.raises(BackendError, match="has no 'Environment' key"):
+        backend.set("PATH", r"C:\A", user=True)
+    assert filename.read_bytes() == (DATA / "no-environment.dat").read_bytes()
+
+
+def test_hive_edit_does_not_notify_sessions(hive_file, tmp_path, monkeypatch):
+    monkeypatch.setenv("PATHMOD_HOME", str(tmp_path / "home"))
+    editor = PathEditor(HiveBackend(hive_file), compact=False)
+    editor.insert(r"C:\New")
+    editor.commit()
+
+    assert HiveBackend(hive_file).get("PATH", user=True).endswith(r";C:\New")
+    assert stamp.read() == ""
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from pathmod import index, reorder
+
+
+@pytest.fixture(autouse=True)
+def pathext(monkeypatch):
+    monkeypatch.setenv("PATHEXT", ".EXE")
+
+
+def make_locations(contents, system=False, unknown=()):
+    return [
+        index.Location(system, entry, entry, files, entry not in unknown)
+        for entry, files in contents.items()
+    ]
+
+
+def resolve(locations):
+    return {
+        name: matches[0].location.entry
+        for name, matches in index.get_commands(locations).items()
+    }
+
+
+def test_most_used_locations_move_first():
+    contents = {"/a": ["a.exe"], "/b": ["b.exe"], "/c": ["c.exe"]}
+    hits = {"/b": 5, "/c": 20}
+
+    new = reorder.get_new_order(list(contents), make_locations(contents), hits, False)
+
+    assert new == ["/c", "/b", "/a"]
+
+
+def test_location_providing_a_command_stays_ahead():
+    # '/b' provides 'y', so '/c' can only move ahead of '/a' by taking '/b' along.
+    contents = {"/a": ["x.exe"], "/b": ["y.exe"], "/c": ["y.exe", "z.exe"]}
+    hits = {"/b": 1, "/c": 100}
+
+    new = reorder.get_new_order(list(contents), make_locations(contents), hits, False)
+
+    assert new == ["/b", "/c", "/a"]
+
+
+def test_unknown_locations_are_not_passed():
+    contents = {"/a": ["a.exe"], "/slow": [], "/b": ["b.exe"]}
+    locations = make_locations(contents, unknown={"/slow"})
+
+    new = reorder.get_new_order(list(contents), locations, {"/b": 10}, False)
+
+    assert new == ["/a", "/slow", "/b"]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_no_command_resolves_differently(seed):
+    rng = random.Random(seed)
+    names = [f"tool{i}.exe" for i in range(6)]
+    contents = {
+        f"/loc{i}": sorted(rng.sample(names, rng.randint(0, 3))) for i in range(8)
+    }
+    hits = {entry: rng.randint(0, 50) for entry in contents}
+    locations = make_locations(contents)
+
+    new = reorder.get_new_order(list(contents), locations, hits, False)
+
+    assert sorted(new) == sorted(contents)
+    by_entry = {location.entry: location for location in locations}
+    assert resolve([by_entry[i] for i in new]) == resolve(locations)
+
+
+def test_no_usage_is_an_error(monkeypatch):
+    monkeypatch.setattr(reorder.usage, "get_usage", lambda: {})
+
+    with pytest.raises(SystemExit) as e:
+        reorder.reorder(system=False, dry_run=True, timeout=1.0)
+    assert e.value.code == 1
@@ -0,0 +1,26 @@
+from pathmod import show
+
+
+def test_iter_rows_skips_empty_scope(tmp_path):
+    rows = list(show.iter_rows([str(tmp_path)], [""], details=False, timeout=1.0))
+
+    assert [(r["scope"], r["position"], r["entry"]) for r in rows] == [
+        ("user", 0, str(tmp_path))
+    ]
+
+
+def test_iter_rows_details_skips_empty_entries(tmp_path):
+    rows = list(show.iter_rows([""], ["", str(tmp_path)], details=True, timeout=1.0))
+
+    assert len(rows) == 1
+    assert rows[0]["scope"] == "system"
+    assert rows[0]["position"] == 1
+    assert rows[0]["exists"] and rows[0]["is_dir"]
+
+
+def test_print_text_skips_empty_entries(capsys):
+    show.print_text(["/d1"], [""], iter([]), details=False, shadowed=False)
+
+    output = capsys.readouterr().out
+    assert "[user]   \t'/d1'" in output
+    assert "[system]" not in output
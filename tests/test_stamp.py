@@ -0,0 +1,14 @@
+import os
+
+from pathmod import stamp
+
+
+def test_bump(tmp_path, monkeypatch):
+    monkeypatch.setenv("PATHMOD_HOME", str(tmp_path))
+    assert stamp.read() == ""
+
+    stamp.bump()
+
+    when, _, pid = stamp.read().partition("-")
+    assert int(when) > 0
+    assert pid == str(os.getpid())
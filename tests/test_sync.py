@@ -0,0 +1,86 @@
+import pytest
+
+from pathmod import sync
+from pathmod.pathlist import PathList
+
+
+def plan(current, mode, *entries):
+    return sync.plan(PathList.parse(current), sync.Section(mode, list(entries))).entries
+
+
+def test_parse_manifest():
+    sections = sync.parse_manifest(
+        ["# comment", "[user]", "/a", '"/b c"', "", "[system exact]", "/s"]
+    )
+
+    assert sections == {
+        False: sync.Section("contains", ["/a", "/b c"]),
+        True: sync.Section("exact", ["/s"]),
+    }
+
+
+@pytest.mark.parametrize(
+    "lines",
+    [
+        ["/a"],
+        ["[users]", "/a"],
+        ["[user sorted]", "/a"],
+        ["[user]", "/a", "/a/"],
+        ["[system exact]"],
+        [],
+    ],
+)
+def test_parse_manifest_errors(lines):
+    with pytest.raises(SystemExit):
+        sync.parse_manifest(lines)
+
+
+def test_matching_path_is_unchanged():
+    assert plan("/x;/a;/y;/b", "contains", "/a", "/b/") == ["/x", "/a", "/y", "/b"]
+
+
+def test_missing_entries_follow_the_previous_desired_entry():
+    assert plan("/x;/a;/y", "contains", "/a", "/b", "/c") == [
+        "/x",
+        "/a",
+        "/b",
+        "/c",
+        "/y",
+    ]
+
+
+def test_leading_entries_go_before_the_first_kept_entry():
+    assert plan("/x;/b;/y", "contains", "/a", "/b") == ["/x", "/a", "/b", "/y"]
+
+
+def test_entries_are_added_to_the_end_if_none_are_present():
+    assert plan("/x;/y", "contains", "/a", "/b") == ["/x", "/y", "/a", "/b"]
+
+
+def test_only_entries_out_of_order_are_moved():
+    # '/a', '/c' and '/d' are in order, so only '/b' moves.
+    assert plan("/b;/a;/x;/c;/d", "contains", "/a", "/b", "/c", "/d") == [
+        "/a",
+        "/b",
+        "/x",
+        "/c",
+        "/d",
+    ]
+
+
+def test_exact_mode():
+    assert plan("/x;/a;/y", "exact", "/b", "/a") == ["/b", "/a"]
+
+
+def test_longest_increasing():
+    items = ["a", "b", "c", "d", "e", "f"]
+    keys = dict(zip(items, [3, 1, 4, 1, 5, 9]))
+
+    result = sync._longest_increasing(items, key=keys.get)
+
+    assert len(result) == 4
+    assert [keys[i] for i in items if i in result] == sorted(keys[i] for i in result)
+
+
+def test_longest_increasing_empty():
+    assert sync._longest_increasing([], key=len) == set()